@@ -0,0 +1,92 @@
+"""
+DecisionCache - Memoización LRU de las decisiones del ModeSelector
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class DecisionCache:
+    """
+    Caché LRU acotada de decisiones (risk_score, clarity_score, regla).
+
+    La clave es el texto exacto de la tarea más los campos del contexto que
+    afectan la decisión (environment, has_active_users). No se normaliza:
+    el matcher, las mayúsculas, los espacios y el clasificador puntúan el
+    texto tal cual, así que dos variantes pueden tener decisiones distintas
+    y la caché nunca debe cambiar el resultado.
+
+    Cada entrada queda asociada a la versión de configuración del selector;
+    si cambian vocabularios o umbrales, la caché se vacía sola en el
+    siguiente acceso.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        """
+        Args:
+            max_size: Número máximo de decisiones memorizadas
+        """
+        if max_size < 1:
+            raise ValueError("max_size debe ser >= 1")
+        self.max_size = max_size
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, float, int]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(task: str, context: Dict) -> Hashable:
+        """Clave de caché para una tarea y su contexto"""
+        return (
+            task,
+            context.get('environment', 'development'),
+            bool(context.get('has_active_users', False)),
+        )
+
+    def _check_version(self, version: int):
+        if version != self.version:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self.version = version
+
+    def get(self, key: Hashable, version: int) -> Optional[Tuple[float, float, int]]:
+        """Retorna la decisión memorizada para la clave, o None"""
+        self._check_version(version)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: Hashable, version: int, decision: Tuple[float, float, int]):
+        """Memoriza una decisión, desalojando la menos usada si hace falta"""
+        self._check_version(version)
+        self._entries[key] = decision
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Vacía la caché (los contadores se conservan)"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de uso de la caché"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,257 @@
+"""
+FakeLLM - Proveedor LLM falso para pruebas de carga
+
+Las respuestas simuladas (_generate_*_mock) vuelven al instante, así que no
+muestran cómo se comporta el agente con la latencia y la concurrencia de un
+proveedor real. FakeLLM implementa la misma interfaz que los clientes de
+langchain (invoke/ainvoke/stream/astream) con:
+- Latencia hasta el primer token según una distribución configurable
+- Velocidad de generación en tokens por segundo (el streaming se espacia)
+- Tasa de errores del proveedor (500) y ráfagas de 429
+- Límite de llamadas simultáneas (las que sobran reciben 429)
+
+Todo es reproducible: la latencia y los errores de la llamada N dependen
+solo de (seed, N) y el texto de la respuesta solo de (seed, prompt).
+
+Se selecciona con llm_provider="fake"; la configuración por defecto se puede
+cambiar con la variable de entorno FAKE_LLM_CONFIG (JSON con los argumentos
+de FakeLLM) o registrando un FakeLLM propio en el LLMRegistry.
+"""
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+
+from agent_core.reasoning_engines import SAFE_PLAN_MARKER, SAFE_VALIDATION_MARKER
+
+LATENCY_DISTRIBUTIONS = ('constant', 'uniform', 'lognormal')
+
+_WORDS = ("análisis", "control", "riesgo", "política", "revisión", "acceso", "registro",
+          "evidencia", "proceso", "seguridad", "auditoría", "cumplimiento", "plan", "paso")
+
+
+class FakeLLMError(Exception):
+    """Error inyectado (status_code 500, o 429 con retry_after)"""
+
+    def __init__(self, message: str, status_code: int = 500, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class FakeMessage:
+    """Respuesta compatible con AIMessage / AIMessageChunk de langchain"""
+
+    __slots__ = ('content', 'usage_metadata')
+
+    def __init__(self, content: str, usage_metadata: Optional[Dict[str, int]] = None):
+        self.content = content
+        self.usage_metadata = usage_metadata
+
+    def __repr__(self) -> str:
+        return f"FakeMessage({len(self.content)} caracteres)"
+
+
+class FakeLLM:
+    """Cliente LLM falso con latencia, velocidad de tokens y errores inyectados"""
+
+    def __init__(self, latency: float = 0.3, latency_distribution: str = 'lognormal',
+                 jitter: float = 0.5, tokens_per_second: Optional[float] = 50.0,
+                 response_tokens: int = 80, error_rate: float = 0.0,
+                 burst_every: int = 0, burst_length: int = 0, retry_after: float = 1.0,
+                 max_concurrency: Optional[int] = None, seed: int = 0,
+                 model_name: str = 'fake-llm'):
+        """
+        Args:
+            latency: Segundos hasta el primer token (mediana en 'lognormal')
+            latency_distribution: 'constant', 'uniform' (latency ± jitter·latency)
+                                  o 'lognormal' (sigma = jitter)
+            jitter: Dispersión de la latencia
+            tokens_per_second: Velocidad de generación (None = instantánea)
+            response_tokens: Tokens de cada respuesta
+            error_rate: Probabilidad de un error 500 por llamada
+            burst_every: Cada cuántas llamadas hay una ráfaga de 429 (0 = nunca)
+            burst_length: Llamadas seguidas que reciben 429 en cada ráfaga
+            retry_after: retry_after de los 429
+            max_concurrency: Llamadas simultáneas aceptadas (None = sin límite)
+            seed: Semilla de latencias, errores y textos
+            model_name: Nombre del modelo (para los cachés)
+        """
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_distribution debe ser uno de {LATENCY_DISTRIBUTIONS}: "
+                             f"{latency_distribution}")
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.retry_after = retry_after
+        self.max_concurrency = max_concurrency
+        self.seed = seed
+        self.model_name = model_name
+        self.temperature = 0
+
+        self._lock = threading.Lock()
+        self._next_call = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeLLM":
+        """FakeLLM con los argumentos de FAKE_LLM_CONFIG (JSON), si está definida"""
+        config = os.getenv('FAKE_LLM_CONFIG')
+        return cls(**json.loads(config)) if config else cls()
+
+    # Plan de cada llamada
+
+    def _sample_latency(self, rng: random.Random) -> float:
+        if self.latency_distribution == 'constant':
+            return self.latency
+        if self.latency_distribution == 'uniform':
+            spread = self.latency * self.jitter
+            return max(rng.uniform(self.latency - spread, self.latency + spread), 0.0)
+        return self.latency * math.exp(rng.gauss(0, self.jitter)) if self.latency > 0 else 0.0
+
+    def _start(self) -> Dict[str, Any]:
+        """Registra una llamada y decide su latencia y su error (reproducibles)"""
+        with self._lock:
+            index = self._next_call
+            self._next_call += 1
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            over_limit = self.max_concurrency is not None and self.in_flight > self.max_concurrency
+
+        rng = random.Random(self.seed * 1_000_003 + index)
+        latency = self._sample_latency(rng)
+        failed = rng.random() < self.error_rate
+        in_burst = (self.burst_every > 0
+                    and index % self.burst_every >= self.burst_every - self.burst_length)
+
+        error = None
+        if over_limit or in_burst:
+            error = FakeLLMError("429 Too Many Requests (fake)", 429, self.retry_after)
+            # Un 429 real llega rápido, sin generar nada
+            latency = min(latency, 0.01)
+        elif failed:
+            error = FakeLLMError("500 Internal Server Error (fake)")
+        return {'latency': latency, 'error': error}
+
+    def _finish(self, error: Optional[FakeLLMError] = None):
+        with self._lock:
+            self.in_flight -= 1
+            if error is not None:
+                if error.status_code == 429:
+                    self.rate_limited += 1
+                else:
+                    self.errors += 1
+
+    def _check(self, call: Dict[str, Any]):
+        if call['error'] is not None:
+            self._finish(call['error'])
+            raise call['error']
+
+    # Contenido
+
+    def _tokens(self, prompt: str) -> List[str]:
+        """Tokens de la respuesta: dependen solo de la semilla y el prompt"""
+        rng = random.Random(self.seed * 1_000_003 + zlib.crc32(prompt.encode('utf-8')))
+        words = [rng.choice(_WORDS) for _ in range(self.response_tokens)]
+        if SAFE_VALIDATION_MARKER in prompt and SAFE_PLAN_MARKER in prompt:
+            text = (f"{SAFE_PLAN_MARKER}\n1. {' '.join(words)}\n\n{SAFE_VALIDATION_MARKER}\n"
+                    f"NIVEL DE RIESGO: MEDIO\n\nDECISIÓN: RECHAZAR\n\n"
+                    f"ALTERNATIVA: ejecutar primero en un entorno de prueba")
+        elif "DECISIÓN: [APROBAR/RECHAZAR]" in prompt:
+            text = (f"NIVEL DE RIESGO: MEDIO\n\nRIESGOS:\n- {' '.join(words)}\n\n"
+                    f"DECISIÓN: RECHAZAR\n\nALTERNATIVA: ejecutar primero en un entorno de prueba")
+        else:
+            text = "Respuesta simulada: " + ' '.join(words)
+        # Un token por palabra, con su espacio
+        pieces = text.split(' ')
+        return [piece if i == 0 else ' ' + piece for i, piece in enumerate(pieces)]
+
+    def _usage(self, prompt: str, tokens: List[str]) -> Dict[str, int]:
+        input_tokens = len(prompt.split())
+        return {'input_tokens': input_tokens, 'output_tokens': len(tokens),
+                'total_tokens': input_tokens + len(tokens)}
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    # Interfaz de cliente LLM
+
+    def invoke(self, prompt: str, **kwargs) -> FakeMessage:
+        call = self._start()
+        time.sleep(call['latency'])
+        self._check(call)
+        tokens = self._tokens(prompt)
+        time.sleep(len(tokens) * self._token_delay())
+        self._finish()
+        return FakeMessage(''.join(tokens), self._usage(prompt, tokens))
+
+    async def ainvoke(self, prompt: str, **kwargs) -> FakeMessage:
+        import asyncio
+
+        call = self._start()
+        try:
+            await asyncio.sleep(call['latency'])
+            self._check(call)
+            tokens = self._tokens(prompt)
+            await asyncio.sleep(len(tokens) * self._token_delay())
+        except asyncio.CancelledError:
+            self._finish()
+            raise
+        self._finish()
+        return FakeMessage(''.join(tokens), self._usage(prompt, tokens))
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[FakeMessage]:
+        call = self._start()
+        time.sleep(call['latency'])
+        self._check(call)
+        tokens = self._tokens(prompt)
+        delay = self._token_delay()
+        try:
+            for token in tokens:
+                yield FakeMessage(token)
+                time.sleep(delay)
+        finally:
+            self._finish()
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[FakeMessage]:
+        import asyncio
+
+        call = self._start()
+        try:
+            await asyncio.sleep(call['latency'])
+            self._check(call)
+        except asyncio.CancelledError:
+            self._finish()
+            raise
+        tokens = self._tokens(prompt)
+        delay = self._token_delay()
+        try:
+            for token in tokens:
+                yield FakeMessage(token)
+                await asyncio.sleep(delay)
+        finally:
+            self._finish()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'errors': self.errors,
+                'rate_limited': self.rate_limited,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+            }
@@ -0,0 +1,135 @@
+"""
+KeywordMatcher - Búsqueda multi-patrón en una sola pasada
+Autómata Aho-Corasick compilado a partir de listas de palabras clave por categoría
+"""
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+
+class KeywordMatcher:
+    """
+    Compila varias listas de palabras clave en un único autómata Aho-Corasick.
+
+    El texto se recorre una sola vez, sin importar cuántas palabras clave
+    existan. La semántica es la misma que `keyword in text` aplicada a cada
+    palabra: cada entrada de una categoría cuenta como máximo una vez.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        """
+        Args:
+            categories: Mapa categoría -> lista de palabras clave (en minúsculas)
+        """
+        self.categories: Dict[str, Tuple[str, ...]] = {
+            name: tuple(words) for name, words in categories.items()
+        }
+
+        # Índice de patrones únicos y categorías a las que pertenecen.
+        # Una palabra repetida dentro de una categoría suma una vez por entrada,
+        # igual que el conteo original con sum(... for word in lista).
+        self._patterns: List[str] = []
+        self._pattern_categories: List[List[str]] = []
+        pattern_ids: Dict[str, int] = {}
+        for name, words in self.categories.items():
+            for word in words:
+                if not word:
+                    continue
+                if word not in pattern_ids:
+                    pattern_ids[word] = len(self._patterns)
+                    self._patterns.append(word)
+                    self._pattern_categories.append([])
+                self._pattern_categories[pattern_ids[word]].append(name)
+
+        self._pattern_ids = pattern_ids
+        self._build_automaton()
+
+    def _build_automaton(self):
+        """Construye trie, enlaces de fallo y salidas del autómata"""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+
+        # Trie de patrones
+        for pattern_id, pattern in enumerate(self._patterns):
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(pattern_id)
+
+        # Enlaces de fallo (BFS)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                candidate = goto[fallback].get(char, 0)
+                fail[next_state] = candidate if candidate != next_state else 0
+                outputs[next_state].extend(outputs[fail[next_state]])
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs: List[Tuple[int, ...]] = [tuple(out) for out in outputs]
+
+    def _match_ids(self, text: str) -> set:
+        """Recorre el texto una vez y retorna los ids de patrones encontrados"""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        found = set()
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+
+        return found
+
+    def _count_ids(self, pattern_ids: Iterable[int]) -> Dict[str, int]:
+        counts = dict.fromkeys(self.categories, 0)
+        pattern_categories = self._pattern_categories
+        for pattern_id in pattern_ids:
+            for name in pattern_categories[pattern_id]:
+                counts[name] += 1
+        return counts
+
+    def find_all(self, text: str) -> FrozenSet[str]:
+        """
+        Retorna el conjunto de palabras clave presentes en el texto.
+
+        Args:
+            text: Texto ya normalizado (normalmente en minúsculas)
+        """
+        patterns = self._patterns
+        return frozenset(patterns[pattern_id] for pattern_id in self._match_ids(text))
+
+    def count_categories(self, matches: Iterable[str]) -> Dict[str, int]:
+        """Convierte un conjunto de coincidencias en conteos por categoría"""
+        pattern_ids = self._pattern_ids
+        return self._count_ids(pattern_ids[word] for word in matches)
+
+    def scan(self, text: str) -> Dict[str, int]:
+        """
+        Recorre el texto una sola vez y retorna conteos por categoría.
+
+        Args:
+            text: Texto ya normalizado (normalmente en minúsculas)
+
+        Returns:
+            Dict categoría -> número de palabras clave encontradas
+        """
+        return self._count_ids(self._match_ids(text))
+
+    def __len__(self) -> int:
+        return len(self._patterns)
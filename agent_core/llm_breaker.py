@@ -0,0 +1,407 @@
+"""
+CircuitBreaker - Corte de llamadas a un proveedor LLM caído
+
+Con el proveedor caído, cada petición espera el timeout del cliente (30-60 s)
+antes de que el motor pase a la respuesta simulada. Cada proveedor tiene un
+breaker compartido por el proceso que cuenta los fallos consecutivos:
+
+    cerrado --(failure_threshold fallos)--> abierto --(reset_timeout)--> semiabierto
+    semiabierto --(prueba bien)--> cerrado      semiabierto --(prueba mal)--> abierto
+
+Mientras está abierto las llamadas no salen a la red y BreakerLLM responde al
+instante con el mejor respaldo disponible:
+1. La respuesta del caché para el mismo prompt, aunque haya expirado
+2. El otro proveedor (detrás de su propio breaker)
+3. CircuitOpenError, con la que el motor genera la respuesta simulada
+
+La prueba de recuperación la hace un hilo en segundo plano con un prompt
+mínimo, así ningún usuario paga el timeout de un proveedor que sigue caído.
+Los 429 y las esperas en la cola de admisión no cuentan como fallos: de eso
+se encarga llm_limiter.
+"""
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+import threading
+import time
+
+from agent_core.llm_cache import LLMResponseCache, make_key
+from agent_core.llm_limiter import AdmissionTimeout, is_rate_limit_error
+from agent_core.llm_wrappers import LLMResponse, LLMWrapper, model_signature
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+DEFAULT_BREAKER = {
+    'failure_threshold': 5,
+    'reset_timeout': 30.0,
+    'probe': True,
+}
+
+# Prompt de la prueba de recuperación (lo más barato posible)
+PROBE_PROMPT = "ping"
+
+
+class CircuitOpenError(Exception):
+    """El proveedor tiene el circuito abierto y no hay respaldo"""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"{provider} no disponible (circuito abierto, nueva prueba en {retry_in:.0f} s)")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+def counts_as_failure(error: BaseException) -> bool:
+    """True si el error indica que el proveedor no responde"""
+    if not isinstance(error, Exception):
+        # Cancelación o stream abandonado por quien llama
+        return False
+    return not isinstance(error, (AdmissionTimeout, CircuitOpenError)) and not is_rate_limit_error(error)
+
+
+class CircuitBreaker:
+    """Estado del circuito de un proveedor (seguro entre hilos y event loops)"""
+
+    def __init__(self, provider: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 probe: bool = True):
+        """
+        Args:
+            provider: Nombre del proveedor (para métricas y mensajes)
+            failure_threshold: Fallos consecutivos que abren el circuito
+            reset_timeout: Segundos abierto antes de probar de nuevo
+            probe: Si True, la prueba la hace un hilo en segundo plano con
+                   probe_call; si False (o sin probe_call), la primera
+                   llamada tras reset_timeout hace de prueba
+        """
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.probe_call: Optional[Callable[[], Any]] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._probing = False
+        self._trial = False
+
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.transitions: Dict[str, int] = {}
+        self.rejected = 0
+        self.probes = 0
+        self.probe_failures = 0
+
+    def configure(self, failure_threshold: int, reset_timeout: float, probe: bool):
+        with self._lock:
+            self.failure_threshold = failure_threshold
+            self.reset_timeout = reset_timeout
+            self.probe = probe
+        self._wake.set()
+
+    @property
+    def _background(self) -> bool:
+        return self.probe and self.probe_call is not None
+
+    def _set(self, state: str):
+        """Cambia de estado (con el lock tomado)"""
+        if state == self.state:
+            return
+        transition = f"{self.state}->{state}"
+        self.transitions[transition] = self.transitions.get(transition, 0) + 1
+        self.state = state
+        self._trial = False
+        if state == BREAKER_OPEN:
+            self.opened_at = time.monotonic()
+            self._start_probing()
+        elif state == BREAKER_CLOSED:
+            self.failures = 0
+            self.opened_at = None
+
+    def _start_probing(self):
+        """Lanza el hilo de prueba si corresponde y no está corriendo (con el lock tomado)"""
+        if self._background and not self._probing:
+            self._probing = True
+            threading.Thread(target=self._probe_loop, name=f"llm-breaker-{self.provider}",
+                             daemon=True).start()
+
+    def retry_in(self) -> float:
+        """Segundos hasta la próxima prueba (0 si el circuito no está abierto)"""
+        with self._lock:
+            if self.state != BREAKER_OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        """True si la llamada puede salir al proveedor"""
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True
+            if self.state == BREAKER_OPEN:
+                # probe_call o probe pueden haber llegado con el circuito ya abierto
+                self._start_probing()
+            if (self.state == BREAKER_OPEN and not self._background
+                    and time.monotonic() - self.opened_at >= self.reset_timeout):
+                self._set(BREAKER_HALF_OPEN)
+            if self.state == BREAKER_HALF_OPEN and not self._background and not self._trial:
+                # Sin prueba en segundo plano, esta llamada es la prueba
+                self._trial = True
+                return True
+            self.rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self._set(BREAKER_CLOSED)
+
+    def failure(self, error: BaseException):
+        with self._lock:
+            if not counts_as_failure(error):
+                self._trial = False
+            elif self.state == BREAKER_HALF_OPEN:
+                self._set(BREAKER_OPEN)
+            else:
+                self.failures += 1
+                if self.state == BREAKER_CLOSED and self.failures >= self.failure_threshold:
+                    self._set(BREAKER_OPEN)
+
+    def reset(self):
+        """Cierra el circuito y olvida los fallos"""
+        with self._lock:
+            self._set(BREAKER_CLOSED)
+            self.failures = 0
+        self._wake.set()
+
+    def _probe_loop(self):
+        """Hilo de fondo: prueba el proveedor cada reset_timeout hasta que responda"""
+        while True:
+            with self._lock:
+                if self.state != BREAKER_OPEN or not self._background:
+                    self._probing = False
+                    return
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining <= 0:
+                    self._set(BREAKER_HALF_OPEN)
+                    self.probes += 1
+                    probe_call = self.probe_call
+            if remaining > 0:
+                self._wake.wait(remaining)
+                self._wake.clear()
+                continue
+
+            try:
+                probe_call()
+                healthy = True
+            except Exception as e:
+                healthy = not counts_as_failure(e)
+
+            with self._lock:
+                if self.state == BREAKER_HALF_OPEN:
+                    if healthy:
+                        self._set(BREAKER_CLOSED)
+                    else:
+                        self.probe_failures += 1
+                        # Sigue el hilo actual: _set no lanza otro mientras _probing
+                        self._set(BREAKER_OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = self.retry_in()
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'retry_in': round(retry_in, 3),
+                'transitions': dict(self.transitions),
+                'rejected': self.rejected,
+                'probes': self.probes,
+                'probe_failures': self.probe_failures,
+            }
+
+
+class BreakerLLM(LLMWrapper):
+    """
+    Cliente LLM detrás del breaker de su proveedor.
+
+    Con el circuito abierto no llama al cliente: responde con el caché
+    (stale), con `fallback` o levanta CircuitOpenError, en ese orden.
+    """
+
+    def __init__(self, llm: Any, breaker: CircuitBreaker, provider: Optional[str] = None,
+                 stale_cache: Optional[LLMResponseCache] = None, fallback: Any = None,
+                 probe: Any = None):
+        """
+        Args:
+            llm: Cliente a proteger
+            breaker: Breaker del proveedor del cliente
+            provider: Nombre del proveedor (parte de la clave del caché)
+            stale_cache: Caché de respuestas consultado con el circuito abierto
+            fallback: Cliente del otro proveedor (idealmente con su breaker)
+            probe: Cliente para la prueba de recuperación (sin capas que
+                   graben o cacheen); None = sin prueba en segundo plano
+        """
+        super().__init__(llm)
+        self.breaker = breaker
+        self.stale_cache = stale_cache
+        self.fallback = fallback
+        self.provider, self.model, self.temperature = model_signature(llm, provider)
+        if probe is not None:
+            breaker.probe_call = lambda: probe.invoke(PROBE_PROMPT)
+        self._lock = threading.Lock()
+        self.fallbacks = {'cache': 0, 'provider': 0, 'mock': 0}
+
+    def _count(self, kind: str):
+        with self._lock:
+            self.fallbacks[kind] += 1
+
+    def _cached(self, prompt: Any, kwargs: Dict) -> Optional[LLMResponse]:
+        if self.stale_cache is None or kwargs or self.temperature or not isinstance(prompt, str):
+            return None
+        content = self.stale_cache.get(make_key(self.provider, self.model, self.temperature, prompt),
+                                       stale=True)
+        if content is None:
+            return None
+        self._count('cache')
+        return LLMResponse(content, source='stale_cache')
+
+    def _unavailable(self) -> CircuitOpenError:
+        self._count('mock')
+        return CircuitOpenError(self.provider, self.breaker.retry_in())
+
+    def invoke(self, prompt: str, **kwargs) -> Any:
+        if not self.breaker.allow():
+            return self._degraded(prompt, kwargs)
+        try:
+            response = self.llm.invoke(prompt, **kwargs)
+        except BaseException as e:
+            self.breaker.failure(e)
+            raise
+        self.breaker.success()
+        return response
+
+    async def ainvoke(self, prompt: str, **kwargs) -> Any:
+        if not self.breaker.allow():
+            return await self._adegraded(prompt, kwargs)
+        try:
+            response = await self.llm.ainvoke(prompt, **kwargs)
+        except BaseException as e:
+            self.breaker.failure(e)
+            raise
+        self.breaker.success()
+        return response
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[Any]:
+        if not self.breaker.allow():
+            yield from self._degraded_stream(prompt, kwargs)
+            return
+        try:
+            yield from super().stream(prompt, **kwargs)
+        except BaseException as e:
+            self.breaker.failure(e)
+            raise
+        self.breaker.success()
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[Any]:
+        if not self.breaker.allow():
+            async for chunk in self._adegraded_stream(prompt, kwargs):
+                yield chunk
+            return
+        try:
+            async for chunk in super().astream(prompt, **kwargs):
+                yield chunk
+        except BaseException as e:
+            self.breaker.failure(e)
+            raise
+        self.breaker.success()
+
+    # ===== RESPALDOS (circuito abierto) =====
+
+    def _degraded(self, prompt: str, kwargs: Dict) -> Any:
+        response = self._cached(prompt, kwargs)
+        if response is not None:
+            return response
+        if self.fallback is not None:
+            try:
+                response = self.fallback.invoke(prompt, **kwargs)
+            except Exception:
+                pass
+            else:
+                self._count('provider')
+                return LLMResponse(response.content, source='fallback')
+        raise self._unavailable()
+
+    async def _adegraded(self, prompt: str, kwargs: Dict) -> Any:
+        response = self._cached(prompt, kwargs)
+        if response is not None:
+            return response
+        if self.fallback is not None:
+            try:
+                response = await self.fallback.ainvoke(prompt, **kwargs)
+            except Exception:
+                pass
+            else:
+                self._count('provider')
+                return LLMResponse(response.content, source='fallback')
+        raise self._unavailable()
+
+    def _degraded_stream(self, prompt: str, kwargs: Dict) -> Iterator[Any]:
+        response = self._cached(prompt, kwargs)
+        if response is not None:
+            yield response
+            return
+        if self.fallback is not None:
+            started = False
+            try:
+                for chunk in self.fallback.stream(prompt, **kwargs):
+                    if not started:
+                        started = True
+                        self._count('provider')
+                    yield LLMResponse(chunk.content, source='fallback')
+                return
+            except Exception:
+                # Con parte de la respuesta ya entregada no hay vuelta atrás
+                if started:
+                    raise
+        raise self._unavailable()
+
+    async def _adegraded_stream(self, prompt: str, kwargs: Dict) -> AsyncIterator[Any]:
+        response = self._cached(prompt, kwargs)
+        if response is not None:
+            yield response
+            return
+        if self.fallback is not None:
+            started = False
+            try:
+                async for chunk in self.fallback.astream(prompt, **kwargs):
+                    if not started:
+                        started = True
+                        self._count('provider')
+                    yield LLMResponse(chunk.content, source='fallback')
+                return
+            except Exception:
+                if started:
+                    raise
+        raise self._unavailable()
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado del breaker y respaldos servidos por esta capa"""
+        with self._lock:
+            fallbacks = dict(self.fallbacks)
+        return dict(self.breaker.stats(), fallbacks=fallbacks)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(provider: str, settings: Optional[Dict[str, Any]] = None) -> CircuitBreaker:
+    """
+    Breaker compartido de un proveedor.
+
+    Si se pasa configuración, reemplaza a la actual (combinada con DEFAULT_BREAKER).
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = _breakers[provider] = CircuitBreaker(provider, **dict(DEFAULT_BREAKER, **(settings or {})))
+        elif settings:
+            breaker.configure(**dict(DEFAULT_BREAKER, **settings))
+        return breaker
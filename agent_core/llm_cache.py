@@ -0,0 +1,319 @@
+"""
+LLMResponseCache - Caché persistente de respuestas del LLM por contenido
+
+Con temperature=0 el mismo prompt produce (en la práctica) la misma
+respuesta, así que se memoriza por hash de (proveedor, modelo, temperatura,
+prompt). Dos niveles:
+- Memoria: LRU acotado por número de entradas
+- Disco (opcional): SQLite en modo WAL, con TTL y desalojo por tamaño total;
+  seguro de compartir entre procesos del mismo host
+
+El caché compartido del proceso es solo de memoria. El nivel en disco se
+activa con la variable de entorno MARTIN_LLM_CACHE (ruta del SQLite, fuera
+del repositorio) o pasando un LLMResponseCache(path) a ReasoningEngines.
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+import os
+import sqlite3
+import threading
+import time
+
+from agent_core.llm_wrappers import LLMResponse, LLMWrapper, is_degraded, model_signature
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+    import hashlib
+    print("⚠️ xxhash no disponible - usando blake2b para las claves del caché LLM")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def make_key(provider: str, model: str, temperature: Any, prompt: str) -> str:
+    """Hash de contenido de una llamada al LLM"""
+    data = f"{provider}\x1f{model}\x1f{temperature}\x1f{prompt}".encode('utf-8')
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Caché de dos niveles (memoria LRU + SQLite) de respuestas del LLM.
+
+    Las entradas en disco expiran tras `ttl` segundos y, cuando el total
+    supera `max_bytes`, se desalojan las menos usadas recientemente.
+    """
+
+    # Cada cuántas escrituras se revisa el tamaño total en disco
+    EVICT_EVERY = 16
+
+    def __init__(self, path: Optional[str] = None, memory_size: int = 256,
+                 ttl: float = 7 * 24 * 3600, max_bytes: int = 100 * 1024 * 1024):
+        """
+        Args:
+            path: Archivo SQLite (None = solo memoria)
+            memory_size: Entradas retenidas en el LRU de memoria
+            ttl: Segundos de validez de una respuesta
+            max_bytes: Tamaño máximo del contenido almacenado en disco
+        """
+        self.path = str(path) if path else None
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db: Optional[sqlite3.Connection] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+
+        if self.path:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False,
+                                       isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+
+    def get(self, key: str, stale: bool = False) -> Optional[str]:
+        """
+        Respuesta memorizada para la clave (None si no hay o expiró).
+
+        Con stale=True también sirve respuestas expiradas (sin borrarlas):
+        es el respaldo cuando el proveedor no está disponible.
+        """
+        now = time.time()
+        ttl = float('inf') if stale else self.ttl
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                content, created = entry
+                if now - created < ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    self.bytes_served += len(content.encode('utf-8'))
+                    return content
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT content, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    content, created = row
+                    if now - created < ttl:
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                        self._remember(key, content, created)
+                        self.disk_hits += 1
+                        self.bytes_served += len(content.encode('utf-8'))
+                        return content
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, content: str):
+        """Guarda una respuesta en memoria y en disco"""
+        now = time.time()
+        size = len(content.encode('utf-8'))
+        with self._lock:
+            self._remember(key, content, now)
+            self.stores += 1
+            self.bytes_stored += size
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, content, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, content, size, now, now)
+                )
+                self._writes += 1
+                if self._writes % self.EVICT_EVERY == 0:
+                    self._evict(now)
+
+    def _remember(self, key: str, content: str, created: float):
+        self._memory[key] = (content, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float):
+        """Borra entradas expiradas y, si hace falta, las menos usadas"""
+        self.evictions += self._db.execute(
+            "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+        ).rowcount
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def clear(self):
+        """Vacía ambos niveles"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas de aciertos, fallos y bytes"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            disk_entries = disk_bytes = 0
+            if self._db is not None:
+                disk_entries, disk_bytes = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+            return {
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries,
+                'disk_bytes': disk_bytes,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'bytes_served': self.bytes_served,
+                'bytes_stored': self.bytes_stored,
+            }
+
+
+class CachedLLM(LLMWrapper):
+    """
+    Cliente LLM con caché de respuestas.
+
+    Solo memoriza llamadas deterministas (temperature 0 o no declarada);
+    con temperatura mayor delega siempre en el cliente. Tampoco memoriza
+    respuestas de otro proveedor o del caché vencido (ver DEGRADED_SOURCES):
+    la clave es la del primario.
+    """
+
+    def __init__(self, llm: Any, cache: LLMResponseCache, provider: Optional[str] = None):
+        """
+        Args:
+            llm: Cliente con invoke/ainvoke (ChatOpenAI, ChatAnthropic, ...)
+            cache: Caché de respuestas (puede compartirse entre clientes)
+            provider: Nombre del proveedor, parte de la clave
+        """
+        super().__init__(llm)
+        self.cache = cache
+        self.provider, self.model, self.temperature = model_signature(llm, provider)
+        self.enabled = not self.temperature
+
+    def _key(self, prompt: Any) -> Optional[str]:
+        if not self.enabled or not isinstance(prompt, str):
+            return None
+        return make_key(self.provider, self.model, self.temperature, prompt)
+
+    def invoke(self, prompt: str, **kwargs) -> Any:
+        key = None if kwargs else self._key(prompt)
+        if key is not None:
+            content = self.cache.get(key)
+            if content is not None:
+                return LLMResponse(content, source='cache')
+
+        response = self.llm.invoke(prompt, **kwargs)
+        if key is not None and isinstance(response.content, str) and not is_degraded(response):
+            self.cache.put(key, response.content)
+        return response
+
+    async def ainvoke(self, prompt: str, **kwargs) -> Any:
+        key = None if kwargs else self._key(prompt)
+        if key is not None:
+            content = self.cache.get(key)
+            if content is not None:
+                return LLMResponse(content, source='cache')
+
+        response = await self.llm.ainvoke(prompt, **kwargs)
+        if key is not None and isinstance(response.content, str) and not is_degraded(response):
+            self.cache.put(key, response.content)
+        return response
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[Any]:
+        key = None if kwargs else self._key(prompt)
+        if key is not None:
+            content = self.cache.get(key)
+            if content is not None:
+                yield LLMResponse(content, source='cache')
+                return
+
+        parts = []
+        degraded = False
+        for chunk in super().stream(prompt, **kwargs):
+            parts.append(chunk.content)
+            degraded = degraded or is_degraded(chunk)
+            yield chunk
+        # Solo se memoriza una respuesta completa
+        if key is not None and not degraded and all(isinstance(part, str) for part in parts):
+            self.cache.put(key, ''.join(parts))
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[Any]:
+        key = None if kwargs else self._key(prompt)
+        if key is not None:
+            content = self.cache.get(key)
+            if content is not None:
+                yield LLMResponse(content, source='cache')
+                return
+
+        parts = []
+        degraded = False
+        async for chunk in super().astream(prompt, **kwargs):
+            parts.append(chunk.content)
+            degraded = degraded or is_degraded(chunk)
+            yield chunk
+        if key is not None and not degraded and all(isinstance(part, str) for part in parts):
+            self.cache.put(key, ''.join(parts))
+
+
+_default_cache: Optional[LLMResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> LLMResponseCache:
+    """
+    Caché compartido del proceso.
+
+    Solo en memoria, salvo que la variable de entorno MARTIN_LLM_CACHE
+    indique un archivo SQLite donde persistir las respuestas.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache(os.getenv('MARTIN_LLM_CACHE') or None)
+        return _default_cache
@@ -0,0 +1,326 @@
+"""
+Cassettes - Grabación y reproducción de llamadas al LLM
+
+Para CI y regresiones de rendimiento sin acceso a los proveedores:
+- Grabar: RecordingLLM envuelve al cliente real y guarda cada par
+  (hash del prompt -> respuesta), con la latencia total y la del primer token
+- Reproducir: ReplayLLM responde desde el cassette, sin red ni API keys, al
+  instante o con las latencias originales
+
+El archivo es JSONL comprimido (zstd si está instalado, si no gzip) y se
+escribe por bloques: cada bloque es un frame/miembro independiente, así que
+grabar es solo agregar al final. La compresión se detecta al leer.
+
+Si un prompt se grabó varias veces, las respuestas se reproducen en el orden
+en que se grabaron (repitiendo la última); un prompt que no está en el
+cassette levanta CassetteMiss.
+"""
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
+import atexit
+import gzip
+import json
+import threading
+import time
+from datetime import datetime
+
+from agent_core.llm_cache import make_key
+from agent_core.llm_wrappers import LLMResponse, LLMWrapper
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Modos de uso de un cassette
+CASSETTE_RECORD = "record"        # Llamar al proveedor y grabar
+CASSETTE_REPLAY = "replay"        # Responder desde el cassette, al instante
+CASSETTE_REPLAY_TIMED = "replay_timed"  # Responder con las latencias grabadas
+CASSETTE_MODES = (CASSETTE_RECORD, CASSETTE_REPLAY, CASSETTE_REPLAY_TIMED)
+
+CASSETTE_VERSION = 1
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class CassetteMiss(KeyError):
+    """El prompt no está en el cassette"""
+
+
+def prompt_key(prompt: str) -> str:
+    """Hash del prompt (el cassette no depende del proveedor ni del modelo)"""
+    return make_key('cassette', '', None, prompt)
+
+
+class Cassette:
+    """Pares prompt -> respuesta en memoria, persistidos en un archivo comprimido"""
+
+    def __init__(self, path: Union[str, Path], compression: str = 'auto', flush_every: int = 100):
+        """
+        Args:
+            path: Archivo del cassette (se crea al grabar si no existe)
+            compression: 'zstd', 'gzip' o 'auto' (zstd si está instalado)
+            flush_every: Entradas grabadas por bloque escrito a disco
+        """
+        if compression == 'auto':
+            compression = 'zstd' if zstandard is not None else 'gzip'
+        if compression == 'zstd' and zstandard is None:
+            raise ImportError("zstandard no instalado. Instala con: pip install zstandard")
+        if compression not in ('zstd', 'gzip'):
+            raise ValueError(f"compresión desconocida: {compression}")
+
+        self.path = Path(path)
+        self.compression = compression
+        self.flush_every = flush_every
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._positions: Dict[str, int] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self.provider: Optional[str] = None
+
+        self.loaded = 0
+        self.recorded = 0
+        self.hits = 0
+        self.misses = 0
+
+        if self.path.exists():
+            self._load()
+        atexit.register(self.flush)
+
+    # Lectura
+
+    def _decompress(self, data: bytes) -> bytes:
+        if data.startswith(_ZSTD_MAGIC):
+            if zstandard is None:
+                raise ImportError(f"{self.path} está comprimido con zstd y zstandard no está instalado")
+            import io
+            reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+            return reader.read()
+        return gzip.decompress(data)
+
+    def _load(self):
+        data = self.path.read_bytes()
+        if not data:
+            return
+        for line in self._decompress(data).decode('utf-8').splitlines():
+            if not line:
+                continue
+            entry = json.loads(line)
+            if 'cassette' in entry:
+                continue
+            self._entries.setdefault(entry['k'], []).append(entry)
+            self.provider = self.provider or entry.get('p')
+            self.loaded += 1
+
+    def next(self, prompt: str) -> Dict[str, Any]:
+        """
+        Próxima respuesta grabada para el prompt.
+
+        Returns:
+            {'c': contenido, 't': latencia total, 'f': latencia del primer token}
+            (las latencias pueden faltar)
+
+        Raises:
+            CassetteMiss: si el prompt no está grabado
+        """
+        key = prompt_key(prompt)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"prompt sin grabar en {self.path.name}: {prompt[:60]!r}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            self.hits += 1
+            return entries[min(position, len(entries) - 1)]
+
+    def rewind(self):
+        """Vuelve a reproducir cada prompt desde su primera respuesta"""
+        with self._lock:
+            self._positions.clear()
+
+    # Escritura
+
+    def record(self, prompt: str, content: str, provider: Optional[str] = None,
+               latency: Optional[float] = None, first_token: Optional[float] = None):
+        """Agrega una respuesta (se escribe a disco por bloques de flush_every)"""
+        entry: Dict[str, Any] = {'k': prompt_key(prompt), 'c': content}
+        if provider:
+            entry['p'] = provider
+        if latency is not None:
+            entry['t'] = round(latency, 4)
+        if first_token is not None:
+            entry['f'] = round(first_token, 4)
+        with self._lock:
+            self._entries.setdefault(entry['k'], []).append(entry)
+            self._pending.append(entry)
+            self.provider = self.provider or provider
+            self.recorded += 1
+            flush = len(self._pending) >= self.flush_every
+        if flush:
+            self.flush()
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=9)
+
+    def flush(self):
+        """Escribe las entradas pendientes como un bloque nuevo al final del archivo"""
+        with self._lock:
+            if not self._pending:
+                return
+            lines = []
+            if not self.path.exists() or self.path.stat().st_size == 0:
+                lines.append(json.dumps({'cassette': CASSETTE_VERSION,
+                                         'created': datetime.now().isoformat()}))
+            lines.extend(json.dumps(entry, ensure_ascii=False) for entry in self._pending)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'ab') as file:
+                file.write(self._compress(('\n'.join(lines) + '\n').encode('utf-8')))
+            self._pending.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'path': str(self.path),
+                'compression': self.compression,
+                'prompts': len(self._entries),
+                'loaded': self.loaded,
+                'recorded': self.recorded,
+                'pending': len(self._pending),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class RecordingLLM(LLMWrapper):
+    """Cliente LLM que graba cada respuesta (y sus tiempos) en un cassette"""
+
+    def __init__(self, llm: Any, cassette: Cassette, provider: Optional[str] = None):
+        super().__init__(llm)
+        self.cassette = cassette
+        self.provider = provider
+
+    def _record(self, prompt: Any, content: Any, start: float, first_token: Optional[float] = None):
+        if isinstance(prompt, str) and isinstance(content, str):
+            self.cassette.record(prompt, content, self.provider, time.perf_counter() - start, first_token)
+
+    def invoke(self, prompt: str, **kwargs) -> Any:
+        start = time.perf_counter()
+        response = self.llm.invoke(prompt, **kwargs)
+        self._record(prompt, response.content, start)
+        return response
+
+    async def ainvoke(self, prompt: str, **kwargs) -> Any:
+        start = time.perf_counter()
+        response = await self.llm.ainvoke(prompt, **kwargs)
+        self._record(prompt, response.content, start)
+        return response
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[Any]:
+        start = time.perf_counter()
+        first_token = None
+        parts = []
+        for chunk in super().stream(prompt, **kwargs):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            parts.append(chunk.content)
+            yield chunk
+        # Solo se graba una respuesta completa
+        if all(isinstance(part, str) for part in parts):
+            self._record(prompt, ''.join(parts), start, first_token)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[Any]:
+        start = time.perf_counter()
+        first_token = None
+        parts = []
+        async for chunk in super().astream(prompt, **kwargs):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            parts.append(chunk.content)
+            yield chunk
+        if all(isinstance(part, str) for part in parts):
+            self._record(prompt, ''.join(parts), start, first_token)
+
+
+class ReplayLLM:
+    """Cliente LLM que responde desde un cassette (sin proveedor real)"""
+
+    temperature = 0
+
+    def __init__(self, cassette: Cassette, timed: bool = False):
+        """
+        Args:
+            cassette: Cassette grabado
+            timed: Si True, respeta la latencia total y la del primer token
+                   grabadas; si False, responde al instante
+        """
+        self.cassette = cassette
+        self.timed = timed
+        self.model_name = f"replay:{cassette.path.name}"
+
+    def _delays(self, entry: Dict[str, Any], chunks: int) -> tuple:
+        """(espera hasta el primer fragmento, espera entre fragmentos)"""
+        if not self.timed:
+            return 0.0, 0.0
+        total = entry.get('t', 0.0)
+        first = entry.get('f', total)
+        return first, max(total - first, 0.0) / max(chunks - 1, 1)
+
+    @staticmethod
+    def _chunks(content: str) -> List[str]:
+        words = content.split(' ')
+        return [word if i == 0 else ' ' + word for i, word in enumerate(words)]
+
+    def invoke(self, prompt: str, **kwargs) -> LLMResponse:
+        entry = self.cassette.next(prompt)
+        if self.timed:
+            time.sleep(entry.get('t', 0.0))
+        return LLMResponse(entry['c'], source='cassette')
+
+    async def ainvoke(self, prompt: str, **kwargs) -> LLMResponse:
+        entry = self.cassette.next(prompt)
+        if self.timed:
+            import asyncio
+            await asyncio.sleep(entry.get('t', 0.0))
+        return LLMResponse(entry['c'], source='cassette')
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[LLMResponse]:
+        entry = self.cassette.next(prompt)
+        chunks = self._chunks(entry['c'])
+        first, between = self._delays(entry, len(chunks))
+        time.sleep(first)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(between)
+            yield LLMResponse(chunk, source='cassette')
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[LLMResponse]:
+        import asyncio
+
+        entry = self.cassette.next(prompt)
+        chunks = self._chunks(entry['c'])
+        first, between = self._delays(entry, len(chunks))
+        await asyncio.sleep(first)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(between)
+            yield LLMResponse(chunk, source='cassette')
+
+
+_cassettes: Dict[Path, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def open_cassette(path: Union[str, Path]) -> Cassette:
+    """Cassette compartido del proceso para esa ruta (varios motores graban en el mismo)"""
+    resolved = Path(path).resolve()
+    with _cassettes_lock:
+        cassette = _cassettes.get(resolved)
+        if cassette is None:
+            cassette = _cassettes[resolved] = Cassette(resolved)
+        return cassette
@@ -0,0 +1,237 @@
+"""
+HedgedLLM - Peticiones "hedged" entre dos proveedores LLM
+
+Si el proveedor primario no responde antes de un plazo, se envía el mismo
+prompt al secundario y se usa la primera respuesta que llegue. El plazo sale
+del percentil (p95 por defecto) del histograma de latencias del primario, así
+que solo se duplican las llamadas de la cola lenta. Si el primario falla antes
+del plazo, se pasa al secundario de inmediato.
+
+Los histogramas son por proveedor y compartidos por el proceso: todas las
+sesiones aprenden de las latencias observadas. También lo es el pool de
+hilos de las llamadas síncronas; el plazo empieza a contar cuando el
+primario arranca, no mientras espera un hilo libre.
+"""
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from agent_core.llm_wrappers import LLMResponse, LLMWrapper
+
+
+class LatencyHistogram:
+    """Histograma de latencias con buckets logarítmicos (1 ms a 2 min)"""
+
+    BOUNDS = np.geomspace(0.001, 120.0, 64).tolist()
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.counts[bisect_left(self.BOUNDS, seconds)] += 1
+            self.count += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Límite superior del bucket que contiene el percentil q (None sin datos)"""
+        with self._lock:
+            if not self.count:
+                return None
+            target = self.count * q / 100
+            seen = 0
+            for index, bucket in enumerate(self.counts):
+                seen += bucket
+                if seen >= target:
+                    return self.BOUNDS[min(index, len(self.BOUNDS) - 1)]
+        return self.BOUNDS[-1]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = threading.Lock()
+
+
+def get_latency_histogram(provider: str) -> LatencyHistogram:
+    """Histograma compartido de un proveedor"""
+    with _histograms_lock:
+        if provider not in _histograms:
+            _histograms[provider] = LatencyHistogram()
+        return _histograms[provider]
+
+
+HEDGE_POOL_WORKERS = 32
+
+_default_pool: Optional[ThreadPoolExecutor] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_hedge_pool() -> ThreadPoolExecutor:
+    """Pool de hilos compartido por todos los HedgedLLM síncronos del proceso"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ThreadPoolExecutor(max_workers=HEDGE_POOL_WORKERS,
+                                               thread_name_prefix='llm-hedge')
+        return _default_pool
+
+
+class HedgedLLM(LLMWrapper):
+    """
+    Cliente LLM que reenvía al secundario las llamadas lentas del primario.
+
+    Con pocas muestras (< min_samples) el plazo es default_deadline. En la
+    versión asíncrona el perdedor se cancela; en la síncrona se descarta su
+    respuesta (un hilo bloqueado en HTTP no se puede interrumpir). El
+    streaming usa solo el primario.
+    """
+
+    def __init__(self, primary: Any, secondary: Any, primary_name: str, secondary_name: str,
+                 percentile: float = 95, min_samples: int = 20, default_deadline: float = 5.0,
+                 histograms: Optional[Dict[str, LatencyHistogram]] = None,
+                 pool: Optional[ThreadPoolExecutor] = None):
+        """
+        Args:
+            primary: Cliente principal (recibe todas las llamadas)
+            secondary: Cliente de respaldo (solo llamadas lentas o fallidas)
+            primary_name, secondary_name: Proveedores, para los histogramas
+            percentile: Percentil de latencia del primario usado como plazo
+            min_samples: Muestras necesarias antes de confiar en el histograma
+            default_deadline: Plazo (segundos) mientras no hay suficientes muestras
+            histograms: Histogramas por proveedor (por defecto los compartidos)
+            pool: Hilos de las llamadas síncronas (por defecto get_hedge_pool())
+        """
+        super().__init__(primary)
+        self.secondary = secondary
+        self.names = (primary_name, secondary_name)
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_deadline = default_deadline
+        self._histograms = histograms
+        self._pool = pool
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.hedged = 0
+        self.secondary_wins = 0
+        self.failovers = 0
+
+    def histogram(self, provider: str) -> LatencyHistogram:
+        if self._histograms is None:
+            return get_latency_histogram(provider)
+        return self._histograms.setdefault(provider, LatencyHistogram())
+
+    def deadline(self) -> float:
+        """Segundos de espera al primario antes de lanzar la llamada de respaldo"""
+        histogram = self.histogram(self.names[0])
+        if histogram.count < self.min_samples:
+            return self.default_deadline
+        return histogram.percentile(self.percentile)
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _timed(self, client: Any, name: str, prompt: str, kwargs: Dict,
+               started: Optional[threading.Event] = None) -> Any:
+        if started is not None:
+            started.set()
+        start = time.perf_counter()
+        response = client.invoke(prompt, **kwargs)
+        self.histogram(name).record(time.perf_counter() - start)
+        return response
+
+    async def _atimed(self, client: Any, name: str, prompt: str, kwargs: Dict) -> Any:
+        start = time.perf_counter()
+        try:
+            response = await client.ainvoke(prompt, **kwargs)
+        except asyncio.CancelledError:
+            # El perdedor cancelado aporta una cota inferior de su latencia
+            self.histogram(name).record(time.perf_counter() - start)
+            raise
+        self.histogram(name).record(time.perf_counter() - start)
+        return response
+
+    def invoke(self, prompt: str, **kwargs) -> Any:
+        self._count('calls')
+        pool = self._pool or get_hedge_pool()
+        started = threading.Event()
+        primary = pool.submit(self._timed, self.llm, self.names[0], prompt, kwargs, started)
+        # El tiempo en la cola del pool no cuenta para el plazo
+        started.wait()
+        done, _ = wait([primary], timeout=self.deadline())
+        if done and primary.exception() is None:
+            return primary.result()
+
+        if done:
+            self._count('failovers')
+        else:
+            self._count('hedged')
+        secondary = pool.submit(self._timed, self.secondary, self.names[1], prompt, kwargs)
+        pending = {primary, secondary} - done
+        error = primary.exception() if done else None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is secondary:
+                        self._count('secondary_wins')
+                        return LLMResponse(future.result().content, source='hedge')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def ainvoke(self, prompt: str, **kwargs) -> Any:
+        self._count('calls')
+        primary = asyncio.ensure_future(self._atimed(self.llm, self.names[0], prompt, kwargs))
+        done, _ = await asyncio.wait([primary], timeout=self.deadline())
+        if done and primary.exception() is None:
+            return primary.result()
+
+        if done:
+            self._count('failovers')
+        else:
+            self._count('hedged')
+        secondary = asyncio.ensure_future(self._atimed(self.secondary, self.names[1], prompt, kwargs))
+        pending = {primary, secondary} - done
+        error = primary.exception() if done else None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self._count('secondary_wins')
+                            return LLMResponse(task.result().content, source='hedge')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Llamadas, respaldos lanzados/ganados y latencias por proveedor"""
+        return {
+            'calls': self.calls,
+            'hedged': self.hedged,
+            'secondary_wins': self.secondary_wins,
+            'failovers': self.failovers,
+            'deadline': self.deadline(),
+            'latency': {name: self.histogram(name).stats() for name in self.names},
+        }
@@ -0,0 +1,396 @@
+"""
+AdmissionController - Control de admisión de llamadas al LLM por proveedor
+
+Con muchos usuarios simultáneos, llamar al proveedor de inmediato termina en
+errores 429 que los motores convierten en respuestas simuladas. Cada
+proveedor tiene un controlador compartido por el proceso que admite una
+llamada solo si:
+- Hay lugar entre las llamadas en vuelo (max_in_flight)
+- El token bucket de requests por minuto (rpm) tiene saldo
+- El token bucket de tokens por minuto (tpm) cubre el costo estimado
+
+Las llamadas que no entran esperan en una cola FIFO (hilos y corrutinas en la
+misma cola, en orden de llegada) hasta max_wait segundos. Así una ráfaga
+consume la cuota completa en lugar de fallar.
+"""
+from collections import deque
+from typing import Any, Dict, Iterator, AsyncIterator, Optional
+import threading
+import time
+
+from agent_core.llm_hedging import LatencyHistogram
+from agent_core.llm_wrappers import LLMWrapper
+
+DEFAULT_LIMITS = {
+    'max_in_flight': 8,
+    'rpm': None,
+    'tpm': None,
+    'max_wait': 30.0,
+}
+
+
+class AdmissionTimeout(Exception):
+    """La llamada esperó en la cola más que max_wait"""
+
+
+class TokenBucket:
+    """Token bucket con recarga continua de `per_minute` unidades por minuto"""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.available = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Segundos hasta que haya saldo para amount (0 si ya lo hay)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) * 60 / self.per_minute
+
+    def consume(self, amount: float):
+        """Descuenta amount (puede quedar negativo al corregir con el uso real)"""
+        self.available -= min(amount, self.capacity)
+
+
+class _Waiter:
+    __slots__ = ('cost', 'admitted', 'event', 'future', 'loop')
+
+    def __init__(self, cost: int):
+        self.cost = cost
+        self.admitted = False
+        self.event: Optional[threading.Event] = None
+        self.future = None
+        self.loop = None
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        elif self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """Límite de concurrencia + token buckets rpm/tpm con cola FIFO acotada"""
+
+    def __init__(self, provider: str, max_in_flight: int = 8, rpm: Optional[float] = None,
+                 tpm: Optional[float] = None, max_wait: float = 30.0):
+        """
+        Args:
+            provider: Nombre del proveedor (para métricas)
+            max_in_flight: Llamadas simultáneas máximas
+            rpm: Requests por minuto (None = sin límite)
+            tpm: Tokens por minuto (None = sin límite)
+            max_wait: Segundos máximos de espera en la cola
+        """
+        self.provider = provider
+        self._lock = threading.Lock()
+        self._queue: deque = deque()
+        self.in_flight = 0
+        self._blocked_until = 0.0
+        self.configure(max_in_flight=max_in_flight, rpm=rpm, tpm=tpm, max_wait=max_wait)
+
+        self.admitted = 0
+        self.timeouts = 0
+        self.throttled = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.wait_histogram = LatencyHistogram()
+
+    def configure(self, max_in_flight: int = 8, rpm: Optional[float] = None,
+                  tpm: Optional[float] = None, max_wait: float = 30.0):
+        """Cambia los límites (las llamadas en vuelo no se interrumpen)"""
+        with self._lock:
+            self.max_in_flight = max_in_flight
+            self.max_wait = max_wait
+            self.rpm = TokenBucket(rpm) if rpm else None
+            self.tpm = TokenBucket(tpm) if tpm else None
+            self._dispatch()
+
+    @property
+    def limits_tokens(self) -> bool:
+        """True si hay límite de tokens por minuto (hace falta estimar costos)"""
+        return self.tpm is not None
+
+    def _dispatch(self, caller: Optional[_Waiter] = None) -> Optional[float]:
+        """
+        Admite a los primeros de la cola mientras haya capacidad (con el lock).
+
+        Si el primero tiene que esperar la recarga de los buckets se lo
+        despierta (salvo que sea quien llama) para que duerma ese tiempo.
+
+        Returns:
+            Segundos hasta que el primero pueda entrar por recarga de los
+            buckets, o None si espera a que termine una llamada (o no hay cola)
+        """
+        while self._queue:
+            if self.in_flight >= self.max_in_flight:
+                return None
+            head = self._queue[0]
+            now = time.monotonic()
+            delay = max(self._blocked_until - now, 0.0)
+            if self.rpm is not None:
+                delay = max(delay, self.rpm.delay(1, now))
+            if self.tpm is not None:
+                delay = max(delay, self.tpm.delay(head.cost, now))
+            if delay > 0:
+                if head is not caller:
+                    head.wake()
+                return delay
+
+            self._queue.popleft()
+            self.in_flight += 1
+            if self.rpm is not None:
+                self.rpm.consume(1)
+            if self.tpm is not None:
+                self.tpm.consume(head.cost)
+            head.admitted = True
+            self.admitted += 1
+            head.wake()
+        return None
+
+    def _poll(self, waiter: _Waiter, deadline: float) -> Optional[float]:
+        """
+        Intenta admitir la cola y prepara la próxima espera del waiter (con el lock).
+
+        Returns:
+            Segundos a dormir, o None si el waiter ya fue admitido
+
+        Raises:
+            AdmissionTimeout: si se venció su plazo (sale de la cola)
+        """
+        delay = self._dispatch(waiter)
+        if waiter.admitted:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._queue.remove(waiter)
+            self.timeouts += 1
+            self._dispatch()
+            raise AdmissionTimeout(f"{self.provider}: sin turno tras {self.max_wait:.1f}s en cola")
+        # Solo el primero de la cola espera la recarga; el resto, a que lo despierten
+        if delay and self._queue[0] is waiter:
+            return min(delay, remaining)
+        return remaining
+
+    def _enqueue(self, waiter: _Waiter):
+        with self._lock:
+            self._queue.append(waiter)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+
+    def _record_wait(self, waited: float):
+        with self._lock:
+            self.total_wait += waited
+        self.wait_histogram.record(waited)
+
+    def acquire(self, cost: int = 0) -> float:
+        """
+        Espera turno (bloquea el hilo).
+
+        Returns:
+            Segundos de espera
+
+        Raises:
+            AdmissionTimeout: si no entró en max_wait segundos
+        """
+        start = time.monotonic()
+        waiter = _Waiter(cost)
+        waiter.event = threading.Event()
+        self._enqueue(waiter)
+        deadline = start + self.max_wait
+
+        while True:
+            with self._lock:
+                timeout = self._poll(waiter, deadline)
+                if timeout is None:
+                    break
+                waiter.event.clear()
+            waiter.event.wait(timeout)
+
+        waited = time.monotonic() - start
+        self._record_wait(waited)
+        return waited
+
+    async def aacquire(self, cost: int = 0) -> float:
+        """Versión asíncrona de acquire (no bloquea el event loop)"""
+        import asyncio
+
+        start = time.monotonic()
+        waiter = _Waiter(cost)
+        waiter.loop = asyncio.get_running_loop()
+        waiter.future = waiter.loop.create_future()
+        self._enqueue(waiter)
+        deadline = start + self.max_wait
+
+        try:
+            while True:
+                with self._lock:
+                    timeout = self._poll(waiter, deadline)
+                    if timeout is None:
+                        break
+                    if waiter.future.done():
+                        waiter.future = waiter.loop.create_future()
+                    future = waiter.future
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            # Una corrutina cancelada no debe quedarse con el turno
+            with self._lock:
+                admitted = waiter.admitted
+                if not admitted:
+                    self._queue.remove(waiter)
+                    self._dispatch()
+            if admitted:
+                self.release()
+            raise
+
+        waited = time.monotonic() - start
+        self._record_wait(waited)
+        return waited
+
+    def release(self, cost: int = 0, actual_tokens: Optional[int] = None):
+        """Libera el lugar; corrige el bucket de tokens con el uso real si se conoce"""
+        with self._lock:
+            self.in_flight -= 1
+            if self.tpm is not None and actual_tokens is not None:
+                self.tpm.consume(actual_tokens - cost)
+            self._dispatch()
+
+    def throttle(self, seconds: float):
+        """Frena las admisiones (p.ej. tras un 429 del proveedor)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self.throttled += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Profundidad de cola, llamadas en vuelo y tiempos de espera"""
+        with self._lock:
+            admitted = self.admitted
+            return {
+                'provider': self.provider,
+                'in_flight': self.in_flight,
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self.max_queue_depth,
+                'admitted': admitted,
+                'timeouts': self.timeouts,
+                'throttled': self.throttled,
+                'avg_wait': self.total_wait / admitted if admitted else 0.0,
+                'p95_wait': self.wait_histogram.percentile(95),
+            }
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True si la excepción del proveedor es un 429 / rate limit"""
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    text = str(error).lower()
+    return '429' in text or 'rate limit' in text
+
+
+class RateLimitedLLM(LLMWrapper):
+    """Cliente LLM que pide turno al AdmissionController antes de cada llamada"""
+
+    def __init__(self, llm: Any, controller: AdmissionController, output_tokens: int = 256):
+        """
+        Args:
+            llm: Cliente a proteger
+            controller: Controlador del proveedor del cliente
+            output_tokens: Tokens de respuesta estimados (para el límite tpm)
+        """
+        super().__init__(llm)
+        self.controller = controller
+        self.output_tokens = output_tokens
+
+    def _cost(self, prompt: Any) -> int:
+        if not self.controller.limits_tokens or not isinstance(prompt, str):
+            return 0
+        from agent_core.prompt_budget import get_token_counter
+        return get_token_counter().count(prompt) + self.output_tokens
+
+    def _failed(self, cost: int, error: BaseException):
+        self.controller.release(cost)
+        if is_rate_limit_error(error):
+            self.controller.throttle(float(getattr(error, 'retry_after', None) or 1.0))
+
+    @staticmethod
+    def _usage(response: Any) -> Optional[int]:
+        usage = getattr(response, 'usage_metadata', None)
+        return usage.get('total_tokens') if isinstance(usage, dict) else None
+
+    def invoke(self, prompt: str, **kwargs) -> Any:
+        cost = self._cost(prompt)
+        self.controller.acquire(cost)
+        try:
+            response = self.llm.invoke(prompt, **kwargs)
+        except BaseException as e:
+            self._failed(cost, e)
+            raise
+        self.controller.release(cost, self._usage(response))
+        return response
+
+    async def ainvoke(self, prompt: str, **kwargs) -> Any:
+        cost = self._cost(prompt)
+        await self.controller.aacquire(cost)
+        try:
+            response = await self.llm.ainvoke(prompt, **kwargs)
+        except BaseException as e:
+            self._failed(cost, e)
+            raise
+        self.controller.release(cost, self._usage(response))
+        return response
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[Any]:
+        # El lugar se ocupa durante todo el stream
+        cost = self._cost(prompt)
+        self.controller.acquire(cost)
+        try:
+            yield from super().stream(prompt, **kwargs)
+        except BaseException as e:
+            self._failed(cost, e)
+            raise
+        self.controller.release(cost)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[Any]:
+        cost = self._cost(prompt)
+        await self.controller.aacquire(cost)
+        try:
+            async for chunk in super().astream(prompt, **kwargs):
+                yield chunk
+        except BaseException as e:
+            self._failed(cost, e)
+            raise
+        self.controller.release(cost)
+
+
+_controllers: Dict[str, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_admission_controller(provider: str, limits: Optional[Dict[str, Any]] = None) -> AdmissionController:
+    """
+    Controlador compartido de un proveedor.
+
+    Si se pasan límites, reemplazan a los actuales (combinados con DEFAULT_LIMITS).
+    """
+    with _controllers_lock:
+        controller = _controllers.get(provider)
+        if controller is None:
+            controller = _controllers[provider] = AdmissionController(
+                provider, **dict(DEFAULT_LIMITS, **(limits or {}))
+            )
+        elif limits:
+            controller.configure(**dict(DEFAULT_LIMITS, **limits))
+        return controller
@@ -0,0 +1,156 @@
+"""
+LLMRegistry - Clientes LLM compartidos por todo el proceso
+
+Construir un ChatOpenAI/ChatAnthropic crea su propio pool de conexiones HTTP,
+así que hacerlo por agente repite handshakes TLS y validaciones en cada
+sesión. El registro crea un único cliente (keep-alive) por configuración
+(proveedor, modelo, temperatura) y lo entrega a todos los agentes; cambiar de
+proveedor es tomar otro cliente ya construido.
+"""
+from typing import Any, Dict, Optional, Tuple
+import os
+import threading
+
+# Modelo por defecto de cada proveedor
+DEFAULT_MODELS = {
+    'openai': 'gpt-4',
+    'claude': 'claude-3-5-sonnet-20240620',
+    'fake': 'fake-llm',
+}
+
+PROVIDER_NAMES = {
+    'openai': 'OpenAI GPT-4',
+    'claude': 'Anthropic Claude 3.5 Sonnet',
+    'fake': 'LLM falso (pruebas de carga)',
+}
+
+API_KEY_VARS = {
+    'openai': 'OPENAI_API_KEY',
+    'claude': 'ANTHROPIC_API_KEY',
+}
+
+
+def resolve_provider(provider: str) -> Optional[str]:
+    """Proveedor concreto para "auto" según las API keys del entorno (None si no hay)"""
+    if provider != "auto":
+        return provider
+    if os.getenv("ANTHROPIC_API_KEY"):
+        print("🔍 Auto-detectado: Claude API key disponible")
+        return "claude"
+    if os.getenv("OPENAI_API_KEY"):
+        print("🔍 Auto-detectado: OpenAI API key disponible")
+        return "openai"
+    print("⚠️ No se encontró OPENAI_API_KEY ni ANTHROPIC_API_KEY")
+    return None
+
+
+class LLMRegistry:
+    """Un cliente por (proveedor, modelo, temperatura), creado al primer uso"""
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, str, float], Any] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def get(self, provider: str, model: Optional[str] = None, temperature: float = 0) -> Optional[Any]:
+        """
+        Cliente compartido del proveedor.
+
+        Args:
+            provider: "openai", "claude" o "fake"
+            model: Modelo (por defecto el de DEFAULT_MODELS)
+            temperature: Temperatura del cliente
+
+        Returns:
+            Cliente con invoke/ainvoke/stream, o None si no se pudo crear
+            (falta la API key o el paquete); los fallos no se memorizan
+        """
+        if provider not in DEFAULT_MODELS:
+            print(f"⚠️ Proveedor desconocido: {provider}")
+            return None
+        key = (provider, model or DEFAULT_MODELS[provider], temperature)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.reused += 1
+                return client
+            client = self._build(*key)
+            if client is not None:
+                self._clients[key] = client
+                self.created += 1
+            return client
+
+    def _build(self, provider: str, model: str, temperature: float) -> Optional[Any]:
+        # Proveedor falso con latencia y errores inyectados (ver fake_llm)
+        if provider == "fake":
+            from agent_core.fake_llm import FakeLLM
+            try:
+                client = FakeLLM.from_env()
+            except (ValueError, TypeError) as e:
+                print(f"⚠️ FAKE_LLM_CONFIG inválida: {e}")
+                return None
+            print(f"✅ LLM inicializado: {PROVIDER_NAMES[provider]}")
+            return client
+
+        api_key = os.getenv(API_KEY_VARS[provider])
+        if not api_key:
+            print(f"⚠️ {API_KEY_VARS[provider]} no configurada")
+            return None
+
+        # Inicializar OpenAI
+        if provider == "openai":
+            try:
+                from langchain_openai import ChatOpenAI
+                client = ChatOpenAI(model=model, temperature=temperature, api_key=api_key)
+            except ImportError:
+                print("⚠️ langchain no instalado")
+                return None
+            except Exception as e:
+                print(f"⚠️ Error inicializando OpenAI: {e}")
+                return None
+
+        # Inicializar Claude
+        else:
+            try:
+                from langchain_anthropic import ChatAnthropic
+                client = ChatAnthropic(model=model, temperature=temperature, anthropic_api_key=api_key)
+            except ImportError:
+                print("⚠️ anthropic no instalado. Instala con: pip install anthropic")
+                return None
+            except Exception as e:
+                print(f"⚠️ Error inicializando Claude: {e}")
+                return None
+
+        print(f"✅ LLM inicializado: {PROVIDER_NAMES[provider]}")
+        return client
+
+    def register(self, provider: str, client: Any, model: Optional[str] = None, temperature: float = 0):
+        """Registra un cliente ya construido (p.ej. con otra configuración HTTP)"""
+        with self._lock:
+            self._clients[(provider, model or DEFAULT_MODELS.get(provider, ''), temperature)] = client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'clients': sorted(f"{provider}:{model}" for provider, model, _ in self._clients),
+                'created': self.created,
+                'reused': self.reused,
+            }
+
+
+_registry: Optional[LLMRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_llm_registry() -> LLMRegistry:
+    """Registro compartido del proceso"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = LLMRegistry()
+        return _registry
@@ -0,0 +1,264 @@
+"""
+SingleFlight - Una sola llamada al proveedor por prompt en vuelo
+
+Cuando varias sesiones mandan la misma consulta a la vez (p.ej. el mismo
+ejemplo de la demo), el caché de respuestas todavía no tiene la respuesta
+y cada una haría su propia llamada idéntica. CoalescedLLM agrupa las
+llamadas concurrentes con el mismo (proveedor, modelo, temperatura, prompt):
+la primera (líder) llama al proveedor y las demás esperan su resultado o su
+error. Funciona entre hilos y entre corrutinas (también mezclados).
+
+En streaming, el líder transmite sus fragmentos y los que esperan reciben la
+respuesta completa en un solo fragmento, como un acierto del caché. Si el
+líder abandona la llamada (stream cortado, corrutina cancelada), cada uno de
+los que esperaban hace su propia llamada.
+"""
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+import threading
+
+from agent_core.llm_cache import make_key
+from agent_core.llm_wrappers import LLMResponse, LLMWrapper, is_degraded, model_signature
+
+# El líder no terminó la llamada: cada uno la repite por su cuenta
+_ABANDONED = object()
+
+
+class _Flight:
+    """Una llamada en vuelo y quienes esperan su resultado"""
+
+    __slots__ = ('event', 'response', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response: Any = None
+        self.error: Any = None
+        self.waiters = []
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    """Llamadas en vuelo por clave, compartidas entre hilos y event loops"""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.leaders = 0
+        self.coalesced = 0
+
+    def join(self, key: str) -> Tuple[_Flight, bool]:
+        """(llamada en vuelo, True si quien llama es el líder y debe ejecutarla)"""
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            self.leaders += 1
+            return flight, True
+
+    def finish(self, key: str, flight: _Flight, response: Any = None, error: Any = None):
+        """Publica el resultado del líder y despierta a todos los que esperan"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.response, flight.error = response, error
+            flight.event.set()
+            waiters, flight.waiters = flight.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def wait(self, flight: _Flight):
+        flight.event.wait()
+
+    async def await_flight(self, flight: _Flight):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if flight.event.is_set():
+                return
+            future = loop.create_future()
+            flight.waiters.append((loop, future))
+        await future
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'provider_calls': self.leaders,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._flights),
+            }
+
+
+def _outcome(flight: _Flight) -> Optional[Any]:
+    """Respuesta del líder; None si la abandonó; levanta su error si falló"""
+    if flight.error is _ABANDONED:
+        return None
+    if flight.error is not None:
+        raise flight.error
+    return flight.response
+
+
+class CoalescedLLM(LLMWrapper):
+    """
+    Cliente LLM que comparte las llamadas idénticas en vuelo.
+
+    Como el caché, solo agrupa llamadas deterministas (temperature 0 o no
+    declarada) y sin argumentos extra.
+    """
+
+    def __init__(self, llm: Any, group: SingleFlight, provider: Optional[str] = None):
+        super().__init__(llm)
+        self.group = group
+        self.provider, self.model, self.temperature = model_signature(llm, provider)
+        self.enabled = not self.temperature
+
+    def _key(self, prompt: Any, kwargs: Dict) -> Optional[str]:
+        if not self.enabled or kwargs or not isinstance(prompt, str):
+            return None
+        return make_key(self.provider, self.model, self.temperature, prompt)
+
+    def invoke(self, prompt: str, **kwargs) -> Any:
+        key = self._key(prompt, kwargs)
+        if key is None:
+            return self.llm.invoke(prompt, **kwargs)
+
+        flight, leader = self.group.join(key)
+        if not leader:
+            self.group.wait(flight)
+            response = _outcome(flight)
+            return response if response is not None else self.llm.invoke(prompt)
+
+        try:
+            response = self.llm.invoke(prompt)
+        except Exception as e:
+            self.group.finish(key, flight, error=e)
+            raise
+        except BaseException:
+            self.group.finish(key, flight, error=_ABANDONED)
+            raise
+        self.group.finish(key, flight, response)
+        return response
+
+    async def ainvoke(self, prompt: str, **kwargs) -> Any:
+        key = self._key(prompt, kwargs)
+        if key is None:
+            return await self.llm.ainvoke(prompt, **kwargs)
+
+        flight, leader = self.group.join(key)
+        if not leader:
+            await self.group.await_flight(flight)
+            response = _outcome(flight)
+            return response if response is not None else await self.llm.ainvoke(prompt)
+
+        import asyncio
+
+        # La llamada sigue aunque se cancele el líder: otros pueden estar esperándola
+        task = asyncio.ensure_future(self.llm.ainvoke(prompt))
+
+        def publish(task):
+            if task.cancelled():
+                self.group.finish(key, flight, error=_ABANDONED)
+            elif task.exception() is not None:
+                self.group.finish(key, flight, error=task.exception())
+            else:
+                self.group.finish(key, flight, task.result())
+
+        task.add_done_callback(publish)
+        return await asyncio.shield(task)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[Any]:
+        key = self._key(prompt, kwargs)
+        if key is None:
+            yield from super().stream(prompt, **kwargs)
+            return
+
+        flight, leader = self.group.join(key)
+        if not leader:
+            self.group.wait(flight)
+            response = _outcome(flight)
+            if response is not None:
+                yield response
+            else:
+                yield from super().stream(prompt)
+            return
+
+        parts = []
+        source = 'coalesced'
+        published = False
+        try:
+            for chunk in super().stream(prompt):
+                parts.append(chunk.content)
+                if is_degraded(chunk):
+                    source = chunk.source
+                yield chunk
+        except Exception as e:
+            self.group.finish(key, flight, error=e)
+            published = True
+            raise
+        else:
+            if all(isinstance(part, str) for part in parts):
+                self.group.finish(key, flight, LLMResponse(''.join(parts), source=source))
+                published = True
+        finally:
+            if not published:
+                self.group.finish(key, flight, error=_ABANDONED)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[Any]:
+        key = self._key(prompt, kwargs)
+        if key is None:
+            async for chunk in super().astream(prompt, **kwargs):
+                yield chunk
+            return
+
+        flight, leader = self.group.join(key)
+        if not leader:
+            await self.group.await_flight(flight)
+            response = _outcome(flight)
+            if response is not None:
+                yield response
+            else:
+                async for chunk in super().astream(prompt):
+                    yield chunk
+            return
+
+        parts = []
+        source = 'coalesced'
+        published = False
+        try:
+            async for chunk in super().astream(prompt):
+                parts.append(chunk.content)
+                if is_degraded(chunk):
+                    source = chunk.source
+                yield chunk
+        except Exception as e:
+            self.group.finish(key, flight, error=e)
+            published = True
+            raise
+        else:
+            if all(isinstance(part, str) for part in parts):
+                self.group.finish(key, flight, LLMResponse(''.join(parts), source=source))
+                published = True
+        finally:
+            if not published:
+                self.group.finish(key, flight, error=_ABANDONED)
+
+
+_default_group: Optional[SingleFlight] = None
+_default_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Grupo compartido del proceso (agrupa llamadas de todos los agentes)"""
+    global _default_group
+    with _default_lock:
+        if _default_group is None:
+            _default_group = SingleFlight()
+        return _default_group
@@ -0,0 +1,85 @@
+"""
+Base común para las capas que envuelven al cliente LLM (caché, límites, ...)
+
+Cada capa expone la misma interfaz que usan los motores de razonamiento
+(invoke / ainvoke retornando un objeto con .content, y stream / astream
+produciendo fragmentos con .content) y delega el resto de
+atributos al cliente envuelto, de modo que se pueden apilar libremente.
+"""
+from typing import Any, AsyncIterator, Iterator, Optional
+
+# Respuestas que no vienen del proveedor primario: no se memorizan con su clave
+DEGRADED_SOURCES = frozenset({'stale_cache', 'fallback', 'hedge'})
+
+
+class LLMResponse:
+    """Respuesta mínima compatible con los mensajes de langchain (.content)"""
+
+    __slots__ = ('content', 'source')
+
+    def __init__(self, content: str, source: Optional[str] = None):
+        self.content = content
+        self.source = source
+
+    def __repr__(self) -> str:
+        return f"LLMResponse({len(self.content)} caracteres, source={self.source})"
+
+
+def is_degraded(response: Any) -> bool:
+    """True si la respuesta vino del caché vencido o de otro proveedor"""
+    return getattr(response, 'source', None) in DEGRADED_SOURCES
+
+
+class LLMWrapper:
+    """
+    Capa transparente sobre un cliente LLM.
+
+    Las subclases sobreescriben invoke/ainvoke; cualquier otro atributo
+    (model_name, temperature, ...) se resuelve en el cliente envuelto.
+    """
+
+    def __init__(self, llm: Any):
+        self.llm = llm
+
+    def invoke(self, prompt: str, **kwargs) -> Any:
+        return self.llm.invoke(prompt, **kwargs)
+
+    async def ainvoke(self, prompt: str, **kwargs) -> Any:
+        return await self.llm.ainvoke(prompt, **kwargs)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[Any]:
+        """Fragmentos de la respuesta (uno solo si el cliente no hace streaming)"""
+        if hasattr(self.llm, 'stream'):
+            yield from self.llm.stream(prompt, **kwargs)
+        else:
+            yield self.llm.invoke(prompt, **kwargs)
+
+    async def astream(self, prompt: str, **kwargs) -> AsyncIterator[Any]:
+        if hasattr(self.llm, 'astream'):
+            async for chunk in self.llm.astream(prompt, **kwargs):
+                yield chunk
+        else:
+            yield await self.llm.ainvoke(prompt, **kwargs)
+
+    @property
+    def inner(self) -> Any:
+        """Cliente real (sin ninguna capa)"""
+        llm = self.llm
+        while isinstance(llm, LLMWrapper):
+            llm = llm.llm
+        return llm
+
+    def __getattr__(self, name: str) -> Any:
+        # Solo se llama si el atributo no existe en la capa
+        if name == 'llm':
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.llm!r})"
+
+
+def model_signature(llm: Any, provider: Optional[str] = None) -> tuple:
+    """(proveedor, modelo, temperatura) de un cliente LLM, con o sin capas"""
+    model = getattr(llm, 'model_name', None) or getattr(llm, 'model', None) or type(llm).__name__
+    return provider or '', str(model), getattr(llm, 'temperature', None)
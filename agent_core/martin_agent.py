@@ -3,13 +3,22 @@ M.A.R.T.I.N. Agent - Integración completa con sistema de confirmación mejorado
 """
 import sys
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional
 from datetime import datetime
 import re
 
 # Importar componentes core
-from agent_core.mode_selector import ModeSelector
-from agent_core.reasoning_engines import ReasoningEngines
+from agent_core.mode_selector import DecisionRecord, ModeSelector
+from agent_core.reasoning_engines import (
+    ReasoningEngines, SAFE_SINGLE, STREAM_MODE, STREAM_RESULT
+)
+
+def _json_default(obj: Any) -> Any:
+    """Serializa objetos estructurados del historial (p.ej. DecisionRecord)"""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"Objeto no serializable: {type(obj).__name__}")
+
 
 class MARTINAgent:
     """
@@ -23,15 +32,56 @@ class MARTINAgent:
     Soporta OpenAI (GPT-4) y Anthropic (Claude)
     """
     
-    def __init__(self, use_llm: bool = False, llm_provider: str = "auto", verbose: bool = True):
+    def __init__(self, use_llm: bool = False, llm_provider: str = "auto", verbose: bool = True,
+                 config_path: Optional[str] = None, watch_config: bool = False,
+                 safe_strategy: str = SAFE_SINGLE, hedge_provider: Optional[str] = None,
+                 rate_limits: Any = True, cassette: Any = None,
+                 cassette_mode: str = "replay", circuit_breaker: Any = True,
+                 fallback_provider: Optional[str] = None, similarity_cache: bool = False,
+                 similarity_threshold: Optional[float] = None, llm_cache: Any = True):
         """
         Args:
             use_llm: Si True, usa LLM real. Si False, usa respuestas simuladas.
-            llm_provider: "openai", "claude", o "auto" (detecta automáticamente)
+            llm_provider: "openai", "claude", "fake" (LLM falso para pruebas de
+                          carga) o "auto" (detecta automáticamente)
             verbose: Si True, imprime información de debug.
+            config_path: YAML con vocabularios/pesos/umbrales del ModeSelector
+                         (por defecto configs/config.yaml, si existe)
+            watch_config: Si True, recarga la configuración en caliente al cambiar el archivo
+            safe_strategy: "single" (plan + validación en una llamada) o "two_step"
+            hedge_provider: Proveedor de respaldo para las llamadas lentas
+                            ("openai"/"claude"); None lo desactiva
+            rate_limits: Límites de admisión por proveedor, p.ej.
+                         {"openai": {"max_in_flight": 4, "rpm": 500, "tpm": 30000}};
+                         False los desactiva
+            cassette: Archivo de llamadas al LLM grabadas (ver llm_cassette)
+            cassette_mode: "record", "replay" o "replay_timed"
+            circuit_breaker: Configuración del circuit breaker por proveedor,
+                             p.ej. {"openai": {"failure_threshold": 3}};
+                             False lo desactiva
+            fallback_provider: Proveedor que responde mientras el primario
+                               tiene el circuito abierto (por defecto hedge_provider)
+            similarity_cache: Si True, reutiliza respuestas informativas de
+                              tareas casi idénticas (mismos números, estándares
+                              y negaciones)
+            similarity_threshold: Similitud mínima para reutilizar una respuesta
+            llm_cache: Caché de respuestas del LLM (True = el compartido del
+                       proceso, un LLMResponseCache, o False)
         """
         self.mode_selector = ModeSelector()
-        self.reasoning = ReasoningEngines(use_llm=use_llm, llm_provider=llm_provider)
+        self.config_watcher = None
+        self._load_selector_config(config_path, watch_config)
+        self.reasoning = ReasoningEngines(use_llm=use_llm, llm_provider=llm_provider,
+                                          safe_strategy=safe_strategy,
+                                          hedge_provider=hedge_provider,
+                                          rate_limits=rate_limits,
+                                          cassette=cassette, cassette_mode=cassette_mode,
+                                          circuit_breaker=circuit_breaker,
+                                          fallback_provider=fallback_provider,
+                                          llm_cache=llm_cache,
+                                          similarity_cache=similarity_cache,
+                                          similarity_threshold=similarity_threshold,
+                                          mode_selector=self.mode_selector)
         self.conversation_history = []
         self.verbose = verbose
         self.use_llm = use_llm
@@ -54,6 +104,38 @@ class MARTINAgent:
                 print(f"   Modo: Simulado (sin API key)")
             print("="*50)
     
+    def switch_llm(self, provider: str) -> bool:
+        """
+        Cambia el proveedor LLM conservando sesión, historial y configuración.
+        
+        Returns:
+            True si el cambio se hizo; False si el proveedor no está disponible
+        """
+        if not self.reasoning.set_provider(provider):
+            return False
+        self.use_llm = True
+        self.llm_provider = provider
+        return True
+    
+    def _load_selector_config(self, config_path: Optional[str], watch_config: bool):
+        """Carga la configuración del ModeSelector y, si se pide, la vigila"""
+        from agent_core.selector_config import DEFAULT_CONFIG_PATH
+        
+        path = config_path or DEFAULT_CONFIG_PATH
+        if not os.path.exists(path):
+            if config_path:
+                print(f"⚠️ No existe el archivo de configuración: {path}")
+            return
+        
+        try:
+            self.mode_selector.load_config(path)
+        except Exception as e:
+            print(f"⚠️ Error cargando configuración del ModeSelector ({path}): {e}")
+            return
+        
+        if watch_config:
+            self.config_watcher = self.mode_selector.watch_config(path)
+    
     def _is_confirmation(self, text: str) -> bool:
         """
         Detecta si el texto del usuario es una confirmación
@@ -143,109 +225,272 @@ class MARTINAgent:
             context: Contexto adicional (environment, user_role, etc.)
         
         Returns:
-            Dict con la respuesta estructurada
+            Dict con la respuesta estructurada. 'mode_explanation' es un
+            DecisionRecord (o un texto en confirmaciones); str() lo convierte
+            a la explicación legible.
         """
         if context is None:
             context = {}
         
         # ===== PASO 1: Verificar si hay acción pendiente =====
-        if self.pending_action is not None:
-            # Verificar si es una confirmación
-            if self._is_confirmation(user_input):
-                if self.verbose:
-                    print("✅ Confirmación detectada - ejecutando acción pendiente")
-                
-                # Ejecutar la acción pendiente en modo DIRECT
-                result = self.reasoning.direct_reasoning(
-                    self.pending_action['original_input'],
-                    self.pending_action['original_context']
-                )
-                
-                # Agregar metadata
-                result['confirmation'] = 'accepted'
-                result['mode_explanation'] = f"Acción previamente en MODO {self.pending_action['mode']} confirmada por usuario. Ejecutando..."
-                result['timestamp'] = datetime.now().isoformat()
-                result['interaction_id'] = len(self.conversation_history)
-                
-                # Limpiar pending action
-                self.pending_action = None
-                
-                # Guardar en historial
-                self.conversation_history.append({
-                    'input': user_input,
-                    'context': context,
-                    'result': result,
-                    'timestamp': result['timestamp'],
-                    'mode_selected': result['mode']
-                })
-                
-                if self.verbose:
-                    print(f"\n📤 ACCIÓN EJECUTADA")
-                    print(result['message'][:200] + "...")
-                    print(f"{'='*60}\n")
-                
-                return result
-            
-            # Verificar si es un rechazo
-            elif self._is_rejection(user_input):
-                if self.verbose:
-                    print("❌ Rechazo detectado - cancelando acción pendiente")
-                
-                result = {
-                    'mode': self.pending_action['mode'],
-                    'status': 'cancelled',
-                    'confirmation': 'rejected',
-                    'message': "❌ Acción cancelada por el usuario.\n\n¿En qué más puedo ayudarte?",
-                    'requires_user_action': False,
-                    'timestamp': datetime.now().isoformat(),
-                    'interaction_id': len(self.conversation_history),
-                    'mode_explanation': 'Usuario rechazó la acción pendiente'
-                }
-                
-                # Limpiar pending action
-                self.pending_action = None
-                
-                # Guardar en historial
-                self.conversation_history.append({
-                    'input': user_input,
-                    'context': context,
-                    'result': result,
-                    'timestamp': result['timestamp'],
-                    'mode_selected': result['mode']
-                })
-                
-                return result
-            
-            # Si no es ni confirmación ni rechazo, tratarlo como nueva consulta
-            else:
-                if self.verbose:
-                    print("💬 Nueva consulta detectada - limpiando acción pendiente")
-                self.pending_action = None
-                # Continuar con el procesamiento normal
+        pending = self._check_pending_action(user_input)
+        if pending == 'confirmed':
+            # Ejecutar la acción pendiente en modo DIRECT
+            result = self.reasoning.direct_reasoning(
+                self.pending_action['original_input'],
+                self.pending_action['original_context'],
+                features=self.pending_action.get('features')
+            )
+            return self._finish_confirmation(user_input, context, result)
+        if pending == 'rejected':
+            return self._finish_rejection(user_input, context)
         
         # ===== PASO 2: Procesar nueva consulta =====
+        features, decision = self._select_mode(user_input, context)
+        selected_mode = decision.selected_mode
+        
+        # Aplicar razonamiento según modo
+        if selected_mode == "PASSIVE":
+            result = self.reasoning.passive_reasoning(user_input, context, features=features)
+        elif selected_mode == "DIRECT":
+            result = self.reasoning.direct_reasoning(user_input, context, features=features)
+        else:  # SAFE
+            result = self.reasoning.safe_reasoning(user_input, context, features=features)
+        
+        return self._finish(user_input, context, decision, features, result)
+    
+    async def aprocess(self, user_input: str, context: Dict = None) -> Dict[str, Any]:
+        """
+        Versión asíncrona de process().
+        
+        Usa los motores asíncronos (ainvoke del proveedor), de modo que un
+        solo event loop puede atender muchas sesiones concurrentes sin
+        ocupar un hilo por request. El resultado es idéntico al de process().
+        """
+        if context is None:
+            context = {}
+        
+        pending = self._check_pending_action(user_input)
+        if pending == 'confirmed':
+            result = await self.reasoning.adirect_reasoning(
+                self.pending_action['original_input'],
+                self.pending_action['original_context'],
+                features=self.pending_action.get('features')
+            )
+            return self._finish_confirmation(user_input, context, result)
+        if pending == 'rejected':
+            return self._finish_rejection(user_input, context)
+        
+        features, decision = self._select_mode(user_input, context)
+        selected_mode = decision.selected_mode
+        
+        if selected_mode == "PASSIVE":
+            result = await self.reasoning.apassive_reasoning(user_input, context, features=features)
+        elif selected_mode == "DIRECT":
+            result = await self.reasoning.adirect_reasoning(user_input, context, features=features)
+        else:  # SAFE
+            result = await self.reasoning.asafe_reasoning(user_input, context, features=features)
+        
+        return self._finish(user_input, context, decision, features, result)
+    
+    def stream(self, user_input: str, context: Dict = None) -> Iterator[Dict[str, Any]]:
+        """
+        Versión en streaming de process().
+        
+        Fragmentos, en orden:
+            {"type": "mode", "mode": ..., "explanation": ...}   (modo elegido)
+            {"type": "token", "text": ...}   (texto incremental del LLM)
+            {"type": "result", "result": {...}}   (mismo dict que process())
+        
+        El historial y la acción pendiente se actualizan al emitir el
+        resultado, igual que en process().
+        """
+        if context is None:
+            context = {}
+        
+        pending = self._check_pending_action(user_input)
+        if pending == 'rejected':
+            yield {'type': STREAM_RESULT, 'result': self._finish_rejection(user_input, context)}
+            return
+        
+        if pending == 'confirmed':
+            action = self.pending_action
+            yield {'type': STREAM_MODE, 'mode': 'DIRECT', 'explanation': self._confirmation_explanation()}
+            chunks = self.reasoning.stream_reasoning(
+                'DIRECT', action['original_input'], action['original_context'],
+                features=action.get('features')
+            )
+            for chunk in chunks:
+                if chunk['type'] == STREAM_RESULT:
+                    chunk = {'type': STREAM_RESULT,
+                             'result': self._finish_confirmation(user_input, context, chunk['result'])}
+                yield chunk
+            return
+        
+        features, decision = self._select_mode(user_input, context)
+        selected_mode = decision.selected_mode
+        yield {'type': STREAM_MODE, 'mode': selected_mode, 'explanation': decision}
+        
+        for chunk in self.reasoning.stream_reasoning(selected_mode, user_input, context, features=features):
+            if chunk['type'] == STREAM_RESULT:
+                chunk = {'type': STREAM_RESULT,
+                         'result': self._finish(user_input, context, decision, features, chunk['result'])}
+            yield chunk
+    
+    async def astream(self, user_input: str, context: Dict = None) -> AsyncIterator[Dict[str, Any]]:
+        """Versión asíncrona de stream() (mismos fragmentos)"""
+        if context is None:
+            context = {}
+        
+        pending = self._check_pending_action(user_input)
+        if pending == 'rejected':
+            yield {'type': STREAM_RESULT, 'result': self._finish_rejection(user_input, context)}
+            return
+        
+        if pending == 'confirmed':
+            action = self.pending_action
+            yield {'type': STREAM_MODE, 'mode': 'DIRECT', 'explanation': self._confirmation_explanation()}
+            chunks = self.reasoning.astream_reasoning(
+                'DIRECT', action['original_input'], action['original_context'],
+                features=action.get('features')
+            )
+            async for chunk in chunks:
+                if chunk['type'] == STREAM_RESULT:
+                    chunk = {'type': STREAM_RESULT,
+                             'result': self._finish_confirmation(user_input, context, chunk['result'])}
+                yield chunk
+            return
+        
+        features, decision = self._select_mode(user_input, context)
+        selected_mode = decision.selected_mode
+        yield {'type': STREAM_MODE, 'mode': selected_mode, 'explanation': decision}
+        
+        async for chunk in self.reasoning.astream_reasoning(selected_mode, user_input, context, features=features):
+            if chunk['type'] == STREAM_RESULT:
+                chunk = {'type': STREAM_RESULT,
+                         'result': self._finish(user_input, context, decision, features, chunk['result'])}
+            yield chunk
+    
+    def _check_pending_action(self, user_input: str) -> Optional[str]:
+        """
+        Clasifica el input respecto a la acción pendiente.
+        
+        Returns:
+            'confirmed', 'rejected', o None (nueva consulta; descarta la
+            acción pendiente si la había)
+        """
+        if self.pending_action is None:
+            return None
+        
+        # Verificar si es una confirmación
+        if self._is_confirmation(user_input):
+            if self.verbose:
+                print("✅ Confirmación detectada - ejecutando acción pendiente")
+            return 'confirmed'
+        
+        # Verificar si es un rechazo
+        if self._is_rejection(user_input):
+            if self.verbose:
+                print("❌ Rechazo detectado - cancelando acción pendiente")
+            return 'rejected'
+        
+        # Si no es ni confirmación ni rechazo, tratarlo como nueva consulta
+        if self.verbose:
+            print("💬 Nueva consulta detectada - limpiando acción pendiente")
+        self.pending_action = None
+        return None
+    
+    def _finish_confirmation(self, user_input: str, context: Dict, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Completa la ejecución de una acción pendiente confirmada"""
+        # Agregar metadata
+        result['confirmation'] = 'accepted'
+        result['mode_explanation'] = self._confirmation_explanation()
+        result['timestamp'] = datetime.now().isoformat()
+        result['interaction_id'] = len(self.conversation_history)
+        
+        # Limpiar pending action
+        self.pending_action = None
+        
+        # Guardar en historial
+        self.conversation_history.append({
+            'input': user_input,
+            'context': context,
+            'result': result,
+            'timestamp': result['timestamp'],
+            'mode_selected': result['mode']
+        })
+        
+        if self.verbose:
+            print(f"\n📤 ACCIÓN EJECUTADA")
+            print(result['message'][:200] + "...")
+            print(f"{'='*60}\n")
+        
+        return result
+    
+    def _confirmation_explanation(self) -> str:
+        return f"Acción previamente en MODO {self.pending_action['mode']} confirmada por usuario. Ejecutando..."
+    
+    def _finish_rejection(self, user_input: str, context: Dict) -> Dict[str, Any]:
+        """Cancela la acción pendiente rechazada por el usuario"""
+        result = {
+            'mode': self.pending_action['mode'],
+            'status': 'cancelled',
+            'confirmation': 'rejected',
+            'message': "❌ Acción cancelada por el usuario.\n\n¿En qué más puedo ayudarte?",
+            'requires_user_action': False,
+            'timestamp': datetime.now().isoformat(),
+            'interaction_id': len(self.conversation_history),
+            'mode_explanation': 'Usuario rechazó la acción pendiente'
+        }
+        
+        # Limpiar pending action
+        self.pending_action = None
+        
+        # Guardar en historial
+        self.conversation_history.append({
+            'input': user_input,
+            'context': context,
+            'result': result,
+            'timestamp': result['timestamp'],
+            'mode_selected': result['mode']
+        })
+        
+        return result
+    
+    def _select_mode(self, user_input: str, context: Dict):
+        """
+        Analiza la tarea y selecciona el modo de razonamiento.
+        
+        Returns:
+            (features, DecisionRecord de esta decisión). El registro viaja
+            hasta el resultado: con el agente compartido entre sesiones,
+            last_decision() puede ser de otra sesión
+        """
         if self.verbose:
             print(f"\n{'='*60}")
             print(f"📥 INPUT: {user_input}")
             print(f"🌍 CONTEXT: {context}")
         
+        # Analizar la tarea una sola vez para selector, motores y tools,
+        # con una sola lectura del perfil (puede recargarse en caliente)
+        profile = self.mode_selector.profile
+        features = self.mode_selector.extract_features(user_input, profile)
+        
         # Seleccionar modo
-        selected_mode = self.mode_selector.select_mode(user_input, context)
+        decision = self.mode_selector.decide(user_input, context, features=features, profile=profile)
         
         if self.verbose:
-            print(f"\n🧠 MODO SELECCIONADO: {selected_mode}")
-            print(self.mode_selector.explain_last_decision())
+            print(f"\n🧠 MODO SELECCIONADO: {decision.selected_mode}")
+            print(decision.explain())
         
-        # Aplicar razonamiento según modo
-        if selected_mode == "PASSIVE":
-            result = self.reasoning.passive_reasoning(user_input, context)
-        elif selected_mode == "DIRECT":
-            result = self.reasoning.direct_reasoning(user_input, context)
-        else:  # SAFE
-            result = self.reasoning.safe_reasoning(user_input, context)
-        
-        # Agregar metadata
-        result['mode_explanation'] = self.mode_selector.explain_last_decision()
+        return features, decision
+    
+    def _finish(self, user_input: str, context: Dict, decision: DecisionRecord,
+                features, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Agrega metadata, guarda la acción pendiente y el historial"""
+        selected_mode = decision.selected_mode
+        # Agregar metadata (el DecisionRecord se convierte a texto solo al mostrarse)
+        result['mode_explanation'] = decision
         result['timestamp'] = datetime.now().isoformat()
         result['interaction_id'] = len(self.conversation_history)
         
@@ -255,6 +500,7 @@ class MARTINAgent:
                 'mode': selected_mode,
                 'original_input': user_input,
                 'original_context': context,
+                'features': features,
                 'result': result,
                 'timestamp': result['timestamp']
             }
@@ -313,7 +559,15 @@ class MARTINAgent:
             'modes_distribution': modes_used,
             'total_confirmations': confirmations,
             'has_pending_action': self.pending_action is not None,
-            'llm_provider': self.llm_provider or 'simulado'
+            'llm_provider': self.llm_provider or 'simulado',
+            'llm_cache': self.reasoning.llm_cache_stats(),
+            'similarity_cache': self.reasoning.similarity_cache_stats(),
+            'hedging': self.reasoning.hedging_stats(),
+            'rate_limits': self.reasoning.limiter_stats(),
+            'circuit_breaker': self.reasoning.breaker_stats(),
+            'coalescing': self.reasoning.coalescing_stats(),
+            'cassette': self.reasoning.cassette_stats(),
+            'prompt_tokens': self.reasoning.prompt_stats()
         }
     
     def export_conversation(self, format: str = 'json', filepath: str = None) -> str:
@@ -340,7 +594,7 @@ class MARTINAgent:
                     'timestamp': datetime.now().isoformat(),
                     'summary': self.get_session_summary(),
                     'conversation': self.conversation_history
-                }, f, indent=2, ensure_ascii=False)
+                }, f, indent=2, ensure_ascii=False, default=_json_default)
         
         elif format == 'markdown':
             with open(filepath, 'w', encoding='utf-8') as f:
@@ -0,0 +1,392 @@
+"""
+ModeClassifier - Clasificador de modo aprendido (hashing + modelo lineal en NumPy)
+
+Complementa las heurísticas de palabras clave del ModeSelector, que fallan
+con paráfrasis, sin pagar la latencia de una llamada al LLM. Se entrena
+offline con decision_logs exportados y conversaciones exportadas:
+
+    python -m agent_core.mode_classifier decisiones.jsonl martin_session_*.json \
+        --output models/mode_classifier
+
+El artefacto es un directorio con:
+    mode_classifier.json  -> metadatos (dimensión del hashing, n-gramas, modos)
+    weights.npy           -> matriz (n_features + 1, 3) float32; la última fila es el bias
+
+weights.npy se abre con memory-map: cargar el modelo no lee la matriz
+completa, solo las filas que tocan las tareas evaluadas.
+"""
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import argparse
+import json
+import re
+import time
+import unicodedata
+import zlib
+
+import numpy as np
+
+from agent_core.mode_evaluation import MODES
+
+METADATA_FILE = 'mode_classifier.json'
+WEIGHTS_FILE = 'weights.npy'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Semillas de CRC32 que separan los espacios de palabras, bigramas y n-gramas
+_WORD_SEED, _BIGRAM_SEED, _CHAR_SEED = 0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D
+
+
+def _accent_table() -> Dict[int, str]:
+    """Tabla para str.translate que quita tildes del rango latino"""
+    table = {}
+    for code in range(0xC0, 0x250):
+        base = ''.join(c for c in unicodedata.normalize('NFKD', chr(code)) if not unicodedata.combining(c))
+        if base and base != chr(code):
+            table[code] = base
+    return table
+
+
+_ACCENTS = _accent_table()
+
+
+class HashingVectorizer:
+    """
+    Convierte texto en índices y signos de un espacio de dimensión fija.
+
+    Usa unigramas y bigramas de palabras más n-gramas de caracteres de cada
+    palabra (robustos a conjugaciones: "elimina"/"eliminar"). El hash es
+    CRC32 con una semilla por tipo de término, estable entre procesos (a
+    diferencia de hash()).
+    """
+
+    def __init__(self, n_features: int = 2 ** 18, char_ngram: int = 4):
+        """
+        Args:
+            n_features: Dimensión del espacio de hashing
+            char_ngram: Tamaño de los n-gramas de caracteres (0 = deshabilitados)
+        """
+        self.n_features = n_features
+        self.char_ngram = char_ngram
+
+    def words(self, text: str) -> List[str]:
+        """Palabras del texto sin mayúsculas ni tildes"""
+        return _TOKEN_RE.findall(text.casefold().translate(_ACCENTS))
+
+    def hashes(self, text: str) -> List[int]:
+        """Hash CRC32 de cada término del texto"""
+        crc32 = zlib.crc32
+        words = [word.encode('utf-8') for word in self.words(text)]
+        hashes = [crc32(word, _WORD_SEED) for word in words]
+        hashes.extend(crc32(a + b' ' + b, _BIGRAM_SEED) for a, b in zip(words, words[1:]))
+
+        n = self.char_ngram
+        if n:
+            for word in words:
+                padded = b'<' + word + b'>'
+                if len(padded) <= n:
+                    hashes.append(crc32(padded, _CHAR_SEED))
+                else:
+                    hashes.extend(crc32(padded[i:i + n], _CHAR_SEED) for i in range(len(padded) - n + 1))
+        return hashes
+
+    def transform(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            (índices, signos) de los términos del texto
+        """
+        hashes = np.array(self.hashes(text), dtype=np.int64)
+        return hashes % self.n_features, np.where(hashes & 0x80000000, -1.0, 1.0)
+
+    def transform_batch(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Versión por lotes en formato disperso (fila, índice, signo).
+
+        Returns:
+            (filas, índices, signos) concatenados para todos los textos
+        """
+        rows, indices, signs = [], [], []
+        for row, text in enumerate(texts):
+            idx, sign = self.transform(text)
+            rows.append(np.full(len(idx), row, dtype=np.int64))
+            indices.append(idx)
+            signs.append(sign)
+        if not rows:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0, dtype=np.float64)
+        return np.concatenate(rows), np.concatenate(indices), np.concatenate(signs)
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return e / e.sum(axis=1, keepdims=True)
+
+
+def _logits(weights: np.ndarray, bias: np.ndarray, rows: np.ndarray,
+            indices: np.ndarray, signs: np.ndarray, n_rows: int) -> np.ndarray:
+    """
+    Logits (n_rows, n_modos) de un lote disperso.
+
+    bincount acumula en el orden de entrada, de modo que una tarea sola y la
+    misma tarea dentro de un lote producen exactamente los mismos valores.
+    """
+    n_modes = len(bias)
+    contributions = weights[indices] * signs[:, np.newaxis]
+    cells = (rows[:, np.newaxis] * n_modes + np.arange(n_modes)).ravel()
+    z = np.bincount(cells, weights=contributions.ravel(), minlength=n_rows * n_modes)
+    return z.reshape(n_rows, n_modes) + bias
+
+
+class ModeClassifier:
+    """
+    Modelo lineal multinomial sobre features hasheadas.
+
+    predict_proba retorna probabilidades en el orden de MODES
+    (PASSIVE, DIRECT, SAFE). El ModeSelector las combina con sus scores
+    heurísticos: risk <- P(SAFE), clarity <- 1 - P(PASSIVE).
+    """
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray,
+                 vectorizer: Optional[HashingVectorizer] = None,
+                 metadata: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            weights: Matriz (n_features, len(MODES)); puede ser un memmap
+            bias: Vector (len(MODES),)
+            vectorizer: Vectorizador usado en el entrenamiento
+            metadata: Información del entrenamiento (muestras, accuracy, ...)
+        """
+        self.vectorizer = vectorizer or HashingVectorizer(n_features=weights.shape[0])
+        if weights.shape != (self.vectorizer.n_features, len(MODES)):
+            raise ValueError(f"Forma de pesos inválida: {weights.shape}")
+        self.weights = weights
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.metadata = metadata or {}
+
+    def predict_proba(self, task: str) -> np.ndarray:
+        """Probabilidades (len(MODES),) para una tarea"""
+        indices, signs = self.vectorizer.transform(task)
+        rows = np.zeros(len(indices), dtype=np.int64)
+        return _softmax(_logits(self.weights, self.bias, rows, indices, signs, 1))[0]
+
+    def predict_proba_batch(self, tasks: Sequence[str]) -> np.ndarray:
+        """Probabilidades (n_tareas, len(MODES)) para un lote"""
+        rows, indices, signs = self.vectorizer.transform_batch(tasks)
+        return _softmax(_logits(self.weights, self.bias, rows, indices, signs, len(tasks)))
+
+    def predict(self, task: str) -> str:
+        """Modo más probable para una tarea"""
+        return MODES[int(np.argmax(self.predict_proba(task)))]
+
+    def predict_batch(self, tasks: Sequence[str]) -> List[str]:
+        """Modo más probable para cada tarea de un lote"""
+        if not tasks:
+            return []
+        return [MODES[i] for i in np.argmax(self.predict_proba_batch(tasks), axis=1).tolist()]
+
+    @classmethod
+    def train(cls, tasks: Sequence[str], labels: Sequence[str],
+              n_features: int = 2 ** 18, char_ngram: int = 4,
+              epochs: int = 30, learning_rate: float = 0.5, l2: float = 1e-6,
+              batch_size: int = 256, seed: int = 0) -> 'ModeClassifier':
+        """
+        Entrena una regresión logística multinomial con SGD por mini-lotes.
+
+        Args:
+            tasks: Instrucciones de entrenamiento
+            labels: Modo esperado de cada instrucción (valores de MODES)
+            n_features: Dimensión del espacio de hashing
+            char_ngram: Tamaño de los n-gramas de caracteres (0 = sin ellos)
+            epochs: Pasadas completas sobre los datos
+            learning_rate: Tasa de aprendizaje
+            l2: Regularización L2
+            batch_size: Tareas por mini-lote
+            seed: Semilla del barajado
+        """
+        if len(tasks) != len(labels):
+            raise ValueError("tasks y labels deben tener la misma longitud")
+        if not tasks:
+            raise ValueError("No hay datos de entrenamiento")
+
+        vectorizer = HashingVectorizer(n_features, char_ngram)
+        encoded = [vectorizer.transform(task) for task in tasks]
+        y = np.array([MODES.index(label) for label in labels], dtype=np.int64)
+        targets = np.eye(len(MODES))[y]
+
+        weights = np.zeros((n_features, len(MODES)))
+        bias = np.zeros(len(MODES))
+        rng = np.random.default_rng(seed)
+
+        for _ in range(epochs):
+            order = rng.permutation(len(tasks))
+            for start in range(0, len(order), batch_size):
+                batch = order[start:start + batch_size]
+                rows = np.concatenate([
+                    np.full(len(encoded[i][0]), row, dtype=np.int64) for row, i in enumerate(batch)
+                ])
+                indices = np.concatenate([encoded[i][0] for i in batch])
+                signs = np.concatenate([encoded[i][1] for i in batch])
+
+                probs = _softmax(_logits(weights, bias, rows, indices, signs, len(batch)))
+                error = (probs - targets[batch]) / len(batch)
+
+                # Gradiente solo sobre las filas tocadas por el lote
+                touched, inverse = np.unique(indices, return_inverse=True)
+                grad = np.empty((len(touched), len(MODES)))
+                for k in range(len(MODES)):
+                    grad[:, k] = np.bincount(inverse, weights=error[rows, k] * signs,
+                                             minlength=len(touched))
+                grad += l2 * weights[touched]
+
+                weights[touched] -= learning_rate * grad
+                bias -= learning_rate * error.sum(axis=0)
+
+        metadata = {
+            'n_features': n_features,
+            'char_ngram': char_ngram,
+            'modes': list(MODES),
+            'training_samples': len(tasks),
+            'label_distribution': {mode: int((y == i).sum()) for i, mode in enumerate(MODES)},
+        }
+        return cls(weights.astype(np.float32), bias, vectorizer, metadata)
+
+    def save(self, path: str) -> Path:
+        """
+        Guarda el artefacto (metadatos JSON + weights.npy) en un directorio.
+
+        Returns:
+            Directorio del artefacto
+        """
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        matrix = np.vstack([self.weights, self.bias[np.newaxis, :]]).astype(np.float32)
+        np.save(directory / WEIGHTS_FILE, matrix)
+
+        metadata = {
+            **self.metadata,
+            'n_features': self.vectorizer.n_features,
+            'char_ngram': self.vectorizer.char_ngram,
+            'modes': list(MODES),
+        }
+        with open(directory / METADATA_FILE, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        return directory
+
+    @classmethod
+    def load(cls, path: str) -> 'ModeClassifier':
+        """
+        Abre un artefacto guardado con save(); los pesos quedan en memory-map.
+
+        Args:
+            path: Directorio del artefacto
+        """
+        directory = Path(path)
+        with open(directory / METADATA_FILE, encoding='utf-8') as f:
+            metadata = json.load(f)
+        if tuple(metadata.get('modes', MODES)) != MODES:
+            raise ValueError(f"Modos del artefacto incompatibles: {metadata.get('modes')}")
+
+        matrix = np.load(directory / WEIGHTS_FILE, mmap_mode='r')
+        vectorizer = HashingVectorizer(metadata['n_features'], metadata.get('char_ngram', 4))
+        metadata['source'] = str(directory)
+        # Vista ndarray sobre el mismo mapeo (evita el overhead de np.memmap al indexar)
+        matrix = matrix.view(np.ndarray)
+        return cls(matrix[:-1], np.array(matrix[-1]), vectorizer, metadata)
+
+    def __repr__(self) -> str:
+        return (f"ModeClassifier(n_features={self.vectorizer.n_features}, "
+                f"samples={self.metadata.get('training_samples', '?')})")
+
+
+def load_training_data(paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Lee ejemplos (tarea, modo) de decision_logs y conversaciones exportadas.
+
+    Formatos aceptados:
+    - JSONL del decision_log (task + selected_mode) o corpus de evaluación
+      (task|input + expected|label)
+    - JSON de export_conversation (conversation[].input + mode_selected)
+
+    Los textos truncados por el decision_log ("...") se usan sin el sufijo.
+    """
+    tasks, labels = [], []
+
+    def add(task: Optional[str], label: Optional[str]):
+        if task and label in MODES:
+            tasks.append(task[:-3] if task.endswith('...') else task)
+            labels.append(label)
+
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+
+        if content.lstrip().startswith('{') and '"conversation"' in content:
+            try:
+                data = json.loads(content)
+            except json.JSONDecodeError:
+                data = None
+            if isinstance(data, dict) and 'conversation' in data:
+                for interaction in data['conversation']:
+                    add(interaction.get('input'), interaction.get('mode_selected'))
+                continue
+
+        for line in content.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            add(item.get('task', item.get('input')),
+                item.get('expected', item.get('label', item.get('selected_mode'))))
+
+    return tasks, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Entrena el clasificador de modo de M.A.R.T.I.N.')
+    parser.add_argument('data', nargs='+', help='decision_logs (JSONL) o conversaciones exportadas (JSON)')
+    parser.add_argument('--output', '-o', default='models/mode_classifier', help='Directorio del artefacto')
+    parser.add_argument('--bits', type=int, default=18, help='Dimensión del hashing = 2**bits')
+    parser.add_argument('--char-ngram', type=int, default=4, help='N-gramas de caracteres (0 = sin ellos)')
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--learning-rate', type=float, default=0.5)
+    parser.add_argument('--holdout', type=float, default=0.1, help='Fracción reservada para validación')
+    args = parser.parse_args()
+
+    tasks, labels = load_training_data(args.data)
+    if not tasks:
+        print("❌ No se encontraron ejemplos etiquetados")
+        return
+
+    order = np.random.default_rng(0).permutation(len(tasks))
+    n_holdout = int(len(tasks) * args.holdout)
+    train_idx, test_idx = order[n_holdout:], order[:n_holdout]
+
+    start = time.perf_counter()
+    classifier = ModeClassifier.train(
+        [tasks[i] for i in train_idx], [labels[i] for i in train_idx],
+        n_features=2 ** args.bits, char_ngram=args.char_ngram,
+        epochs=args.epochs, learning_rate=args.learning_rate
+    )
+    print(f"🧠 Entrenado con {len(train_idx)} ejemplos en {time.perf_counter() - start:.1f}s")
+
+    if len(test_idx):
+        test_tasks = [tasks[i] for i in test_idx]
+        predicted = classifier.predict_batch(test_tasks)
+        accuracy = sum(p == labels[i] for p, i in zip(predicted, test_idx)) / len(test_idx)
+        classifier.metadata['holdout_accuracy'] = round(accuracy, 4)
+        print(f"📊 Accuracy en validación ({len(test_idx)} ejemplos): {accuracy:.3f}")
+
+        start = time.perf_counter()
+        for task in test_tasks:
+            classifier.predict_proba(task)
+        per_task = (time.perf_counter() - start) / len(test_tasks) * 1e6
+        print(f"⚡ Inferencia: {per_task:.0f} µs por tarea")
+
+    directory = classifier.save(args.output)
+    print(f"✅ Modelo guardado en: {directory}")
+
+
+if __name__ == "__main__":
+    main()
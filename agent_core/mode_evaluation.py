@@ -0,0 +1,251 @@
+"""
+Evaluación offline del ModeSelector y barrido de umbrales/pesos
+
+Uso:
+    python -m agent_core.mode_evaluation corpus.jsonl \
+        --risk 0.4 0.5 0.6 --clarity 0.5 0.6 0.7 \
+        --weight danger=0.4,0.5 --weight vague=0.2,0.25 --workers 4
+
+Cada línea del corpus es un JSON con:
+    {"task": "...", "context": {...}, "expected": "PASSIVE|DIRECT|SAFE"}
+("input" y "label" también se aceptan como alias de "task" y "expected").
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from agent_core.mode_selector import ModeSelector, RULE_MODES
+
+MODES = ("PASSIVE", "DIRECT", "SAFE")
+
+# Regla de decisión -> índice en MODES
+_RULE_TO_MODE_INDEX = np.array([MODES.index(mode) for mode in RULE_MODES])
+
+# Estado compartido con los workers (se fija en el initializer del pool)
+_worker_state: Dict[str, Any] = {}
+
+
+def load_corpus(path: str) -> Tuple[List[str], List[Dict], List[str]]:
+    """
+    Carga un corpus etiquetado en formato JSONL.
+
+    Returns:
+        (tasks, contexts, labels)
+    """
+    tasks, contexts, labels = [], [], []
+    with open(path, encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            label = item.get('expected', item.get('label'))
+            if label not in MODES:
+                raise ValueError(f"Línea {line_number}: etiqueta inválida {label!r}")
+            tasks.append(item.get('task', item.get('input', '')))
+            contexts.append(item.get('context') or {})
+            labels.append(label)
+    return tasks, contexts, labels
+
+
+def build_grid(risk_thresholds: Sequence[float] = (ModeSelector.RISK_THRESHOLD,),
+               clarity_thresholds: Sequence[float] = (ModeSelector.CLARITY_THRESHOLD,),
+               weight_grid: Optional[Dict[str, Sequence[float]]] = None) -> List[Dict[str, Any]]:
+    """
+    Producto cartesiano de umbrales y pesos a evaluar.
+
+    Args:
+        risk_thresholds: Valores de RISK_THRESHOLD
+        clarity_thresholds: Valores de CLARITY_THRESHOLD
+        weight_grid: Peso -> valores a probar (el resto queda en SCORE_WEIGHTS)
+    """
+    weight_grid = weight_grid or {}
+    unknown = set(weight_grid) - set(ModeSelector.SCORE_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Pesos desconocidos: {sorted(unknown)}")
+
+    names = list(weight_grid)
+    grid = []
+    for risk, clarity in product(risk_thresholds, clarity_thresholds):
+        for values in product(*(weight_grid[name] for name in names)):
+            grid.append({
+                'risk_threshold': risk,
+                'clarity_threshold': clarity,
+                'weights': {**ModeSelector.SCORE_WEIGHTS, **dict(zip(names, values))},
+            })
+    return grid
+
+
+def _feature_chunk(args: Tuple[List[str], List[Dict]]):
+    tasks, contexts = args
+    return ModeSelector(log_capacity=1)._feature_matrix(tasks, contexts)
+
+
+def extract_features(tasks: List[str], contexts: List[Dict], workers: int = 1,
+                     chunk_size: int = 5000) -> np.ndarray:
+    """Matriz de features del corpus completo (en paralelo si workers > 1)"""
+    if not tasks:
+        return np.empty((0, len(ModeSelector.FEATURE_COLUMNS)))
+
+    chunks = [
+        (tasks[i:i + chunk_size], contexts[i:i + chunk_size])
+        for i in range(0, len(tasks), chunk_size)
+    ]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            matrices = list(pool.map(_feature_chunk, chunks))
+    else:
+        matrices = [_feature_chunk(chunk) for chunk in chunks]
+    return np.vstack(matrices)
+
+
+def evaluate_config(features: np.ndarray, labels: np.ndarray, config: Dict[str, Any],
+                    selector: Optional[ModeSelector] = None) -> Dict[str, Any]:
+    """
+    Evalúa una configuración sobre la matriz de features.
+
+    Args:
+        features: Matriz (n_tareas, FEATURE_COLUMNS)
+        labels: Índices de MODES esperados
+        config: Entrada de build_grid
+
+    Returns:
+        Dict con accuracy, matriz de confusión (filas=esperado, columnas=predicho)
+        y tasks_per_second
+    """
+    selector = selector or ModeSelector(log_capacity=1)
+    start = time.perf_counter()
+    risk, clarity = selector._score_matrix(features, config['weights'])
+    rules = selector._decide_matrix(
+        features, risk, clarity, config['risk_threshold'], config['clarity_threshold']
+    )
+    predicted = _RULE_TO_MODE_INDEX[rules]
+    elapsed = time.perf_counter() - start
+
+    confusion = np.zeros((len(MODES), len(MODES)), dtype=np.int64)
+    np.add.at(confusion, (labels, predicted), 1)
+
+    return {
+        **config,
+        'accuracy': float((predicted == labels).mean()) if len(labels) else 0.0,
+        'confusion': confusion.tolist(),
+        'tasks_per_second': len(labels) / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+def _init_worker(features: np.ndarray, labels: np.ndarray):
+    _worker_state['features'] = features
+    _worker_state['labels'] = labels
+    _worker_state['selector'] = ModeSelector(log_capacity=1)
+
+
+def _evaluate_in_worker(config: Dict[str, Any]) -> Dict[str, Any]:
+    return evaluate_config(
+        _worker_state['features'], _worker_state['labels'], config, _worker_state['selector']
+    )
+
+
+def sweep(tasks: List[str], contexts: List[Dict], labels: List[str],
+          grid: List[Dict[str, Any]], workers: int = 1) -> Dict[str, Any]:
+    """
+    Evalúa todas las configuraciones del grid sobre un corpus.
+
+    Las features se extraen una sola vez; cada configuración solo recalcula
+    scores y decisiones con NumPy, repartidas en un pool de procesos.
+
+    Returns:
+        Dict con 'results' (ordenados por accuracy) y métricas de tiempo
+    """
+    start = time.perf_counter()
+    features = extract_features(tasks, contexts, workers)
+    label_index = np.array([MODES.index(label) for label in labels], dtype=np.int64)
+    extraction_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if workers > 1 and len(grid) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(features, label_index)) as pool:
+            results = list(pool.map(_evaluate_in_worker, grid,
+                                    chunksize=max(1, len(grid) // (workers * 4))))
+    else:
+        selector = ModeSelector(log_capacity=1)
+        results = [evaluate_config(features, label_index, config, selector) for config in grid]
+    sweep_time = time.perf_counter() - start
+
+    results.sort(key=lambda result: result['accuracy'], reverse=True)
+    return {
+        'results': results,
+        'total_tasks': len(tasks),
+        'total_configs': len(grid),
+        'extraction_seconds': extraction_time,
+        'extraction_tasks_per_second': len(tasks) / extraction_time if extraction_time > 0 else float('inf'),
+        'sweep_seconds': sweep_time,
+    }
+
+
+def format_report(report: Dict[str, Any], top: int = 5) -> str:
+    """Resumen legible de un barrido"""
+    lines = [
+        "📈 EVALUACIÓN DEL MODE SELECTOR",
+        "=" * 60,
+        f"Tareas: {report['total_tasks']} | Configuraciones: {report['total_configs']}",
+        f"Extracción de features: {report['extraction_seconds']:.2f}s "
+        f"({report['extraction_tasks_per_second']:.0f} tareas/s)",
+        f"Barrido: {report['sweep_seconds']:.2f}s",
+    ]
+    defaults = ModeSelector.SCORE_WEIGHTS
+    for rank, result in enumerate(report['results'][:top], 1):
+        changed = {k: v for k, v in result['weights'].items() if v != defaults[k]}
+        lines.append("-" * 60)
+        lines.append(
+            f"#{rank} accuracy={result['accuracy']:.3f} "
+            f"risk>={result['risk_threshold']} clarity<{result['clarity_threshold']} "
+            f"pesos={changed or 'por defecto'} "
+            f"({result['tasks_per_second']:.0f} tareas/s)"
+        )
+        lines.append(f"   {'esperado/predicho':<18}" + "".join(f"{mode:>9}" for mode in MODES))
+        for mode, row in zip(MODES, result['confusion']):
+            lines.append(f"   {mode:<18}" + "".join(f"{count:>9}" for count in row))
+    return "\n".join(lines)
+
+
+def _parse_weight(spec: str) -> Tuple[str, List[float]]:
+    name, _, values = spec.partition('=')
+    return name, [float(value) for value in values.split(',') if value]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluación offline del ModeSelector')
+    parser.add_argument('corpus', help='Corpus JSONL etiquetado')
+    parser.add_argument('--risk', type=float, nargs='+', default=[ModeSelector.RISK_THRESHOLD],
+                        help='Valores de RISK_THRESHOLD a probar')
+    parser.add_argument('--clarity', type=float, nargs='+', default=[ModeSelector.CLARITY_THRESHOLD],
+                        help='Valores de CLARITY_THRESHOLD a probar')
+    parser.add_argument('--weight', action='append', default=[], metavar='NOMBRE=V1,V2',
+                        help='Valores de un peso de SCORE_WEIGHTS (repetible)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Procesos del pool (default: CPUs disponibles)')
+    parser.add_argument('--top', type=int, default=5, help='Configuraciones a mostrar')
+    parser.add_argument('--output', help='Guarda todos los resultados en JSON')
+    args = parser.parse_args()
+
+    tasks, contexts, labels = load_corpus(args.corpus)
+    grid = build_grid(args.risk, args.clarity, dict(_parse_weight(spec) for spec in args.weight))
+    report = sweep(tasks, contexts, labels, grid, workers=args.workers)
+
+    print(format_report(report, top=args.top))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Resultados guardados en: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
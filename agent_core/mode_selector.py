@@ -2,11 +2,274 @@
 ModeSelector - El cerebro que decide cómo M.A.R.T.I.N. debe razonar
 VERSIÓN CORREGIDA - Mejor detección de ambigüedad
 """
-from typing import Dict, Literal
+from collections import OrderedDict
+from itertools import count
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Literal, Optional, Sequence, Union
+import json
 import re
 
+from agent_core.keyword_matcher import KeywordMatcher
+from agent_core.decision_cache import DecisionCache
+from agent_core.task_features import PIPELINE_CATEGORIES, TaskFeatures
+
+if TYPE_CHECKING:
+    from agent_core.mode_classifier import ModeClassifier
+
 ModeType = Literal["PASSIVE", "DIRECT", "SAFE"]
 
+# Reglas de decisión (en orden de prioridad)
+RULE_PRODUCTION = 0
+RULE_HIGH_RISK = 1
+RULE_LOW_CLARITY = 2
+RULE_CLEAR = 3
+
+RULE_MODES = ("SAFE", "SAFE", "PASSIVE", "DIRECT")
+
+MODE_EMOJI = {
+    "PASSIVE": "🟦",
+    "DIRECT": "🟩",
+    "SAFE": "🟨"
+}
+
+
+class DecisionRecord:
+    """
+    Registro compacto de una decisión del ModeSelector.
+    
+    Usa __slots__ en lugar de un dict por decisión. La razón y la
+    explicación en texto se generan solo cuando se consultan (str(record)
+    o explain()), de modo que el agente puede adjuntar el registro a cada
+    respuesta sin formatear nada en el camino crítico. Soporta acceso
+    estilo dict (record['risk_score']) por compatibilidad con el log anterior.
+    """
+    
+    __slots__ = ('task', 'risk_score', 'clarity_score', 'environment', 'selected_mode', 'rule')
+    
+    KEYS = ('task', 'risk_score', 'clarity_score', 'environment', 'selected_mode', 'reason')
+    
+    def __init__(self, task: str, risk_score: float, clarity_score: float,
+                 environment: str, selected_mode: str, rule: int):
+        self.task = task[:50] + '...' if len(task) > 50 else task
+        self.risk_score = risk_score
+        self.clarity_score = clarity_score
+        self.environment = environment
+        self.selected_mode = selected_mode
+        self.rule = rule
+    
+    @property
+    def reason(self) -> str:
+        if self.rule == RULE_PRODUCTION:
+            return "Entorno de producción detectado"
+        if self.rule == RULE_HIGH_RISK:
+            return f"Riesgo moderado-alto detectado (score: {self.risk_score:.2f})"
+        if self.rule == RULE_LOW_CLARITY:
+            return f"Tarea ambigua o requiere clarificación (clarity: {self.clarity_score:.2f})"
+        return "Tarea clara y de bajo riesgo"
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self.KEYS else default
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.KEYS}
+    
+    def explain(self) -> str:
+        """Explicación legible de la decisión (para UI, CLI y logs)"""
+        emoji = MODE_EMOJI.get(self.selected_mode, "⚪")
+        
+        return f"""
+{emoji} Decisión del ModeSelector:
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Tarea: "{self.task}"
+Modo seleccionado: {self.selected_mode}
+Razón: {self.reason}
+
+Factores analizados:
+  • Riesgo: {self.risk_score:.2f} (0=seguro, 1=peligroso)
+  • Claridad: {self.clarity_score:.2f} (0=vago, 1=claro)
+  • Ambiente: {self.environment}
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+"""
+    
+    def __str__(self) -> str:
+        return self.explain()
+    
+    def __repr__(self) -> str:
+        return f"DecisionRecord({self.selected_mode}, risk={self.risk_score:.2f}, clarity={self.clarity_score:.2f})"
+
+
+class DecisionLog:
+    """
+    Buffer circular de capacidad fija para los DecisionRecord.
+    
+    La memoria queda acotada sin importar cuántas tareas procese el proceso.
+    Opcionalmente, las decisiones desplazadas se escriben en un archivo JSONL
+    (spill_path) en lugar de perderse.
+    """
+    
+    def __init__(self, capacity: int = 1000, spill_path: Optional[str] = None):
+        """
+        Args:
+            capacity: Número máximo de decisiones retenidas en memoria
+            spill_path: Archivo JSONL donde volcar las decisiones más antiguas (opcional)
+        """
+        if capacity < 1:
+            raise ValueError("capacity debe ser >= 1")
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.total = 0  # Decisiones registradas desde la creación del log
+        self._buffer: List[Optional[DecisionRecord]] = [None] * capacity
+        self._start = 0
+        self._size = 0
+        self._spill_file = None
+    
+    def append(self, record: DecisionRecord):
+        """Agrega una decisión, desplazando la más antigua si el buffer está lleno"""
+        if self._size < self.capacity:
+            self._buffer[(self._start + self._size) % self.capacity] = record
+            self._size += 1
+        else:
+            evicted = self._buffer[self._start]
+            self._buffer[self._start] = record
+            self._start = (self._start + 1) % self.capacity
+            if self.spill_path:
+                self._spill(evicted)
+        self.total += 1
+    
+    def _spill(self, record: DecisionRecord):
+        if self._spill_file is None:
+            self._spill_file = open(self.spill_path, 'a', encoding='utf-8', buffering=1)
+        self._spill_file.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __getitem__(self, index: int) -> DecisionRecord:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("índice fuera del rango del decision log")
+        return self._buffer[(self._start + index) % self.capacity]
+    
+    def __iter__(self) -> Iterator[DecisionRecord]:
+        """Itera de la decisión más antigua retenida a la más reciente"""
+        for i in range(self._size):
+            yield self._buffer[(self._start + i) % self.capacity]
+    
+    def recent(self, limit: Optional[int] = None) -> Iterator[DecisionRecord]:
+        """
+        Itera las decisiones más recientes primero.
+        
+        Args:
+            limit: Máximo de decisiones a retornar (None = todas las retenidas)
+        """
+        count = self._size if limit is None else min(limit, self._size)
+        for i in range(1, count + 1):
+            yield self[-i]
+    
+    def clear(self):
+        """Descarta las decisiones retenidas en memoria"""
+        self._buffer = [None] * self.capacity
+        self._start = 0
+        self._size = 0
+    
+    def close(self):
+        """Cierra el archivo de spill, si está abierto"""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+
+# Versiones únicas para cada perfil compilado
+_profile_versions = count()
+
+
+class SelectorProfile:
+    """
+    Configuración compilada del ModeSelector: vocabularios, pesos, umbrales
+    y el matcher resultante.
+    
+    Se trata como inmutable. Para cambiar la configuración se compila un
+    perfil nuevo y se reemplaza la referencia del selector en una sola
+    asignación, de modo que un select_mode en curso nunca ve un matcher o
+    unos umbrales a medio actualizar.
+    
+    Opcionalmente incluye un ModeClassifier aprendido (o la ruta de su
+    artefacto, que se abre en el primer uso) y el peso con el que sus
+    probabilidades se mezclan con los scores heurísticos.
+    """
+    
+    __slots__ = ('vocabulary', 'weights', 'risk_threshold', 'clarity_threshold',
+                 'matcher', 'version', 'source', 'classifier', 'classifier_weight')
+    
+    def __init__(self, vocabulary: Dict[str, Sequence[str]], weights: Dict[str, float],
+                 risk_threshold: float, clarity_threshold: float, source: Optional[str] = None,
+                 classifier: Union['ModeClassifier', str, None] = None,
+                 classifier_weight: float = 0.0):
+        """
+        Args:
+            vocabulary: Categoría del selector -> lista de palabras clave
+            weights: Pesos de los factores (mismas claves que SCORE_WEIGHTS)
+            risk_threshold: risk >= umbral -> SAFE
+            clarity_threshold: clarity < umbral -> PASSIVE
+            source: Origen de la configuración (ruta del archivo, 'defaults', ...)
+            classifier: ModeClassifier o directorio de su artefacto (opcional)
+            classifier_weight: 0 = solo heurísticas, 1 = solo el clasificador
+        """
+        if not 0.0 <= classifier_weight <= 1.0:
+            raise ValueError(f"classifier_weight debe estar entre 0 y 1: {classifier_weight}")
+        self.vocabulary = {name: tuple(words) for name, words in vocabulary.items()}
+        self.weights = dict(weights)
+        self.risk_threshold = risk_threshold
+        self.clarity_threshold = clarity_threshold
+        self.source = source
+        self.classifier = classifier
+        self.classifier_weight = classifier_weight if classifier is not None else 0.0
+        self.matcher = KeywordMatcher({**self.vocabulary, **PIPELINE_CATEGORIES})
+        self.version = next(_profile_versions)
+    
+    def replace(self, vocabulary: Optional[Dict[str, Sequence[str]]] = None,
+                weights: Optional[Dict[str, float]] = None,
+                risk_threshold: Optional[float] = None,
+                clarity_threshold: Optional[float] = None,
+                source: Optional[str] = None,
+                classifier: Union['ModeClassifier', str, None] = None,
+                classifier_weight: Optional[float] = None) -> 'SelectorProfile':
+        """Compila un perfil nuevo cambiando solo los campos indicados"""
+        return SelectorProfile(
+            vocabulary={**self.vocabulary, **(vocabulary or {})},
+            weights={**self.weights, **(weights or {})},
+            risk_threshold=self.risk_threshold if risk_threshold is None else risk_threshold,
+            clarity_threshold=self.clarity_threshold if clarity_threshold is None else clarity_threshold,
+            source=source or self.source,
+            classifier=self.classifier if classifier is None else classifier,
+            classifier_weight=self.classifier_weight if classifier_weight is None else classifier_weight
+        )
+    
+    def load_classifier(self) -> Optional['ModeClassifier']:
+        """
+        Clasificador del perfil, abriendo el artefacto en el primer uso.
+        
+        Retorna None si el perfil no usa clasificador (peso 0).
+        """
+        if not self.classifier_weight:
+            return None
+        classifier = self.classifier
+        if isinstance(classifier, str):
+            from agent_core.mode_classifier import ModeClassifier
+            classifier = self.classifier = ModeClassifier.load(classifier)
+        return classifier
+    
+    def __repr__(self) -> str:
+        return (f"SelectorProfile(v{self.version}, risk>={self.risk_threshold}, "
+                f"clarity<{self.clarity_threshold}, keywords={len(self.matcher)}, "
+                f"classifier_weight={self.classifier_weight}, source={self.source})")
+
+
 class ModeSelector:
     """
     Analiza la tarea y contexto para determinar el modo de razonamiento óptimo.
@@ -43,66 +306,464 @@ class ModeSelector:
         'generate', 'create', 'write', 'update', 'modify'
     ]
     
-    def __init__(self):
-        self.decision_log = []
+    # Recursos críticos cuya mención aumenta el riesgo
+    CRITICAL_RESOURCES = [
+        'database', 'db', 'producción', 'production',
+        'payment', 'billing', 'auth', 'users', 'admin',
+        'password', 'contraseña', 'credential', 'secret',
+        'mfa', '2fa', 'autenticación', 'authentication'
+    ]
+    
+    # Indicadores de alcance amplio
+    BROAD_SCOPE_INDICATORS = ['all', 'every', 'todos', 'toda', 'cada', 'entire', 'completo', 'todo']
+    
+    # Estándares que cuentan como recursos específicos
+    STANDARDS_KEYWORDS = ['iso', 'soc', 'nist', 'gdpr', 'pci']
     
-    def select_mode(self, task: str, context: Dict = None) -> ModeType:
+    # Verbos de acción clara
+    ACTION_VERBS = [
+        'genera', 'crea', 'actualiza', 'configura', 'instala',
+        'modifica', 'elimina', 'revisa', 'analiza', 'escanea',
+        'generate', 'create', 'update', 'configure', 'install'
+    ]
+    
+    # Umbrales de decisión
+    RISK_THRESHOLD = 0.5     # risk >= umbral -> SAFE
+    CLARITY_THRESHOLD = 0.6  # clarity < umbral -> PASSIVE
+    
+    # Pesos de los factores de riesgo y claridad
+    SCORE_WEIGHTS = {
+        # Riesgo
+        'danger': 0.5,             # Palabras peligrosas (AUMENTADO de 0.4 a 0.5)
+        'critical_resource': 0.25, # Por recurso crítico, hasta 2
+        'broad_scope': 0.2,        # Scope amplio
+        'active_users': 0.1,       # Contexto con usuarios activos
+        # Claridad
+        'question': 0.4,           # Penalización por pregunta (AUMENTADO de 0.3 a 0.4)
+        'vague': 0.25,             # Por palabra vaga (AUMENTADO de 0.15 a 0.25)
+        'specific_action': 0.2,    # Bonus por acción específica
+        'very_short': 0.5,         # Menos de 3 palabras
+        'short': 0.3,              # Menos de 5 palabras sin acción específica
+        'no_specifics': 0.2,       # Sin nombres propios ni estándares
+        'no_action_verb': 0.15,    # Sin verbo de acción y no es pregunta
+    }
+    
+    # Columnas de la matriz de features usada por select_modes
+    FEATURE_COLUMNS = (
+        'danger', 'vague', 'specific_action', 'critical_resource', 'broad_scope',
+        'standard', 'action_verb', 'word_count', 'has_question', 'has_upper',
+        'is_production', 'has_active_users'
+    )
+    
+    # Categoría del matcher -> atributo con su lista de vocabulario
+    CATEGORY_ATTRIBUTES = {
+        'danger': 'DANGER_KEYWORDS',
+        'vague': 'VAGUE_KEYWORDS',
+        'specific_action': 'SPECIFIC_ACTION_KEYWORDS',
+        'critical_resource': 'CRITICAL_RESOURCES',
+        'broad_scope': 'BROAD_SCOPE_INDICATORS',
+        'standard': 'STANDARDS_KEYWORDS',
+        'action_verb': 'ACTION_VERBS',
+    }
+    
+    # Perfil compilado una sola vez al cargar la clase con los valores de
+    # arriba (ver final del módulo). Su matcher incluye también las categorías
+    # del pipeline (políticas, validación).
+    DEFAULT_PROFILE: SelectorProfile = None
+    MATCHER: KeywordMatcher = None
+    
+    # TaskFeatures memorizados para entradas repetidas
+    FEATURES_CACHE_SIZE = 256
+    
+    def __init__(self, log_capacity: int = 1000, log_spill_path: Optional[str] = None,
+                 cache_size: int = 0, profile: Optional[SelectorProfile] = None):
+        """
+        Args:
+            log_capacity: Decisiones retenidas en memoria por el decision_log
+            log_spill_path: Archivo JSONL para volcar decisiones antiguas (opcional)
+            cache_size: Tamaño de la caché LRU de decisiones (0 = deshabilitada)
+            profile: Configuración compilada (por defecto, las constantes de la clase)
+        """
+        self.decision_log = DecisionLog(log_capacity, log_spill_path)
+        self.profile = profile or self.DEFAULT_PROFILE
+        self.cache = DecisionCache(cache_size) if cache_size else None
+        self._features_cache: "OrderedDict[tuple, TaskFeatures]" = OrderedDict()
+    
+    @property
+    def matcher(self) -> KeywordMatcher:
+        """Matcher del perfil actual"""
+        return self.profile.matcher
+    
+    @property
+    def config_version(self) -> int:
+        """Versión del perfil actual (cambia con cada reconfiguración)"""
+        return self.profile.version
+    
+    @classmethod
+    def keyword_categories(cls) -> Dict[str, list]:
+        """Listas de vocabulario que se compilan en el matcher"""
+        return {name: getattr(cls, attr) for name, attr in cls.CATEGORY_ATTRIBUTES.items()}
+    
+    @classmethod
+    def default_profile(cls) -> SelectorProfile:
+        """Compila un perfil con las constantes de la clase"""
+        return SelectorProfile(
+            cls.keyword_categories(), cls.SCORE_WEIGHTS,
+            cls.RISK_THRESHOLD, cls.CLARITY_THRESHOLD, source='defaults'
+        )
+    
+    def extract_features(self, task: str, profile: Optional[SelectorProfile] = None) -> TaskFeatures:
+        """
+        Analiza la tarea una sola vez para todo el pipeline.
+        
+        El resultado se memoriza (LRU) para entradas repetidas; las entradas
+        de perfiles anteriores dejan de usarse al cambiar la configuración.
+        """
+        profile = profile or self.profile
+        key = (profile.version, task)
+        features = self._features_cache.get(key)
+        if features is not None:
+            try:
+                self._features_cache.move_to_end(key)
+            except KeyError:
+                pass
+            return features
+        
+        features = TaskFeatures.extract(task, profile.matcher)
+        self._features_cache[key] = features
+        if len(self._features_cache) > self.FEATURES_CACHE_SIZE:
+            try:
+                self._features_cache.popitem(last=False)
+            except KeyError:
+                pass
+        return features
+    
+    def apply_profile(self, profile: SelectorProfile):
+        """
+        Activa un perfil ya compilado (reemplazo atómico).
+        
+        Las llamadas a select_mode en curso terminan con el perfil anterior;
+        las siguientes usan el nuevo. La caché de decisiones se invalida sola.
+        """
+        self.profile = profile
+    
+    def load_config(self, path: str) -> SelectorProfile:
+        """
+        Carga vocabularios, pesos y umbrales desde un YAML y los activa.
+        
+        Args:
+            path: Ruta al archivo (ver configs/config.yaml)
+        """
+        from agent_core.selector_config import load_profile
+        profile = load_profile(path)
+        self.apply_profile(profile)
+        return profile
+    
+    def watch_config(self, path: str, interval: float = 1.0):
+        """
+        Vigila el archivo de configuración y recarga el perfil cuando cambia.
+        
+        Returns:
+            ConfigWatcher ya iniciado (llamar stop() para detenerlo)
+        """
+        from agent_core.selector_config import ConfigWatcher
+        watcher = ConfigWatcher(self, path, interval)
+        watcher.start()
+        return watcher
+    
+    def set_keywords(self, category: str, words: Sequence[str]):
+        """
+        Reemplaza el vocabulario de una categoría solo para esta instancia.
+        
+        Recompila el matcher e invalida la caché de decisiones.
+        
+        Args:
+            category: Categoría del matcher ('danger', 'vague', ...)
+            words: Nueva lista de palabras clave (en minúsculas)
+        """
+        if category not in self.CATEGORY_ATTRIBUTES:
+            raise ValueError(f"Categoría desconocida: {category}")
+        self.apply_profile(self.profile.replace(vocabulary={category: list(words)}))
+    
+    def set_thresholds(self, risk: Optional[float] = None, clarity: Optional[float] = None):
+        """
+        Ajusta los umbrales de decisión de esta instancia e invalida la caché.
+        
+        Args:
+            risk: Nuevo umbral de riesgo (risk >= umbral -> SAFE)
+            clarity: Nuevo umbral de claridad (clarity < umbral -> PASSIVE)
+        """
+        self.apply_profile(self.profile.replace(risk_threshold=risk, clarity_threshold=clarity))
+    
+    def set_weights(self, **weights: float):
+        """
+        Ajusta pesos de SCORE_WEIGHTS para esta instancia e invalida la caché.
+        
+        Ejemplo: selector.set_weights(danger=0.6, vague=0.2)
+        """
+        unknown = set(weights) - set(self.SCORE_WEIGHTS)
+        if unknown:
+            raise ValueError(f"Pesos desconocidos: {sorted(unknown)}")
+        self.apply_profile(self.profile.replace(weights=weights))
+    
+    def set_classifier(self, classifier: Union['ModeClassifier', str, None], weight: float = 0.5):
+        """
+        Activa (o desactiva con None) el clasificador aprendido.
+        
+        Sus probabilidades se mezclan con los scores heurísticos:
+            risk    = (1 - weight) * risk    + weight * P(SAFE)
+            clarity = (1 - weight) * clarity + weight * (1 - P(PASSIVE))
+        Con weight=1 el clasificador reemplaza a las heurísticas. La regla de
+        producción -> SAFE se aplica siempre.
+        
+        Args:
+            classifier: ModeClassifier o directorio de su artefacto
+            weight: Peso del clasificador en la mezcla (0 - 1)
+        """
+        if classifier is None:
+            self.apply_profile(self.profile.replace(classifier_weight=0.0))
+        else:
+            self.apply_profile(self.profile.replace(classifier=classifier, classifier_weight=weight))
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Métricas de la caché de decisiones ({} si está deshabilitada)"""
+        return self.cache.stats() if self.cache is not None else {}
+    
+    def select_mode(self, task: str, context: Dict = None,
+                    features: Optional[TaskFeatures] = None,
+                    profile: Optional[SelectorProfile] = None) -> ModeType:
         """
         Decide el modo de razonamiento basado en análisis de la tarea.
         
+        Returns:
+            Modo seleccionado: "PASSIVE", "DIRECT", o "SAFE" (ver decide)
+        """
+        return self.decide(task, context, features, profile).selected_mode
+    
+    def decide(self, task: str, context: Dict = None,
+               features: Optional[TaskFeatures] = None,
+               profile: Optional[SelectorProfile] = None) -> DecisionRecord:
+        """
+        Como select_mode, pero retorna el DecisionRecord de esta decisión.
+        
+        Con un selector compartido entre sesiones concurrentes, last_decision()
+        puede ser la decisión de otra sesión; este registro es el propio.
+        
         Args:
             task: Instrucción del usuario
             context: Información contextual (environment, user_role, etc.)
+            features: Análisis previo de la tarea (se calcula si no se pasa)
+            profile: Perfil con el que se extrajeron las features (por
+                     defecto el actual); así una recarga en caliente entre
+                     extract_features y select_mode no mezcla versiones
         
         Returns:
-            Modo seleccionado: "PASSIVE", "DIRECT", o "SAFE"
+            Registro de la decisión (también queda en decision_log)
         """
         if context is None:
             context = {}
         
-        # Análisis de factores
-        risk_score = self._assess_risk(task, context)
-        clarity_score = self._assess_clarity(task)
+        # Una sola lectura del perfil: toda la decisión usa la misma configuración
+        profile = profile or self.profile
         environment = context.get('environment', 'development')
         
-        # Logging de decisión
-        decision_factors = {
-            'task': task[:50] + '...' if len(task) > 50 else task,
-            'risk_score': risk_score,
-            'clarity_score': clarity_score,
-            'environment': environment
-        }
+        # Decisión memorizada para una tarea equivalente
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(task, context)
+            cached = self.cache.get(cache_key, profile.version)
+            if cached is not None:
+                risk_score, clarity_score, rule = cached
+                record = DecisionRecord(task, risk_score, clarity_score, environment,
+                                        RULE_MODES[rule], rule)
+                self.decision_log.append(record)
+                return record
+        
+        # Análisis de factores (una sola pasada sobre el texto)
+        if features is None:
+            features = self.extract_features(task, profile)
+        risk_score = self._assess_risk(task, context, features, profile.weights)
+        clarity_score = self._assess_clarity(task, features, profile.weights)
+        
+        # Mezcla con el clasificador aprendido (si el perfil lo usa)
+        classifier = profile.load_classifier()
+        if classifier is not None:
+            passive, _, safe = classifier.predict_proba(task).tolist()
+            alpha = profile.classifier_weight
+            risk_score = (1 - alpha) * risk_score + alpha * safe
+            clarity_score = (1 - alpha) * clarity_score + alpha * (1 - passive)
         
         # Reglas de decisión (orden de prioridad)
         
         # 1. Producción siempre va a SAFE
         if environment == 'production':
-            mode = "SAFE"
-            reason = "Entorno de producción detectado"
+            rule = RULE_PRODUCTION
         
         # 2. Riesgo moderado-alto va a SAFE (UMBRAL REDUCIDO A 0.5)
-        elif risk_score >= 0.5:
-            mode = "SAFE"
-            reason = f"Riesgo moderado-alto detectado (score: {risk_score:.2f})"
+        elif risk_score >= profile.risk_threshold:
+            rule = RULE_HIGH_RISK
         
         # 3. Baja claridad va a PASSIVE (UMBRAL AJUSTADO A 0.6)
-        elif clarity_score < 0.6:
-            mode = "PASSIVE"
-            reason = f"Tarea ambigua o requiere clarificación (clarity: {clarity_score:.2f})"
+        elif clarity_score < profile.clarity_threshold:
+            rule = RULE_LOW_CLARITY
         
         # 4. Clara y segura va a DIRECT
         else:
-            mode = "DIRECT"
-            reason = "Tarea clara y de bajo riesgo"
+            rule = RULE_CLEAR
+        
+        mode = RULE_MODES[rule]
+        
+        if cache_key is not None:
+            self.cache.put(cache_key, profile.version, (risk_score, clarity_score, rule))
         
         # Guardar log de decisión
-        decision_factors['selected_mode'] = mode
-        decision_factors['reason'] = reason
-        self.decision_log.append(decision_factors)
+        record = DecisionRecord(task, risk_score, clarity_score, environment, mode, rule)
+        self.decision_log.append(record)
+        
+        return record
+    
+    def select_modes(self, tasks: Sequence[str],
+                     contexts: Union[Dict, Sequence[Dict], None] = None,
+                     log: bool = True) -> List[ModeType]:
+        """
+        Versión por lotes de select_mode para triage de backlogs grandes.
+        
+        Construye una matriz de features para todo el lote y calcula riesgo,
+        claridad y reglas de decisión con operaciones vectorizadas de NumPy.
+        Los resultados son idénticos a llamar select_mode tarea por tarea.
         
-        return mode
+        Args:
+            tasks: Lista de instrucciones
+            contexts: Un contexto común, una lista paralela de contextos, o None
+            log: Si True, agrega un DecisionRecord por tarea al decision_log
+        
+        Returns:
+            Lista de modos, en el mismo orden que tasks
+        """
+        tasks = list(tasks)
+        if contexts is None or isinstance(contexts, dict):
+            contexts = [contexts or {}] * len(tasks)
+        else:
+            contexts = [context or {} for context in contexts]
+            if len(contexts) != len(tasks):
+                raise ValueError("tasks y contexts deben tener la misma longitud")
+        
+        if not tasks:
+            return []
+        
+        profile = self.profile
+        features = self._feature_matrix(tasks, contexts, profile.matcher)
+        risk, clarity = self._score_matrix(features, profile.weights)
+        
+        classifier = profile.load_classifier()
+        if classifier is not None:
+            proba = classifier.predict_proba_batch(tasks)
+            alpha = profile.classifier_weight
+            risk = (1 - alpha) * risk + alpha * proba[:, 2]
+            clarity = (1 - alpha) * clarity + alpha * (1 - proba[:, 0])
+        
+        rules = self._decide_matrix(
+            features, risk, clarity, profile.risk_threshold, profile.clarity_threshold
+        )
+        
+        modes = [RULE_MODES[rule] for rule in rules.tolist()]
+        
+        if log:
+            append = self.decision_log.append
+            for task, context, risk_score, clarity_score, mode, rule in zip(
+                tasks, contexts, risk.tolist(), clarity.tolist(), modes, rules.tolist()
+            ):
+                append(DecisionRecord(
+                    task, risk_score, clarity_score,
+                    context.get('environment', 'development'), mode, rule
+                ))
+        
+        return modes
     
-    def _assess_risk(self, task: str, context: Dict) -> float:
+    def _feature_matrix(self, tasks: List[str], contexts: List[Dict],
+                        matcher: Optional[KeywordMatcher] = None):
+        """Matriz (n_tareas, FEATURE_COLUMNS) con conteos y flags de cada tarea"""
+        import numpy as np
+        
+        matcher = matcher or self.matcher
+        rows = []
+        for task, context in zip(tasks, contexts):
+            features = TaskFeatures.extract(task, matcher)
+            hits = features.hits
+            rows.append((
+                hits['danger'], hits['vague'], hits['specific_action'],
+                hits['critical_resource'], hits['broad_scope'], hits['standard'],
+                hits['action_verb'],
+                features.word_count,
+                features.has_question,
+                features.has_upper,
+                context.get('environment', 'development') == 'production',
+                bool(context.get('has_active_users', False)),
+            ))
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(self.FEATURE_COLUMNS))
+    
+    def _score_matrix(self, features, weights: Optional[Dict[str, float]] = None):
+        """
+        Calcula riesgo y claridad por fila, con las mismas operaciones (y el
+        mismo orden de suma) que _assess_risk y _assess_clarity.
+        
+        Args:
+            features: Matriz (n_tareas, FEATURE_COLUMNS)
+            weights: Pesos alternativos (por defecto, los del perfil actual)
+        """
+        import numpy as np
+        
+        w = self.profile.weights if weights is None else weights
+        col = {name: features[:, i] for i, name in enumerate(self.FEATURE_COLUMNS)}
+        danger = col['danger']
+        critical = col['critical_resource']
+        vague = col['vague']
+        specific = col['specific_action']
+        word_count = col['word_count']
+        has_question = col['has_question'] > 0
+        
+        risk = np.zeros(len(features))
+        risk = risk + np.where(danger > 0, w['danger'] * np.minimum(danger / 2, 1.0), 0.0)
+        risk = risk + np.where(critical > 0, w['critical_resource'] * np.minimum(critical, 2), 0.0)
+        risk = risk + np.where(col['broad_scope'] > 0, w['broad_scope'], 0.0)
+        risk = risk + np.where(col['has_active_users'] > 0, w['active_users'], 0.0)
+        risk = np.minimum(risk, 1.0)
+        
+        clarity = np.ones(len(features))
+        clarity = clarity - np.where(has_question, w['question'], 0.0)
+        clarity = clarity - np.where(vague > 0, w['vague'] * vague, 0.0)
+        clarity = clarity + np.where(specific > 0, w['specific_action'] * np.minimum(specific, 1), 0.0)
+        clarity = clarity - np.where(
+            word_count < 3, w['very_short'],
+            np.where((word_count < 5) & (specific == 0), w['short'], 0.0)
+        )
+        has_specifics = (col['has_upper'] > 0) | (col['standard'] > 0)
+        clarity = clarity - np.where(~has_specifics, w['no_specifics'], 0.0)
+        clarity = clarity - np.where((col['action_verb'] == 0) & ~has_question, w['no_action_verb'], 0.0)
+        clarity = np.maximum(clarity, 0.0)
+        
+        return risk, clarity
+    
+    def _decide_matrix(self, features, risk, clarity,
+                       risk_threshold: Optional[float] = None,
+                       clarity_threshold: Optional[float] = None):
+        """Aplica las reglas de decisión por fila y retorna el código de regla"""
+        import numpy as np
+        
+        if risk_threshold is None:
+            risk_threshold = self.profile.risk_threshold
+        if clarity_threshold is None:
+            clarity_threshold = self.profile.clarity_threshold
+        
+        is_production = features[:, self.FEATURE_COLUMNS.index('is_production')] > 0
+        return np.select(
+            [is_production, risk >= risk_threshold, clarity < clarity_threshold],
+            [RULE_PRODUCTION, RULE_HIGH_RISK, RULE_LOW_CLARITY],
+            default=RULE_CLEAR
+        )
+    
+    def _assess_risk(self, task: str, context: Dict, features: Optional[TaskFeatures] = None,
+                     weights: Optional[Dict[str, float]] = None) -> float:
         """
         Calcula score de riesgo (0.0 - 1.0)
         
@@ -110,36 +771,39 @@ class ModeSelector:
         - Palabras peligrosas en la tarea
         - Recursos críticos mencionados
         - Scope de impacto
+        
+        Args:
+            features: Análisis previo de la tarea (opcional)
+            weights: Pesos a usar (por defecto, los del perfil actual)
         """
         risk = 0.0
-        task_lower = task.lower()
+        if features is None:
+            features = self.extract_features(task)
+        hits = features.hits
+        w = self.profile.weights if weights is None else weights
         
         # Factor 1: Palabras peligrosas (PESO AUMENTADO)
-        danger_words_found = sum(1 for word in self.DANGER_KEYWORDS if word in task_lower)
+        danger_words_found = hits['danger']
         if danger_words_found > 0:
-            risk += 0.5 * min(danger_words_found / 2, 1.0)  # AUMENTADO de 0.4 a 0.5
+            risk += w['danger'] * min(danger_words_found / 2, 1.0)
         
         # Factor 2: Recursos críticos
-        critical_resources = ['database', 'db', 'producción', 'production', 
-                            'payment', 'billing', 'auth', 'users', 'admin',
-                            'password', 'contraseña', 'credential', 'secret',
-                            'mfa', '2fa', 'autenticación', 'authentication']
-        critical_count = sum(1 for resource in critical_resources if resource in task_lower)
+        critical_count = hits['critical_resource']
         if critical_count > 0:
-            risk += 0.25 * min(critical_count, 2)  # Hasta 0.5 si hay múltiples
+            risk += w['critical_resource'] * min(critical_count, 2)  # Hasta 0.5 si hay múltiples
         
         # Factor 3: Scope amplio
-        broad_scope_indicators = ['all', 'every', 'todos', 'toda', 'cada', 'entire', 'completo', 'todo']
-        if any(indicator in task_lower for indicator in broad_scope_indicators):
-            risk += 0.2
+        if hits['broad_scope'] > 0:
+            risk += w['broad_scope']
         
         # Factor 4: Contexto de ambiente
         if context.get('has_active_users', False):
-            risk += 0.1
+            risk += w['active_users']
         
         return min(risk, 1.0)
     
-    def _assess_clarity(self, task: str) -> float:
+    def _assess_clarity(self, task: str, features: Optional[TaskFeatures] = None,
+                        weights: Optional[Dict[str, float]] = None) -> float:
         """
         Calcula score de claridad (0.0 - 1.0)
         
@@ -153,79 +817,91 @@ class ModeSelector:
         - Mayor penalización por palabras vagas
         - Menor penalización por longitud corta si es específica
         - Detección de acciones específicas
+        
+        Args:
+            features: Análisis previo de la tarea (opcional)
+            weights: Pesos a usar (por defecto, los del perfil actual)
         """
         clarity = 1.0
-        task_lower = task.lower()
+        if features is None:
+            features = self.extract_features(task)
+        hits = features.hits
+        w = self.profile.weights if weights is None else weights
         
         # Factor 1: Es una pregunta
-        if '?' in task:
-            clarity -= 0.4  # AUMENTADO de 0.3 a 0.4
+        if features.has_question:
+            clarity -= w['question']
         
         # Factor 2: Palabras vagas (PENALIZACIÓN AUMENTADA)
-        vague_words_found = sum(1 for word in self.VAGUE_KEYWORDS if word in task_lower)
+        vague_words_found = hits['vague']
         if vague_words_found > 0:
-            clarity -= 0.25 * vague_words_found  # AUMENTADO de 0.15 a 0.25
+            clarity -= w['vague'] * vague_words_found
         
         # Factor 3: Palabras de acción específica (BONUS)
-        specific_actions = sum(1 for action in self.SPECIFIC_ACTION_KEYWORDS if action in task_lower)
+        specific_actions = hits['specific_action']
         if specific_actions > 0:
-            clarity += 0.2 * min(specific_actions, 1)  # Hasta +0.2
+            clarity += w['specific_action'] * min(specific_actions, 1)  # Hasta +0.2
         
         # Factor 4: Longitud (ajustado)
-        word_count = len(task.split())
+        word_count = features.word_count
         if word_count < 3:
-            clarity -= 0.5  # Muy corto
+            clarity -= w['very_short']  # Muy corto
         elif word_count < 5:
             # Solo penaliza si NO tiene acción específica
             if specific_actions == 0:
-                clarity -= 0.3
+                clarity -= w['short']
         
         # Factor 5: No menciona recursos específicos
         # (nombres propios, frameworks, estándares)
         has_specifics = (
-            any(char.isupper() for char in task) or  # Nombres propios
-            any(word in task_lower for word in ['iso', 'soc', 'nist', 'gdpr', 'pci'])  # Estándares
+            features.has_upper or  # Nombres propios
+            hits['standard'] > 0  # Estándares
         )
         if not has_specifics:
-            clarity -= 0.2
+            clarity -= w['no_specifics']
         
         # Factor 6: Falta de verbo de acción clara
-        action_verbs = ['genera', 'crea', 'actualiza', 'configura', 'instala', 
-                       'modifica', 'elimina', 'revisa', 'analiza', 'escanea',
-                       'generate', 'create', 'update', 'configure', 'install']
-        has_action_verb = any(verb in task_lower for verb in action_verbs)
-        if not has_action_verb and '?' not in task:
-            clarity -= 0.15  # No es pregunta pero tampoco tiene verbo claro
+        has_action_verb = hits['action_verb'] > 0
+        if not has_action_verb and not features.has_question:
+            clarity -= w['no_action_verb']  # No es pregunta pero tampoco tiene verbo claro
         
         return max(clarity, 0.0)
     
+    def recent_decisions(self, limit: Optional[int] = None) -> Iterator[DecisionRecord]:
+        """Itera las decisiones más recientes primero"""
+        return self.decision_log.recent(limit)
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """Estadísticas de las decisiones retenidas en el decision_log"""
+        records = list(self.decision_log)
+        if not records:
+            return {'total_decisions': self.decision_log.total}
+        
+        modes_distribution = {}
+        for record in records:
+            modes_distribution[record.selected_mode] = modes_distribution.get(record.selected_mode, 0) + 1
+        
+        return {
+            'total_decisions': self.decision_log.total,
+            'retained_decisions': len(records),
+            'modes_distribution': modes_distribution,
+            'average_risk_score': round(sum(r.risk_score for r in records) / len(records), 2),
+            'average_clarity_score': round(sum(r.clarity_score for r in records) / len(records), 2)
+        }
+    
+    def last_decision(self) -> Optional[DecisionRecord]:
+        """Registro de la última decisión (None si aún no hay)"""
+        return self.decision_log[-1] if self.decision_log else None
+    
     def explain_last_decision(self) -> str:
         """Retorna explicación de la última decisión tomada"""
-        if not self.decision_log:
+        last = self.last_decision()
+        if last is None:
             return "No hay decisiones registradas aún"
-        
-        last = self.decision_log[-1]
-        mode_emoji = {
-            "PASSIVE": "🟦",
-            "DIRECT": "🟩",
-            "SAFE": "🟨"
-        }
-        
-        emoji = mode_emoji.get(last['selected_mode'], "⚪")
-        
-        return f"""
-{emoji} Decisión del ModeSelector:
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Tarea: "{last['task']}"
-Modo seleccionado: {last['selected_mode']}
-Razón: {last['reason']}
+        return last.explain()
 
-Factores analizados:
-  • Riesgo: {last['risk_score']:.2f} (0=seguro, 1=peligroso)
-  • Claridad: {last['clarity_score']:.2f} (0=vago, 1=claro)
-  • Ambiente: {last['environment']}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-"""
+ModeSelector.DEFAULT_PROFILE = ModeSelector.default_profile()
+ModeSelector.MATCHER = ModeSelector.DEFAULT_PROFILE.matcher
 
 # Test completo
 if __name__ == "__main__":
@@ -0,0 +1,281 @@
+"""
+PromptBudget - Presupuesto de tokens de los prompts de los motores
+
+Un log pegado en la tarea o un contexto enorme pueden superar la ventana del
+modelo o agregar segundos de prefill. Cada prompt se mide antes de enviarse
+y, si supera el presupuesto de su modo, se compacta en este orden:
+1. Se truncan los campos grandes del contexto, del más grande al más chico
+   y solo lo necesario (nunca por debajo de field_tokens)
+2. Se descartan campos del contexto, del más grande al más chico
+3. Se resume la tarea conservando el inicio y el final
+
+Los campos indicados en `keep` (p.ej. el plan que se valida en el MODO
+SEGURO) no se truncan ni se descartan; si aun así el prompt no cabe, se
+levanta PromptTooLarge en lugar de enviar un prompt incompleto.
+
+El conteo usa tiktoken; si no está disponible (o no puede cargar la
+codificación, p.ej. sin red) se estima a partir de los bytes UTF-8. Los
+conteos se memorizan por segmento: la plantilla fija de cada modo se cuenta
+una vez y la tarea / el contexto solo cuando cambian.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+
+# Presupuesto de tokens del prompt por modo
+DEFAULT_BUDGETS = {
+    'PASSIVE': 3000,
+    'DIRECT': 3000,
+    'SAFE': 2500,
+}
+
+TRUNCATED_MARKER = " …[truncado]"
+OMITTED_MARKER = "\n[… {omitted} tokens omitidos …]\n"
+
+
+class PromptTooLarge(Exception):
+    """Los campos del contexto que no se pueden compactar no caben en el presupuesto"""
+
+    def __init__(self, mode: str, tokens: int, budget: int):
+        super().__init__(f"Prompt {mode} de {tokens} tokens excede el presupuesto ({budget})")
+        self.mode = mode
+        self.tokens = tokens
+        self.budget = budget
+
+
+class TokenCounter:
+    """Cuenta tokens con tiktoken (o una estimación) y memoriza los conteos"""
+
+    # Bytes UTF-8 por token en la estimación sin tiktoken (conservadora)
+    BYTES_PER_TOKEN = 4
+
+    def __init__(self, encoding_name: str = 'cl100k_base', cache_size: int = 4096):
+        self.encoding_name = encoding_name
+        self.cache_size = cache_size
+        self._encoding = None
+        self._loaded = False
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def encoding(self):
+        """Codificación de tiktoken (None si se usa la estimación)"""
+        if not self._loaded:
+            self._loaded = True
+            # tiktoken se importa en el primer conteo, no al cargar el módulo
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except ImportError:
+                print("⚠️ tiktoken no disponible - estimando tokens por tamaño del texto")
+            except Exception as e:
+                print(f"⚠️ No se pudo cargar la codificación {self.encoding_name} ({e}) - estimando tokens")
+        return self._encoding
+
+    @property
+    def exact(self) -> bool:
+        """True si los conteos vienen de tiktoken (no carga la codificación)"""
+        return self._encoding is not None
+
+    # Textos más largos (logs pegados) no se memorizan
+    MAX_CACHED_CHARS = 8192
+
+    def count(self, text: str) -> int:
+        cacheable = len(text) <= self.MAX_CACHED_CHARS
+        if not cacheable:
+            return self._count(text)
+
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                return cached
+
+        tokens = self._count(text)
+        with self._lock:
+            self._cache[text] = tokens
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def _count(self, text: str) -> int:
+        encoding = self.encoding
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+        return -(-len(text.encode('utf-8')) // self.BYTES_PER_TOKEN)
+
+    def head(self, text: str, max_tokens: int) -> str:
+        """Primeros max_tokens tokens del texto"""
+        if max_tokens <= 0:
+            return ''
+        encoding = self.encoding
+        if encoding is not None:
+            return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+        return text.encode('utf-8')[:max_tokens * self.BYTES_PER_TOKEN].decode('utf-8', 'ignore')
+
+    def tail(self, text: str, max_tokens: int) -> str:
+        """Últimos max_tokens tokens del texto"""
+        if max_tokens <= 0:
+            return ''
+        encoding = self.encoding
+        if encoding is not None:
+            return encoding.decode(encoding.encode(text, disallowed_special=())[-max_tokens:])
+        return text.encode('utf-8')[-max_tokens * self.BYTES_PER_TOKEN:].decode('utf-8', 'ignore')
+
+
+_default_counter: Optional[TokenCounter] = None
+_default_lock = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    """Contador compartido del proceso (la codificación se carga una vez)"""
+    global _default_counter
+    with _default_lock:
+        if _default_counter is None:
+            _default_counter = TokenCounter()
+        return _default_counter
+
+
+class PromptBudget:
+    """
+    Arma prompts dentro del presupuesto de tokens de cada modo y registra
+    cuántos tokens lleva cada llamada.
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, field_tokens: int = 200,
+                 counter: Optional[TokenCounter] = None):
+        """
+        Args:
+            budgets: Tokens máximos del prompt por modo (por defecto DEFAULT_BUDGETS)
+            field_tokens: Tokens máximos de un campo del contexto al compactar
+            counter: Contador de tokens (por defecto el compartido)
+        """
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.field_tokens = field_tokens
+        self.counter = counter or get_token_counter()
+        self._overhead: Dict[Tuple[str, Any], int] = {}
+        self._lock = threading.Lock()
+
+        self.calls: Dict[str, int] = {}
+        self.tokens: Dict[str, int] = {}
+        self.max_tokens: Dict[str, int] = {}
+        self.compacted = 0
+        self.too_large = 0
+        self.last: Optional[Dict[str, Any]] = None
+
+    def _template_tokens(self, mode: str, build: Callable) -> int:
+        """Tokens de la parte fija del prompt (plantilla sin tarea ni contexto)"""
+        key = (mode, getattr(build, '__func__', build))
+        tokens = self._overhead.get(key)
+        if tokens is None:
+            tokens = self._overhead[key] = self.counter.count(build(''))
+        return tokens
+
+    def _estimate(self, mode: str, build: Callable, task: str, context: Optional[Dict]) -> int:
+        tokens = self._template_tokens(mode, build) + self.counter.count(task)
+        if context:
+            tokens += self.counter.count(str(context))
+        return tokens
+
+    def build(self, mode: str, build: Callable[..., str], task: str,
+              context: Optional[Dict] = None, keep: Tuple[str, ...] = ()) -> str:
+        """
+        Prompt del modo, compactado si supera el presupuesto.
+
+        Args:
+            mode: "PASSIVE", "DIRECT" o "SAFE"
+            build: Método que arma el prompt: build(tarea, contexto), o
+                   build(tarea) si no hay contexto. Debe ser siempre la misma
+                   función para un modo (su plantilla se cuenta una sola vez)
+            task: Tarea del usuario
+            context: Contexto de la tarea (None si el prompt no lo usa)
+            keep: Campos del contexto que se envían completos
+
+        Raises:
+            PromptTooLarge: Si con los campos de `keep` completos el prompt
+                            no cabe en el presupuesto
+        """
+        budget = self.budgets.get(mode)
+        tokens = self._estimate(mode, build, task, context)
+        actions: List[str] = []
+
+        if budget is not None and tokens > budget:
+            task, context, actions = self._compact(mode, build, task, context, budget, keep)
+            tokens = self._estimate(mode, build, task, context)
+            if keep and tokens > budget:
+                with self._lock:
+                    self.too_large += 1
+                raise PromptTooLarge(mode, tokens, budget)
+
+        self._record(mode, tokens, budget, actions)
+        return build(task) if context is None else build(task, context)
+
+    def _compact(self, mode: str, build: Callable, task: str, context: Optional[Dict],
+                 budget: int, keep: Tuple[str, ...] = ()) -> Tuple[str, Optional[Dict], List[str]]:
+        counter = self.counter
+        actions = []
+
+        if context:
+            context = dict(context)
+            by_size = sorted((key for key in context if key not in keep),
+                             key=lambda key: counter.count(str(context[key])), reverse=True)
+
+            # 1. Truncar campos grandes, solo lo que falta para entrar
+            for key in by_size:
+                excess = self._estimate(mode, build, task, context) - budget
+                if excess <= 0:
+                    break
+                text = context[key] if isinstance(context[key], str) else str(context[key])
+                tokens = counter.count(text)
+                truncated = False
+                while excess > 0 and tokens > self.field_tokens:
+                    tokens = max(tokens - excess - counter.count(TRUNCATED_MARKER), self.field_tokens)
+                    text = counter.head(text, tokens)
+                    context[key] = text + TRUNCATED_MARKER
+                    truncated = True
+                    excess = self._estimate(mode, build, task, context) - budget
+                if truncated:
+                    actions.append(f"truncado:{key}")
+
+            # 2. Descartar campos, del más grande al más chico
+            by_size.sort(key=lambda key: counter.count(str(context[key])), reverse=True)
+            for key in by_size:
+                if self._estimate(mode, build, task, context) <= budget:
+                    break
+                del context[key]
+                actions.append(f"descartado:{key}")
+
+        # 3. Resumir la tarea: inicio y final, con la cantidad omitida
+        room = budget - self._estimate(mode, build, '', context)
+        task_tokens = counter.count(task)
+        if task_tokens > room:
+            kept = max(room - counter.count(OMITTED_MARKER), 0)
+            head_tokens = kept * 2 // 3
+            tail_tokens = kept - head_tokens
+            marker = OMITTED_MARKER.format(omitted=task_tokens - kept)
+            task = counter.head(task, head_tokens) + marker + counter.tail(task, tail_tokens)
+            actions.append("resumida:tarea")
+
+        return task, context, actions
+
+    def _record(self, mode: str, tokens: int, budget: Optional[int], actions: List[str]):
+        with self._lock:
+            self.calls[mode] = self.calls.get(mode, 0) + 1
+            self.tokens[mode] = self.tokens.get(mode, 0) + tokens
+            self.max_tokens[mode] = max(self.max_tokens.get(mode, 0), tokens)
+            if actions:
+                self.compacted += 1
+            self.last = {'mode': mode, 'tokens': tokens, 'budget': budget, 'compacted': actions}
+
+    def stats(self) -> Dict[str, Any]:
+        """Tokens de prompt por modo y prompts compactados"""
+        with self._lock:
+            return {
+                'exact': self.counter.exact,
+                'calls': dict(self.calls),
+                'tokens': dict(self.tokens),
+                'max_tokens': dict(self.max_tokens),
+                'compacted': self.compacted,
+                'too_large': self.too_large,
+                'last': self.last,
+            }
@@ -0,0 +1,246 @@
+"""
+PromptRegistry - Prompts versionados desde configs/prompts.yaml
+
+Cada prompt es un prefijo fijo (instrucciones y formato de respuesta) más un
+sufijo con las partes variables. Con el prefijo siempre igual:
+- Los proveedores con caché de prompts reutilizan el prefill del prefijo
+  (OpenAI lo hace solo; para Claude, PromptCachingLLM lo marca con
+  cache_control)
+- Los tokens del prefijo se cuentan una vez por plantilla, así que se puede
+  medir cuánto del prefill es cacheable
+
+Las plantillas se leen y se compilan una vez por proceso: el sufijo se
+separa en literales y campos, y renderizar es solo concatenar.
+"""
+from pathlib import Path
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import threading
+
+from agent_core.llm_wrappers import LLMWrapper
+
+DEFAULT_PROMPTS_PATH = Path(__file__).parent.parent / 'configs' / 'prompts.yaml'
+
+# Plantillas que usan los motores y los campos variables de cada una
+REQUIRED_FIELDS = {
+    'passive': {'task', 'context'},
+    'direct': {'task'},
+    'safe': {'task'},
+    'plan': {'task'},
+    'validation': {'task', 'plan'},
+}
+
+# Proveedores donde el prefijo se marca explícitamente como cacheable
+PROMPT_CACHING_PROVIDERS = ('claude',)
+
+
+class PromptTemplate:
+    """Prefijo fijo + sufijo precompilado en (literal, campo)"""
+
+    def __init__(self, name: str, mode: str, prefix: str, suffix: str, version: int = 1):
+        self.name = name
+        self.mode = mode
+        self.prefix = prefix
+        self.suffix = suffix
+        self.version = version
+        self.parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in Formatter().parse(suffix):
+            if spec or conversion:
+                raise ValueError(f"Prompt {name}: el campo {{{field}}} no admite formato ni conversión")
+            self.parts.append((literal, field))
+        self.fields = {field for _, field in self.parts if field is not None}
+        self._prefix_tokens: Optional[int] = None
+
+    def render(self, **values: Any) -> str:
+        pieces = [self.prefix]
+        for literal, field in self.parts:
+            pieces.append(literal)
+            if field is not None:
+                pieces.append(str(values[field]))
+        return ''.join(pieces)
+
+    @property
+    def prefix_tokens(self) -> int:
+        """Tokens del prefijo (se cuentan una sola vez)"""
+        if self._prefix_tokens is None:
+            from agent_core.prompt_budget import get_token_counter
+            self._prefix_tokens = get_token_counter().count(self.prefix)
+        return self._prefix_tokens
+
+
+def load_prompts(path: str) -> Tuple[int, Dict[str, PromptTemplate]]:
+    """
+    Lee y valida un archivo de prompts.
+
+    Formato:
+        version: 1
+        prompts:
+          passive: {mode: PASSIVE, version: 1, prefix: "...", suffix: "Tarea: {task}..."}
+
+    Returns:
+        (versión del archivo, {nombre: PromptTemplate})
+
+    Lanza ValueError si falta una plantilla de REQUIRED_FIELDS o si sus
+    campos variables no coinciden.
+    """
+    import yaml
+
+    with open(path, encoding='utf-8') as f:
+        data = yaml.safe_load(f) or {}
+
+    section: Dict[str, Any] = data.get('prompts') or {}
+    missing = set(REQUIRED_FIELDS) - set(section)
+    if missing:
+        raise ValueError(f"Faltan prompts en {path}: {sorted(missing)}")
+
+    templates = {}
+    for name, spec in section.items():
+        template = PromptTemplate(name, str(spec.get('mode', '')), spec.get('prefix') or '',
+                                  spec.get('suffix') or '', int(spec.get('version', 1)))
+        if any(field is not None for _, field, _, _ in Formatter().parse(template.prefix)):
+            raise ValueError(f"Prompt {name}: el prefijo no puede tener campos variables")
+        expected = REQUIRED_FIELDS.get(name)
+        if expected is not None and template.fields != expected:
+            raise ValueError(f"Prompt {name}: campos {sorted(template.fields)}, se esperaban {sorted(expected)}")
+        templates[name] = template
+    return int(data.get('version', 1)), templates
+
+
+class PromptRegistry:
+    """Plantillas compiladas y cuántas veces se envió cada una"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Archivo YAML de prompts (por defecto configs/prompts.yaml)
+        """
+        self.path = str(path or DEFAULT_PROMPTS_PATH)
+        self.version, self.templates = load_prompts(self.path)
+        self._lock = threading.Lock()
+        self.sent: Dict[str, int] = {}
+        # De prefijo más largo a más corto, para reconocer un prompt renderizado
+        self._by_prefix = sorted((template for template in self.templates.values() if template.prefix),
+                                 key=lambda template: len(template.prefix), reverse=True)
+
+    def render(self, name: str, **values: Any) -> str:
+        return self.templates[name].render(**values)
+
+    def match(self, prompt: str) -> Optional[PromptTemplate]:
+        """Plantilla de la que viene el prompt (None si no viene de ninguna)"""
+        for template in self._by_prefix:
+            if prompt.startswith(template.prefix):
+                return template
+        return None
+
+    def split(self, prompt: str) -> Optional[Tuple[str, str]]:
+        """(prefijo fijo, resto) si el prompt viene de una plantilla; None si no"""
+        template = self.match(prompt)
+        if template is None:
+            return None
+        return template.prefix, prompt[len(template.prefix):]
+
+    def record(self, prompt: str):
+        """Anota un prompt enviado al LLM (para medir el prefill cacheable)"""
+        template = self.match(prompt)
+        if template is not None:
+            with self._lock:
+                self.sent[template.name] = self.sent.get(template.name, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Versión y tokens de prefijo cacheables enviados por plantilla"""
+        with self._lock:
+            sent = dict(self.sent)
+        # Solo se cuentan las plantillas usadas (contar puede cargar tiktoken)
+        prefix_tokens = {name: self.templates[name].prefix_tokens for name in sent}
+        return {
+            'version': self.version,
+            'sent': sent,
+            'prefix_tokens': prefix_tokens,
+            'cacheable_tokens': sum(prefix_tokens[name] * count for name, count in sent.items()),
+        }
+
+
+class PromptCachingLLM(LLMWrapper):
+    """
+    Cliente de Claude que marca el prefijo fijo de los prompts como cacheable.
+
+    Recibe el prompt como texto (igual que el resto de las capas) y lo envía
+    como un mensaje de dos bloques, el primero con cache_control. Anota los
+    tokens leídos y escritos en el caché del proveedor.
+    """
+
+    def __init__(self, llm: Any, prompts: PromptRegistry):
+        super().__init__(llm)
+        self.prompts = prompts
+        self._lock = threading.Lock()
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+        self.input_tokens = 0
+
+    def _messages(self, prompt: Any) -> Any:
+        parts = self.prompts.split(prompt) if isinstance(prompt, str) else None
+        if parts is None:
+            return prompt
+        from langchain_core.messages import HumanMessage
+        prefix, rest = parts
+        return [HumanMessage(content=[
+            {'type': 'text', 'text': prefix, 'cache_control': {'type': 'ephemeral'}},
+            {'type': 'text', 'text': rest},
+        ])]
+
+    def _account(self, response: Any):
+        usage = getattr(response, 'usage_metadata', None)
+        if not isinstance(usage, dict):
+            return
+        details = usage.get('input_token_details') or {}
+        with self._lock:
+            self.input_tokens += usage.get('input_tokens', 0)
+            self.cache_read_tokens += details.get('cache_read', 0) or 0
+            self.cache_creation_tokens += details.get('cache_creation', 0) or 0
+
+    def invoke(self, prompt: str, **kwargs) -> Any:
+        response = self.llm.invoke(self._messages(prompt), **kwargs)
+        self._account(response)
+        return response
+
+    async def ainvoke(self, prompt: str, **kwargs) -> Any:
+        response = await self.llm.ainvoke(self._messages(prompt), **kwargs)
+        self._account(response)
+        return response
+
+    def stream(self, prompt: str, **kwargs):
+        for chunk in super().stream(self._messages(prompt), **kwargs):
+            self._account(chunk)
+            yield chunk
+
+    async def astream(self, prompt: str, **kwargs):
+        async for chunk in super().astream(self._messages(prompt), **kwargs):
+            self._account(chunk)
+            yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        """Prefill leído del caché del proveedor vs. total de tokens de entrada"""
+        return {
+            'input_tokens': self.input_tokens,
+            'cache_read_tokens': self.cache_read_tokens,
+            'cache_creation_tokens': self.cache_creation_tokens,
+        }
+
+
+_default_registry: Optional[PromptRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """
+    Registro compartido del proceso.
+
+    Se lee de configs/prompts.yaml, o de la ruta de la variable de entorno
+    MARTIN_PROMPTS.
+    """
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = PromptRegistry(os.getenv('MARTIN_PROMPTS') or None)
+        return _default_registry
@@ -3,18 +3,66 @@ Los 3 motores de razonamiento de M.A.R.T.I.N.
 Soporta OpenAI (GPT-4) y Anthropic (Claude)
 CON INTEGRACIÓN DE TOOLS
 """
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Callable, Iterator, Optional, Tuple
+import json
 import os
 import sys
 from pathlib import Path
 
-# Importar tools
-sys.path.insert(0, str(Path(__file__).parent.parent))
-try:
-    from tools.policy_generator import PolicyGenerator
-except ImportError:
-    PolicyGenerator = None
-    print("⚠️ PolicyGenerator no disponible - instala dependencias")
+from agent_core.mode_selector import ModeSelector
+from agent_core.prompt_budget import PromptBudget, PromptTooLarge
+from agent_core.task_features import TaskFeatures
+
+# Estrategias del MODO SEGURO
+SAFE_SINGLE = "single"      # Plan + validación en una sola llamada estructurada
+SAFE_TWO_STEP = "two_step"  # Plan y luego validación (dos llamadas secuenciales)
+SAFE_STRATEGIES = (SAFE_SINGLE, SAFE_TWO_STEP)
+# En el resultado: la validación es la simulada porque el LLM no la produjo
+SAFE_MOCK = "mock"
+
+# Validación cuando el plan no cabe completo en el prompt de validación:
+# un plan que no se puede revisar entero no se aprueba
+PLAN_TOO_LARGE_VALIDATION = """
+NIVEL DE RIESGO: ALTO
+
+RIESGOS IDENTIFICADOS:
+- El plan excede el presupuesto de tokens de la validación
+- No se pudo revisar el plan completo
+
+DECISIÓN: RECHAZAR
+
+ALTERNATIVA SEGURA:
+1. Dividir la tarea en pasos más pequeños
+2. Validar cada paso por separado
+"""
+
+# Marcadores de sección de la respuesta estructurada del MODO SEGURO
+SAFE_PLAN_MARKER = "=== PLAN ==="
+SAFE_VALIDATION_MARKER = "=== VALIDACIÓN ==="
+
+# Tipos de fragmento de las respuestas en streaming
+STREAM_MODE = "mode"      # Modo seleccionado (primer fragmento del agente)
+STREAM_TOKEN = "token"    # Texto incremental de la respuesta
+STREAM_RESULT = "result"  # Resultado final, igual al de la versión sin streaming
+
+# Las tools (y sus dependencias) se importan recién cuando una tarea las necesita
+_UNLOADED = object()
+_policy_generator_class: Any = _UNLOADED
+
+
+def _load_policy_generator() -> Optional[type]:
+    """Clase PolicyGenerator (None si no está disponible); se importa una sola vez"""
+    global _policy_generator_class
+    if _policy_generator_class is _UNLOADED:
+        sys.path.insert(0, str(Path(__file__).parent.parent))
+        try:
+            from tools.policy_generator import PolicyGenerator
+        except ImportError:
+            PolicyGenerator = None
+            print("⚠️ PolicyGenerator no disponible - instala dependencias")
+        _policy_generator_class = PolicyGenerator
+    return _policy_generator_class
+
 
 class ReasoningEngines:
     """
@@ -23,15 +71,101 @@ class ReasoningEngines:
     AHORA CON HERRAMIENTAS REALES
     """
     
-    def __init__(self, use_llm: bool = False, llm_provider: str = "auto"):
+    def __init__(self, use_llm: bool = False, llm_provider: str = "auto",
+                 safe_strategy: str = SAFE_SINGLE, safe_fallback: bool = True,
+                 llm_cache: Any = True, similarity_cache: Any = False,
+                 similarity_threshold: Optional[float] = None,
+                 hedge_provider: Optional[str] = None,
+                 prompt_budgets: Optional[Dict[str, int]] = None,
+                 rate_limits: Any = True, cassette: Any = None,
+                 cassette_mode: str = "replay", coalesce: bool = True,
+                 prompts: Any = None, circuit_breaker: Any = True,
+                 fallback_provider: Optional[str] = None,
+                 mode_selector: Optional[ModeSelector] = None):
         """
         Args:
             use_llm: Si True, usa LLM real. Si False, usa respuestas simuladas.
-            llm_provider: "openai", "claude", o "auto" (detecta automáticamente)
+            llm_provider: "openai", "claude", "fake" (LLM falso para pruebas de
+                          carga) o "auto" (detecta automáticamente)
+            safe_strategy: "single" (una llamada con plan + validación) o
+                           "two_step" (plan y luego validación)
+            safe_fallback: Si True, "single" recurre al flujo de dos pasos cuando
+                           la respuesta estructurada no se puede interpretar
+            llm_cache: True (caché compartido del proceso), un LLMResponseCache,
+                       o False para no memorizar respuestas del LLM
+            similarity_cache: True (caché compartido del proceso), un
+                              SimilarityCache, o False (por defecto).
+                              Reutiliza respuestas PASSIVE y DIRECT
+                              informativas de tareas casi idénticas cuyos
+                              números, estándares y negaciones coinciden;
+                              nunca del MODO SEGURO
+            similarity_threshold: Similitud mínima para reutilizar (con
+                                  similarity_cache=True crea un caché propio
+                                  con ese umbral en vez del compartido)
+            hedge_provider: Proveedor secundario ("openai"/"claude"). Si se
+                            indica, las llamadas lentas del primario se
+                            reenvían también al secundario (HedgedLLM)
+            prompt_budgets: Tokens máximos del prompt por modo (se combinan
+                            con DEFAULT_BUDGETS de prompt_budget)
+            rate_limits: True (control de admisión compartido por proveedor con
+                         DEFAULT_LIMITS), {proveedor: límites} para configurarlo
+                         (max_in_flight, rpm, tpm, max_wait), o False para no
+                         limitar las llamadas
+            cassette: Ruta (o Cassette) de llamadas grabadas. Con cassette
+                      no se usan los cachés de respuestas ni por similitud,
+                      así que cada llamada se graba y se reproduce igual
+            cassette_mode: "record" (llamar al proveedor y grabar), "replay"
+                           (responder desde el cassette, sin red ni API keys)
+                           o "replay_timed" (con las latencias grabadas)
+            coalesce: Si True, las llamadas idénticas concurrentes (de todos
+                      los motores del proceso) comparten una sola llamada
+                      al proveedor
+            prompts: PromptRegistry (o ruta a un YAML de prompts); por
+                     defecto el compartido, de configs/prompts.yaml
+            circuit_breaker: True (breaker compartido por proveedor con
+                             DEFAULT_BREAKER), {proveedor: configuración}
+                             (failure_threshold, reset_timeout, probe), o
+                             False. Con el circuito abierto no se llama al
+                             proveedor: se responde del caché, del proveedor
+                             de respaldo o con la respuesta simulada
+            fallback_provider: Proveedor que responde mientras el primario
+                               tiene el circuito abierto (por defecto
+                               hedge_provider)
+            mode_selector: Selector cuyo perfil (vocabulario recargable)
+                           analiza las tareas que llegan sin features; sin
+                           selector se usa el vocabulario por defecto
         """
+        if safe_strategy not in SAFE_STRATEGIES:
+            raise ValueError(f"safe_strategy debe ser uno de {SAFE_STRATEGIES}: {safe_strategy}")
+        self.safe_strategy = safe_strategy
+        self.safe_fallback = safe_fallback
         self.use_llm = use_llm
         self.llm = None
         self.llm_provider = None
+        self._llm_cache = llm_cache
+        self._similarity_cache = similarity_cache
+        self.similarity_threshold = similarity_threshold
+        self.hedge_provider = hedge_provider
+        self.rate_limits = rate_limits
+        self.coalesce = coalesce
+        self.circuit_breaker = circuit_breaker
+        self.fallback_provider = fallback_provider
+        self.mode_selector = mode_selector
+        self._prompts = prompts
+        if isinstance(prompts, (str, Path)):
+            from agent_core.prompt_registry import PromptRegistry
+            self._prompts = PromptRegistry(prompts)
+        self.cassette = None
+        self.cassette_mode = cassette_mode
+        if cassette is not None:
+            from agent_core.llm_cassette import CASSETTE_MODES, Cassette, open_cassette
+            if cassette_mode not in CASSETTE_MODES:
+                raise ValueError(f"cassette_mode debe ser uno de {CASSETTE_MODES}: {cassette_mode}")
+            self.cassette = cassette if isinstance(cassette, Cassette) else open_cassette(cassette)
+            self._llm_cache = self._similarity_cache = False
+        self.prompt_budget = PromptBudget(prompt_budgets)
+        self.similarity_cache = None
+        self._policy_generator: Any = _UNLOADED
         
         if self.use_llm:
             self.llm_provider = self._initialize_llm(llm_provider)
@@ -39,82 +173,267 @@ class ReasoningEngines:
                 print("⚠️ No se pudo inicializar LLM. Usando modo simulado.")
                 self.use_llm = False
         
-        # Inicializar herramientas
-        if PolicyGenerator:
-            self.policy_generator = PolicyGenerator(llm=self.llm if self.use_llm else None)
-        else:
-            self.policy_generator = None
     
     def _initialize_llm(self, provider: str):
-        """Inicializa el LLM según el proveedor especificado"""
-        
-        # Auto-detectar qué API key está disponible
-        if provider == "auto":
-            if os.getenv("ANTHROPIC_API_KEY"):
-                provider = "claude"
-                print("🔍 Auto-detectado: Claude API key disponible")
-            elif os.getenv("OPENAI_API_KEY"):
-                provider = "openai"
-                print("🔍 Auto-detectado: OpenAI API key disponible")
+        """Toma del registro compartido el cliente del proveedor especificado"""
+        from agent_core.llm_registry import get_llm_registry, resolve_provider
+        
+        # Reproducción: el cassette reemplaza al proveedor
+        if self.cassette is not None and self.cassette_mode != "record":
+            from agent_core.llm_cassette import CASSETTE_REPLAY_TIMED, ReplayLLM
+            if provider == "auto":
+                provider = self.cassette.provider or "replay"
+            timed = self.cassette_mode == CASSETTE_REPLAY_TIMED
+            self._attach_llm(ReplayLLM(self.cassette, timed=timed), provider)
+            print(f"📼 Reproduciendo {self.cassette.path.name} ({len(self.cassette)} respuestas)")
+            return provider
+        
+        provider = resolve_provider(provider)
+        if provider is None:
+            return None
+        
+        client = get_llm_registry().get(provider)
+        if client is None:
+            return None
+        self._attach_llm(client, provider)
+        return provider
+    
+    def _attach_llm(self, client: Any, provider: str):
+        """Envuelve el cliente compartido con las capas propias de este motor"""
+        # Prefijo fijo de los prompts marcado como cacheable en el proveedor
+        from agent_core.prompt_registry import PROMPT_CACHING_PROVIDERS
+        if provider in PROMPT_CACHING_PROVIDERS:
+            from agent_core.prompt_registry import PromptCachingLLM
+            client = PromptCachingLLM(client, self.prompts)
+        
+        raw = client
+        # Grabación justo sobre el cliente: los tiempos no incluyen la cola
+        if self.cassette is not None and self.cassette_mode == "record":
+            from agent_core.llm_cassette import RecordingLLM
+            client = RecordingLLM(client, self.cassette, provider)
+        
+        cache = None
+        if self._llm_cache:
+            from agent_core.llm_cache import get_default_cache
+            cache = get_default_cache() if self._llm_cache is True else self._llm_cache
+        
+        # Otros proveedores: respaldo con el circuito abierto y/o hedging
+        secondaries = {}
+        for name in (self.fallback_provider or self.hedge_provider, self.hedge_provider):
+            if name and name != provider and name not in secondaries:
+                from agent_core.llm_registry import get_llm_registry
+                secondary = get_llm_registry().get(name)
+                if secondary is not None:
+                    secondaries[name] = self._guarded(self._limited(secondary, name), name, secondary)
+        
+        fallback = secondaries.get(self.fallback_provider or self.hedge_provider)
+        self.llm = self._guarded(self._limited(client, provider), provider, raw, cache, fallback)
+        
+        # Respaldo en el otro proveedor para la cola lenta de latencias
+        if self.hedge_provider in secondaries:
+            from agent_core.llm_hedging import HedgedLLM
+            self.llm = HedgedLLM(self.llm, secondaries[self.hedge_provider], provider, self.hedge_provider)
+        
+        # Llamadas idénticas en vuelo: una sola al proveedor
+        if self.coalesce:
+            from agent_core.llm_singleflight import CoalescedLLM, get_single_flight
+            self.llm = CoalescedLLM(self.llm, get_single_flight(), provider)
+        
+        # Caché de respuestas por contenido (prompts idénticos no vuelven a la API)
+        if cache is not None:
+            from agent_core.llm_cache import CachedLLM
+            self.llm = CachedLLM(self.llm, cache, provider)
+        
+        # Caché por similitud (solo tiene sentido con LLM real)
+        if self._similarity_cache and self.similarity_cache is None:
+            from agent_core.similarity_cache import SimilarityCache, get_default_similarity_cache
+            if self._similarity_cache is not True:
+                self.similarity_cache = self._similarity_cache
+            elif self.similarity_threshold is not None:
+                self.similarity_cache = SimilarityCache(threshold=self.similarity_threshold)
             else:
-                print("⚠️ No se encontró OPENAI_API_KEY ni ANTHROPIC_API_KEY")
-                return None
+                self.similarity_cache = get_default_similarity_cache()
+    
+    def _limited(self, client: Any, provider: str) -> Any:
+        """Cliente detrás del control de admisión de su proveedor (cupos y cola FIFO)"""
+        if not self.rate_limits:
+            return client
+        from agent_core.llm_limiter import RateLimitedLLM, get_admission_controller
+        limits = self.rate_limits.get(provider) if isinstance(self.rate_limits, dict) else None
+        return RateLimitedLLM(client, get_admission_controller(provider, limits))
+    
+    def _guarded(self, client: Any, provider: str, probe: Any, cache: Any = None,
+                 fallback: Any = None) -> Any:
+        """Cliente detrás del circuit breaker de su proveedor (sin red si está abierto)"""
+        if not self.circuit_breaker or (self.cassette is not None and self.cassette_mode != "record"):
+            return client
+        from agent_core.llm_breaker import BreakerLLM, get_circuit_breaker
+        settings = self.circuit_breaker.get(provider) if isinstance(self.circuit_breaker, dict) else None
+        return BreakerLLM(client, get_circuit_breaker(provider, settings), provider,
+                          stale_cache=cache, fallback=fallback, probe=probe)
+    
+    @property
+    def policy_generator(self) -> Optional[Any]:
+        """Policy Generator con el LLM actual (se crea en el primer uso)"""
+        if self._policy_generator is _UNLOADED:
+            generator_class = _load_policy_generator()
+            self._policy_generator = (generator_class(llm=self.llm if self.use_llm else None)
+                                      if generator_class else None)
+        return self._policy_generator
+    
+    @policy_generator.setter
+    def policy_generator(self, generator: Optional[Any]):
+        self._policy_generator = generator
+    
+    def set_provider(self, provider: str) -> bool:
+        """
+        Cambia de proveedor LLM sin reconstruir el motor.
         
-        # Inicializar OpenAI
-        if provider == "openai":
-            try:
-                from langchain_openai import ChatOpenAI
-                api_key = os.getenv("OPENAI_API_KEY")
-                
-                if not api_key:
-                    print("⚠️ OPENAI_API_KEY no configurada")
-                    return None
-                
-                self.llm = ChatOpenAI(
-                    model="gpt-4",
-                    temperature=0,
-                    api_key=api_key
-                )
-                print("✅ LLM inicializado: OpenAI GPT-4")
-                return "openai"
-                
-            except ImportError:
-                print("⚠️ langchain no instalado")
-                return None
-            except Exception as e:
-                print(f"⚠️ Error inicializando OpenAI: {e}")
-                return None
+        El cliente sale del registro compartido (se crea una sola vez por
+        proceso), así que el cambio es solo reasignar referencias.
         
-        # Inicializar Claude
-        elif provider == "claude":
-            try:
-                from langchain_anthropic import ChatAnthropic
-                api_key = os.getenv("ANTHROPIC_API_KEY")
-                
-                if not api_key:
-                    print("⚠️ ANTHROPIC_API_KEY no configurada")
-                    return None
-                
-                self.llm = ChatAnthropic(
-                    model="claude-3-5-sonnet-20240620",
-                    temperature=0,
-                    anthropic_api_key=api_key
-                )
-                print("✅ LLM inicializado: Anthropic Claude 3.5 Sonnet")
-                return "claude"
-                
-            except ImportError:
-                print("⚠️ anthropic no instalado. Instala con: pip install anthropic")
-                return None
-            except Exception as e:
-                print(f"⚠️ Error inicializando Claude: {e}")
-                return None
+        Returns:
+            True si el proveedor quedó activo; False si no hay cliente
+            disponible (se mantiene el proveedor anterior)
+        """
+        from agent_core.llm_registry import get_llm_registry
         
-        else:
-            print(f"⚠️ Proveedor desconocido: {provider}")
+        client = get_llm_registry().get(provider)
+        if client is None:
+            return False
+        self._attach_llm(client, provider)
+        self.llm_provider = provider
+        self.use_llm = True
+        # Las herramientas se recrean con el nuevo cliente en su próximo uso
+        self._policy_generator = _UNLOADED
+        return True
+    
+    def llm_cache_stats(self) -> Dict[str, Any]:
+        """Métricas del caché de respuestas del LLM ({} si no se usa)"""
+        cache = getattr(self.llm, 'cache', None)
+        return cache.stats() if cache is not None else {}
+    
+    def _layer(self, kind: type) -> Optional[Any]:
+        """Capa de tipo kind en la cadena de wrappers del LLM (None si no está)"""
+        from agent_core.llm_wrappers import LLMWrapper
+        
+        llm = self.llm
+        while isinstance(llm, LLMWrapper):
+            if isinstance(llm, kind):
+                return llm
+            llm = llm.llm
+        return None
+    
+    def hedging_stats(self) -> Dict[str, Any]:
+        """Métricas del respaldo entre proveedores ({} si no se usa)"""
+        if not self.hedge_provider:
+            return {}
+        from agent_core.llm_hedging import HedgedLLM
+        layer = self._layer(HedgedLLM)
+        return layer.stats() if layer is not None else {}
+    
+    def limiter_stats(self) -> Dict[str, Any]:
+        """Cola y esperas del control de admisión por proveedor ({} si no se usa)"""
+        if not self.rate_limits or not self.use_llm:
+            return {}
+        from agent_core.llm_limiter import get_admission_controller
+        providers = (self.llm_provider, self.hedge_provider, self.fallback_provider)
+        return {provider: get_admission_controller(provider).stats()
+                for provider in dict.fromkeys(providers) if provider}
+    
+    def breaker_stats(self) -> Dict[str, Any]:
+        """Estado del circuito y respaldos servidos por proveedor ({} si no se usa)"""
+        if not self.circuit_breaker or not self.use_llm:
+            return {}
+        from agent_core.llm_breaker import BreakerLLM
+        layer = self._layer(BreakerLLM)
+        stats = {}
+        while isinstance(layer, BreakerLLM):
+            stats[layer.provider] = layer.stats()
+            layer = layer.fallback
+        return stats
+    
+    def coalescing_stats(self) -> Dict[str, Any]:
+        """Llamadas duplicadas que compartieron una llamada en vuelo ({} si no se usa)"""
+        from agent_core.llm_singleflight import CoalescedLLM
+        layer = self._layer(CoalescedLLM) if self.use_llm else None
+        return layer.group.stats() if layer is not None else {}
+    
+    def cassette_stats(self) -> Dict[str, Any]:
+        """Respuestas grabadas / reproducidas del cassette ({} si no se usa)"""
+        return self.cassette.stats() if self.cassette is not None else {}
+    
+    def similarity_cache_stats(self) -> Dict[str, Any]:
+        """Métricas del caché por similitud ({} si no se usa)"""
+        return self.similarity_cache.stats() if self.similarity_cache is not None else {}
+    
+    def _similar_namespace(self, mode: str, context: Dict = None) -> str:
+        """Espacio del caché por similitud: modo, proveedor y contexto del prompt"""
+        return f"{mode}|{self.llm_provider}|{json.dumps(context or {}, sort_keys=True, default=str)}"
+    
+    def _similar_lookup(self, task: str, namespace: str) -> Optional[Tuple[str, float]]:
+        """(respuesta, similitud) de una tarea casi idéntica ya respondida, o None"""
+        if self.similarity_cache is None:
             return None
+        return self.similarity_cache.lookup(task, namespace)
+    
+    def _similar_store(self, task: str, namespace: str, response: str):
+        if self.similarity_cache is not None:
+            self.similarity_cache.store(task, response, namespace)
+    
+    @staticmethod
+    def _is_informational(features: TaskFeatures) -> bool:
+        """True si una tarea DIRECT solo pide información (no ejecuta acciones)"""
+        return not (features.has_any('action_verb') or features.has_any('specific_action')
+                    or features.has_any('danger'))
+    
+    def _features(self, task: str, features: Optional[TaskFeatures]) -> TaskFeatures:
+        """Reutiliza el análisis de la tarea o lo calcula si no se recibió"""
+        if features is None:
+            if self.mode_selector is not None:
+                features = self.mode_selector.extract_features(task)
+            else:
+                features = TaskFeatures.extract(task, ModeSelector.MATCHER)
+        return features
+    
+    def _invoke(self, prompt: str) -> str:
+        """Llama al LLM y retorna el texto de la respuesta"""
+        return self.llm.invoke(prompt).content
+    
+    async def _ainvoke(self, prompt: str) -> str:
+        """Versión asíncrona de _invoke (usa ainvoke del proveedor)"""
+        return (await self.llm.ainvoke(prompt)).content
+    
+    def _prompt(self, mode: str, build: Callable[..., str], task: str, context: Dict = None,
+                keep: Tuple[str, ...] = ()) -> str:
+        """Prompt dentro del presupuesto de tokens del modo (ver PromptBudget)"""
+        prompt = self.prompt_budget.build(mode, build, task, context, keep)
+        self.prompts.record(prompt)
+        return prompt
+    
+    @property
+    def prompts(self) -> Any:
+        """Plantillas de prompts (configs/prompts.yaml, se leen en el primer uso)"""
+        if self._prompts is None:
+            from agent_core.prompt_registry import get_prompt_registry
+            self._prompts = get_prompt_registry()
+        return self._prompts
+    
+    def prompt_stats(self) -> Dict[str, Any]:
+        """Tokens de prompt por modo y prefijos cacheables enviados"""
+        stats = self.prompt_budget.stats()
+        stats['prefix'] = self._prompts.stats() if self._prompts is not None else {}
+        if self.use_llm:
+            from agent_core.prompt_registry import PromptCachingLLM
+            layer = self._layer(PromptCachingLLM)
+            if layer is not None:
+                stats['provider_cache'] = layer.stats()
+        return stats
     
-    def passive_reasoning(self, task: str, context: Dict = None) -> Dict[str, Any]:
+    # ===== MODO PASIVO =====
+    
+    def passive_reasoning(self, task: str, context: Dict = None,
+                          features: Optional[TaskFeatures] = None) -> Dict[str, Any]:
         """
         MODO PASIVO: Genera plan pero NO ejecuta
         
@@ -126,108 +445,154 @@ class ReasoningEngines:
         """
         
         if self.use_llm and self.llm:
-            prompt = f"""
-Eres M.A.R.T.I.N., un agente de IA en MODO PASIVO.
-
-Tu trabajo es:
-1. Analizar la tarea del usuario
-2. Proponer un plan estructurado
-3. Explicar qué harás
-4. NO ejecutar nada hasta recibir confirmación
-
-Tarea: {task}
-Contexto: {context if context else "No hay contexto adicional"}
-
-Responde en este formato:
-
-## 📋 MI ANÁLISIS
-[Cómo entiendes la tarea]
-
-## 🎯 PLAN PROPUESTO
-1. [Paso 1] (tiempo estimado)
-2. [Paso 2] (tiempo estimado)
-
-## ⚠️ CONSIDERACIONES
-- [Punto importante 1]
-- [Punto importante 2]
-
-¿Procedo con este plan?
-"""
+            namespace = self._similar_namespace("PASSIVE", context)
+            hit = self._similar_lookup(task, namespace)
+            if hit is not None:
+                return self._passive_result(*hit)
             try:
-                # ✅ CORRECCIÓN: Asignar el resultado a la variable response
-                response = self.llm.invoke(prompt).content
+                response = self._invoke(self._prompt("PASSIVE", self._passive_prompt, task, context))
+                self._similar_store(task, namespace, response)
             except Exception as e:
                 response = f"Error al llamar LLM: {e}\n"
                 response += self._generate_passive_mock(task)
         else:
             response = self._generate_passive_mock(task)
         
-        return {
+        return self._passive_result(response)
+    
+    async def apassive_reasoning(self, task: str, context: Dict = None,
+                                 features: Optional[TaskFeatures] = None) -> Dict[str, Any]:
+        """Versión asíncrona de passive_reasoning (mismo resultado)"""
+        
+        if self.use_llm and self.llm:
+            namespace = self._similar_namespace("PASSIVE", context)
+            hit = self._similar_lookup(task, namespace)
+            if hit is not None:
+                return self._passive_result(*hit)
+            try:
+                response = await self._ainvoke(self._prompt("PASSIVE", self._passive_prompt, task, context))
+                self._similar_store(task, namespace, response)
+            except Exception as e:
+                response = f"Error al llamar LLM: {e}\n"
+                response += self._generate_passive_mock(task)
+        else:
+            response = self._generate_passive_mock(task)
+        
+        return self._passive_result(response)
+    
+    def _passive_prompt(self, task: str, context: Dict = None) -> str:
+        return self.prompts.render('passive', task=task,
+                                   context=context if context else "No hay contexto adicional")
+    
+    def _passive_result(self, response: str, similarity: Optional[float] = None) -> Dict[str, Any]:
+        result = {
             "mode": "PASSIVE",
             "status": "awaiting_confirmation",
             "plan": response,
             "message": f"📋 MODO PASIVO ACTIVADO\n\n{response}",
             "requires_user_action": True
         }
+        if similarity is not None:
+            result["similar_cache_hit"] = round(similarity, 3)
+        return result
     
-    def direct_reasoning(self, task: str, context: Dict = None) -> Dict[str, Any]:
+    # ===== MODO DIRECTO =====
+    
+    def direct_reasoning(self, task: str, context: Dict = None,
+                         features: Optional[TaskFeatures] = None) -> Dict[str, Any]:
         """
         MODO DIRECTO: Genera plan Y ejecuta automáticamente
         
         AHORA CON DETECCIÓN Y EJECUCIÓN DE HERRAMIENTAS
         """
         
-        task_lower = task.lower()
-        
-        # DETECTAR SI DEBE USAR POLICY GENERATOR
-        policy_keywords = ['genera', 'crea', 'escribe', 'crear', 'generar', 'policy', 'política', 'politica']
-        policy_types = {
-            'password': 'password_policy',
-            'contraseña': 'password_policy',
-            'contraseñas': 'password_policy',
-            'incidente': 'incident_response',
-            'incidentes': 'incident_response',
-            'incident': 'incident_response',
-            'acceso': 'access_control',
-            'access': 'access_control',
-            'dato': 'data_classification',
-            'datos': 'data_classification',
-            'data': 'data_classification',
-            'backup': 'backup_recovery',
-            'recuperación': 'backup_recovery',
-            'recuperacion': 'backup_recovery'
-        }
-        
-        should_generate_policy = any(keyword in task_lower for keyword in policy_keywords)
-        detected_policy_type = None
-        
-        if should_generate_policy:
-            for keyword, policy_type in policy_types.items():
-                if keyword in task_lower:
-                    detected_policy_type = policy_type
-                    break
+        features = self._features(task, features)
         
         # SI DEBE GENERAR POLÍTICA Y TENEMOS LA TOOL
-        if should_generate_policy and detected_policy_type and self.policy_generator:
-            
-            # Contexto de la empresa
-            company_context = {
-                'name': context.get('company_name', 'La Organización') if context else 'La Organización',
-                'size': context.get('company_size', '20-50') if context else '20-50',
-                'industry': context.get('industry', 'Tecnología / SaaS') if context else 'Tecnología / SaaS',
-                'tech_stack': context.get('tech_stack', 'Cloud-based') if context else 'Cloud-based',
-                'compliance_targets': context.get('compliance_targets', ['SOC 2', 'ISO 27001']) if context else ['SOC 2', 'ISO 27001']
-            }
-            
+        if self._uses_policy_generator(features):
             # EJECUTAR LA HERRAMIENTA
             policy_content = self.policy_generator.generate_policy(
-                detected_policy_type,
-                company_context
+                features.policy_type,
+                self._company_context(context)
             )
-            
-            policy_info = self.policy_generator.POLICY_TEMPLATES[detected_policy_type]
-            
-            response = f"""
+            return self._policy_result(features.policy_type, policy_content)
+        
+        # SI NO ES GENERACIÓN DE POLÍTICA, FLUJO NORMAL CON LLM
+        if self.use_llm and self.llm:
+            namespace = self._similar_namespace("DIRECT") if self._is_informational(features) else None
+            hit = self._similar_lookup(task, namespace) if namespace else None
+            if hit is not None:
+                return self._direct_result(*hit)
+            try:
+                response = self._invoke(self._prompt("DIRECT", self._direct_prompt, task))
+                if namespace:
+                    self._similar_store(task, namespace, response)
+            except Exception as e:
+                response = f"Error al llamar LLM: {e}\n"
+                response += self._generate_direct_mock(task)
+        else:
+            response = self._generate_direct_mock(task)
+        
+        return self._direct_result(response)
+    
+    async def adirect_reasoning(self, task: str, context: Dict = None,
+                                features: Optional[TaskFeatures] = None) -> Dict[str, Any]:
+        """
+        Versión asíncrona de direct_reasoning (mismo resultado).
+        
+        Si el Policy Generator no ofrece agenerate_policy, se ejecuta en un
+        hilo para no bloquear el event loop.
+        """
+        
+        features = self._features(task, features)
+        
+        if self._uses_policy_generator(features):
+            generator = self.policy_generator
+            company_context = self._company_context(context)
+            if hasattr(generator, 'agenerate_policy'):
+                policy_content = await generator.agenerate_policy(features.policy_type, company_context)
+            else:
+                import asyncio
+                policy_content = await asyncio.to_thread(
+                    generator.generate_policy, features.policy_type, company_context
+                )
+            return self._policy_result(features.policy_type, policy_content)
+        
+        if self.use_llm and self.llm:
+            namespace = self._similar_namespace("DIRECT") if self._is_informational(features) else None
+            hit = self._similar_lookup(task, namespace) if namespace else None
+            if hit is not None:
+                return self._direct_result(*hit)
+            try:
+                response = await self._ainvoke(self._prompt("DIRECT", self._direct_prompt, task))
+                if namespace:
+                    self._similar_store(task, namespace, response)
+            except Exception as e:
+                response = f"Error al llamar LLM: {e}\n"
+                response += self._generate_direct_mock(task)
+        else:
+            response = self._generate_direct_mock(task)
+        
+        return self._direct_result(response)
+    
+    def _uses_policy_generator(self, features: TaskFeatures) -> bool:
+        """True si la tarea pide una política y la herramienta está disponible"""
+        return bool(features.should_generate_policy and features.policy_type and self.policy_generator)
+    
+    def _company_context(self, context: Dict = None) -> Dict[str, Any]:
+        """Contexto de la empresa para el Policy Generator"""
+        return {
+            'name': context.get('company_name', 'La Organización') if context else 'La Organización',
+            'size': context.get('company_size', '20-50') if context else '20-50',
+            'industry': context.get('industry', 'Tecnología / SaaS') if context else 'Tecnología / SaaS',
+            'tech_stack': context.get('tech_stack', 'Cloud-based') if context else 'Cloud-based',
+            'compliance_targets': context.get('compliance_targets', ['SOC 2', 'ISO 27001']) if context else ['SOC 2', 'ISO 27001']
+        }
+    
+    def _policy_result(self, policy_type: str, policy_content: str) -> Dict[str, Any]:
+        policy_info = self.policy_generator.POLICY_TEMPLATES[policy_type]
+        
+        response = f"""
 ## ⚡ EJECUTADO CON POLICY GENERATOR
 
 He generado la política solicitada automáticamente.
@@ -253,61 +618,37 @@ Por qué ejecuté en MODO DIRECTO:
 
 💡 **Nota:** Esta política requiere revisión legal antes de implementación formal.
 """
-            
-            return {
-                "mode": "DIRECT",
-                "status": "executed",
-                "tool_used": "policy_generator",
-                "policy_type": detected_policy_type,
-                "policy_content": policy_content,
-                "results": response,
-                "message": f"⚡ MODO DIRECTO - Ejecutado con Policy Generator\n\n{response}",
-                "requires_user_action": False
-            }
         
-        # SI NO ES GENERACIÓN DE POLÍTICA, FLUJO NORMAL CON LLM
-        else:
-            if self.use_llm and self.llm:
-                prompt = f"""
-Eres M.A.R.T.I.N. en MODO DIRECTO - agente autónomo.
-
-Tu trabajo es:
-1. Analizar y ejecutar inmediatamente
-2. Reportar resultados
-3. Explicar tu razonamiento
-
-Tarea: {task}
-
-Responde en este formato:
-
-## ⚡ EJECUTADO
-[Qué acciones tomaste]
-
-## 📊 RESULTADOS
-[Resultados obtenidos]
-
-## 🧠 MI RAZONAMIENTO
-Por qué lo hice así:
-- [Razón 1]
-- [Razón 2]
-"""
-                try:
-                    response = self.llm.invoke(prompt).content
-                except Exception as e:
-                    response = f"Error al llamar LLM: {e}\n"
-                    response += self._generate_direct_mock(task)
-            else:
-                response = self._generate_direct_mock(task)
-            
-            return {
-                "mode": "DIRECT",
-                "status": "executed",
-                "results": response,
-                "message": f"⚡ MODO DIRECTO - Ejecutado automáticamente\n\n{response}",
-                "requires_user_action": False
-            }
+        return {
+            "mode": "DIRECT",
+            "status": "executed",
+            "tool_used": "policy_generator",
+            "policy_type": policy_type,
+            "policy_content": policy_content,
+            "results": response,
+            "message": f"⚡ MODO DIRECTO - Ejecutado con Policy Generator\n\n{response}",
+            "requires_user_action": False
+        }
+    
+    def _direct_prompt(self, task: str) -> str:
+        return self.prompts.render('direct', task=task)
+    
+    def _direct_result(self, response: str, similarity: Optional[float] = None) -> Dict[str, Any]:
+        result = {
+            "mode": "DIRECT",
+            "status": "executed",
+            "results": response,
+            "message": f"⚡ MODO DIRECTO - Ejecutado automáticamente\n\n{response}",
+            "requires_user_action": False
+        }
+        if similarity is not None:
+            result["similar_cache_hit"] = round(similarity, 3)
+        return result
+    
+    # ===== MODO SEGURO =====
     
-    def safe_reasoning(self, task: str, context: Dict = None) -> Dict[str, Any]:
+    def safe_reasoning(self, task: str, context: Dict = None,
+                       features: Optional[TaskFeatures] = None) -> Dict[str, Any]:
         """
         MODO SEGURO: Genera plan, AUTO-VALIDA, luego decide
         
@@ -317,51 +658,124 @@ Por qué lo hice así:
         3. SE AUTO-CRITICA (validación de riesgos)
         4. Si pasa validación → ejecuta con precauciones
         5. Si NO pasa → sugiere alternativa segura
+        
+        Con safe_strategy="single", plan y validación salen de una sola
+        llamada al LLM; si la respuesta no trae ambas secciones se usa el
+        flujo de dos pasos (safe_fallback). El resultado indica la
+        estrategia que produjo el plan y la validación en 'safe_strategy';
+        si el LLM no produjo la validación y se usó la simulada, es
+        SAFE_MOCK ("mock"). Un plan que no cabe completo en el prompt de
+        validación no se valida truncado: se rechaza.
         """
         
-        if self.use_llm and self.llm:
-            # Paso 1: Generar plan
-            plan_prompt = f"Genera un plan de acción específico para: {task}"
+        features = self._features(task, features)
+        
+        if not (self.use_llm and self.llm):
+            plan = f"Plan para: {task}"
+            validation = self._generate_safe_validation_mock(task, features)
+            return self._safe_result(plan, validation, "simulated")
+        
+        if self.safe_strategy == SAFE_SINGLE:
             try:
-                plan = self.llm.invoke(plan_prompt).content
-            except:
+                response = self._invoke(self._prompt("SAFE", self._safe_prompt, task))
+            except Exception:
+                response = None
+            parsed = self._parse_safe_response(response) if response is not None else None
+            if parsed is not None:
+                return self._safe_result(*parsed, SAFE_SINGLE)
+            # Si el LLM falló no se reintenta con dos llamadas más
+            if response is None or not self.safe_fallback:
                 plan = f"Plan para: {task}"
-            
-            # Paso 2: AUTO-VALIDACIÓN
-            validation_prompt = f"""
-Eres un validador de seguridad crítico.
-
-Tarea: {task}
-Plan: {plan}
-
-Analiza riesgos:
-1. ¿Es destructivo?
-2. ¿Puede causar pérdida de datos?
-3. ¿Es reversible?
-
-Responde:
-
-NIVEL DE RIESGO: [BAJO/MEDIO/ALTO/CRÍTICO]
-
-RIESGOS:
-- [Riesgo 1]
-
-DECISIÓN: [APROBAR/RECHAZAR]
-
-SI RECHAZAS:
-ALTERNATIVA: [alternativa segura]
-
-SI APRUEBAS:
-PRECAUCIONES: [lista]
-"""
+                return self._safe_result(plan, self._generate_safe_validation_mock(task, features), SAFE_MOCK)
+        
+        # Paso 1: Generar plan
+        try:
+            plan = self._invoke(self._prompt("SAFE", self._plan_prompt, task))
+        except Exception:
+            plan = f"Plan para: {task}"
+        
+        # Paso 2: AUTO-VALIDACIÓN (siempre con el plan completo)
+        try:
+            validation = self._invoke(self._prompt("SAFE", self._plan_validation_prompt, task,
+                                                   {"plan": plan}, keep=("plan",)))
+        except PromptTooLarge:
+            return self._safe_result(plan, PLAN_TOO_LARGE_VALIDATION, SAFE_MOCK)
+        except Exception:
+            return self._safe_result(plan, self._generate_safe_validation_mock(task, features), SAFE_MOCK)
+        
+        return self._safe_result(plan, validation, SAFE_TWO_STEP)
+    
+    async def asafe_reasoning(self, task: str, context: Dict = None,
+                              features: Optional[TaskFeatures] = None) -> Dict[str, Any]:
+        """Versión asíncrona de safe_reasoning (mismo resultado)"""
+        
+        features = self._features(task, features)
+        
+        if not (self.use_llm and self.llm):
+            plan = f"Plan para: {task}"
+            validation = self._generate_safe_validation_mock(task, features)
+            return self._safe_result(plan, validation, "simulated")
+        
+        if self.safe_strategy == SAFE_SINGLE:
             try:
-                validation = self.llm.invoke(validation_prompt).content
-            except:
-                validation = self._generate_safe_validation_mock(task)
-        else:
+                response = await self._ainvoke(self._prompt("SAFE", self._safe_prompt, task))
+            except Exception:
+                response = None
+            parsed = self._parse_safe_response(response) if response is not None else None
+            if parsed is not None:
+                return self._safe_result(*parsed, SAFE_SINGLE)
+            # Si el LLM falló no se reintenta con dos llamadas más
+            if response is None or not self.safe_fallback:
+                plan = f"Plan para: {task}"
+                return self._safe_result(plan, self._generate_safe_validation_mock(task, features), SAFE_MOCK)
+        
+        try:
+            plan = await self._ainvoke(self._prompt("SAFE", self._plan_prompt, task))
+        except Exception:
             plan = f"Plan para: {task}"
-            validation = self._generate_safe_validation_mock(task)
         
+        try:
+            validation = await self._ainvoke(self._prompt("SAFE", self._plan_validation_prompt, task,
+                                                          {"plan": plan}, keep=("plan",)))
+        except PromptTooLarge:
+            return self._safe_result(plan, PLAN_TOO_LARGE_VALIDATION, SAFE_MOCK)
+        except Exception:
+            return self._safe_result(plan, self._generate_safe_validation_mock(task, features), SAFE_MOCK)
+        
+        return self._safe_result(plan, validation, SAFE_TWO_STEP)
+    
+    def _safe_prompt(self, task: str) -> str:
+        """Prompt de una sola llamada: plan y validación en secciones fijas"""
+        return self.prompts.render('safe', task=task)
+    
+    def _parse_safe_response(self, response: str) -> Optional[Tuple[str, str]]:
+        """
+        Separa plan y validación de la respuesta estructurada.
+        
+        Returns:
+            (plan, validación), o None si falta alguna sección o la
+            validación no trae una DECISIÓN
+        """
+        head, marker, validation = response.partition(SAFE_VALIDATION_MARKER)
+        if not marker:
+            return None
+        _, marker, plan = head.partition(SAFE_PLAN_MARKER)
+        plan, validation = plan.strip(), validation.strip()
+        if not marker or not plan or "DECISIÓN" not in validation:
+            return None
+        return plan, f"\n{validation}\n"
+    
+    def _plan_prompt(self, task: str) -> str:
+        return self.prompts.render('plan', task=task)
+    
+    def _plan_validation_prompt(self, task: str, context: Dict = None) -> str:
+        """_validation_prompt con el plan en el contexto (el plan nunca se compacta)"""
+        return self._validation_prompt(task, (context or {}).get("plan", ""))
+    
+    def _validation_prompt(self, task: str, plan: str) -> str:
+        return self.prompts.render('validation', task=task, plan=plan)
+    
+    def _safe_result(self, plan: str, validation: str, strategy: str) -> Dict[str, Any]:
         # Analizar resultado
         if "RECHAZAR" in validation or "CRÍTICO" in validation or "ALTO" in validation:
             return {
@@ -370,6 +784,7 @@ PRECAUCIONES: [lista]
                 "validation_failed": True,
                 "original_plan": plan,
                 "validation_report": validation,
+                "safe_strategy": strategy,
                 "message": f"🛡️ MODO SEGURO - ACCIÓN BLOQUEADA\n\n{validation}",
                 "requires_user_action": True
             }
@@ -380,10 +795,123 @@ PRECAUCIONES: [lista]
                 "validation_passed": True,
                 "plan": plan,
                 "validation_report": validation,
+                "safe_strategy": strategy,
                 "message": f"🛡️ MODO SEGURO - Validado y ejecutado\n\n{validation}\n\n✅ EJECUTADO con precauciones.",
                 "requires_user_action": False
             }
     
+    # ===== STREAMING =====
+    
+    def stream_reasoning(self, mode: str, task: str, context: Dict = None,
+                         features: Optional[TaskFeatures] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Razonamiento en streaming: fragmentos de texto a medida que el LLM
+        los genera y, al final, el resultado completo.
+        
+        Fragmentos:
+            {"type": "token", "text": ...}   (cero o más)
+            {"type": "result", "result": {...}}   (siempre el último)
+        
+        El MODO SEGURO y el Policy Generator no emiten tokens: el plan no se
+        muestra antes de validarse, y la política sale de una herramienta.
+        """
+        features = self._features(task, features)
+        spec = self._stream_spec(mode, task, context, features)
+        if spec is None:
+            run = self.safe_reasoning if mode == "SAFE" else self.direct_reasoning
+            yield {"type": STREAM_RESULT, "result": run(task, context, features=features)}
+            return
+        
+        build_prompt, namespace, build_result, mock = spec
+        hit = self._similar_lookup(task, namespace) if namespace else None
+        if not (self.use_llm and self.llm) or hit is not None:
+            response = hit[0] if hit is not None else mock(task)
+            yield {"type": STREAM_TOKEN, "text": response}
+            yield {"type": STREAM_RESULT, "result": build_result(*hit) if hit else build_result(response)}
+            return
+        
+        parts = []
+        try:
+            for text in self._stream_text(build_prompt()):
+                parts.append(text)
+                yield {"type": STREAM_TOKEN, "text": text}
+        except Exception as e:
+            text = f"\nError al llamar LLM: {e}\n" + mock(task)
+            parts.append(text)
+            yield {"type": STREAM_TOKEN, "text": text}
+        else:
+            if namespace:
+                self._similar_store(task, namespace, ''.join(parts))
+        
+        yield {"type": STREAM_RESULT, "result": build_result(''.join(parts))}
+    
+    async def astream_reasoning(self, mode: str, task: str, context: Dict = None,
+                                features: Optional[TaskFeatures] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Versión asíncrona de stream_reasoning (mismos fragmentos)"""
+        features = self._features(task, features)
+        spec = self._stream_spec(mode, task, context, features)
+        if spec is None:
+            run = self.asafe_reasoning if mode == "SAFE" else self.adirect_reasoning
+            yield {"type": STREAM_RESULT, "result": await run(task, context, features=features)}
+            return
+        
+        build_prompt, namespace, build_result, mock = spec
+        hit = self._similar_lookup(task, namespace) if namespace else None
+        if not (self.use_llm and self.llm) or hit is not None:
+            response = hit[0] if hit is not None else mock(task)
+            yield {"type": STREAM_TOKEN, "text": response}
+            yield {"type": STREAM_RESULT, "result": build_result(*hit) if hit else build_result(response)}
+            return
+        
+        parts = []
+        try:
+            async for text in self._astream_text(build_prompt()):
+                parts.append(text)
+                yield {"type": STREAM_TOKEN, "text": text}
+        except Exception as e:
+            text = f"\nError al llamar LLM: {e}\n" + mock(task)
+            parts.append(text)
+            yield {"type": STREAM_TOKEN, "text": text}
+        else:
+            if namespace:
+                self._similar_store(task, namespace, ''.join(parts))
+        
+        yield {"type": STREAM_RESULT, "result": build_result(''.join(parts))}
+    
+    def _stream_spec(self, mode: str, task: str, context: Dict,
+                     features: TaskFeatures) -> Optional[Tuple[Callable, Optional[str], Callable, Callable]]:
+        """
+        (constructor del prompt, espacio del caché por similitud, constructor
+        del resultado, respuesta simulada) del modo, o None si el modo no
+        emite tokens
+        """
+        if mode == "PASSIVE":
+            return (lambda: self._prompt("PASSIVE", self._passive_prompt, task, context),
+                    self._similar_namespace("PASSIVE", context),
+                    self._passive_result, self._generate_passive_mock)
+        if mode == "DIRECT" and not self._uses_policy_generator(features):
+            namespace = self._similar_namespace("DIRECT") if self._is_informational(features) else None
+            return (lambda: self._prompt("DIRECT", self._direct_prompt, task),
+                    namespace, self._direct_result, self._generate_direct_mock)
+        return None
+    
+    def _stream_text(self, prompt: str) -> Iterator[str]:
+        """Texto de los fragmentos del LLM (la respuesta entera si no hace streaming)"""
+        if not hasattr(self.llm, 'stream'):
+            yield self._invoke(prompt)
+            return
+        for chunk in self.llm.stream(prompt):
+            if isinstance(chunk.content, str) and chunk.content:
+                yield chunk.content
+    
+    async def _astream_text(self, prompt: str) -> AsyncIterator[str]:
+        if not hasattr(self.llm, 'astream'):
+            yield await self._ainvoke(prompt)
+            return
+        async for chunk in self.llm.astream(prompt):
+            if isinstance(chunk.content, str) and chunk.content:
+                yield chunk.content
+    
     # Métodos de respuestas simuladas
     
     def _generate_passive_mock(self, task: str) -> str:
@@ -426,9 +954,8 @@ Por qué lo hice así:
 - Ejecución directa más eficiente
 """
     
-    def _generate_safe_validation_mock(self, task: str) -> str:
-        danger_words = ['delete', 'remove', 'destroy', 'disable', 'drop', 'eliminar', 'borrar']
-        is_dangerous = any(word in task.lower() for word in danger_words)
+    def _generate_safe_validation_mock(self, task: str, features: Optional[TaskFeatures] = None) -> str:
+        is_dangerous = self._features(task, features).has_any('validation_danger')
         
         if is_dangerous:
             return """
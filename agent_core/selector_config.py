@@ -0,0 +1,147 @@
+"""
+Configuración del ModeSelector desde configs/config.yaml
+Carga, compilación y recarga en caliente del perfil de selección de modo
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import os
+import threading
+import time
+
+from agent_core.mode_selector import ModeSelector, SelectorProfile
+
+DEFAULT_CONFIG_PATH = Path(__file__).parent.parent / 'configs' / 'config.yaml'
+
+
+def load_profile(path: str) -> SelectorProfile:
+    """
+    Lee la sección `mode_selector` de un YAML y compila un SelectorProfile.
+
+    Las claves ausentes conservan los valores por defecto de ModeSelector.
+    Lanza ValueError si hay categorías o pesos desconocidos.
+
+    Formato:
+        mode_selector:
+          thresholds: {risk: 0.5, clarity: 0.6}
+          weights: {danger: 0.5, ...}
+          vocabulary: {danger: [...], vague: [...], ...}
+          classifier: {path: models/mode_classifier, weight: 0.5}
+
+    La ruta del clasificador es relativa al directorio del archivo de
+    configuración; el artefacto no se abre hasta la primera decisión.
+    """
+    import yaml
+
+    with open(path, encoding='utf-8') as f:
+        data = yaml.safe_load(f) or {}
+
+    section: Dict[str, Any] = data.get('mode_selector') or {}
+    thresholds = section.get('thresholds') or {}
+    weights = section.get('weights') or {}
+    vocabulary = section.get('vocabulary') or {}
+    classifier = section.get('classifier') or {}
+
+    unknown = set(vocabulary) - set(ModeSelector.CATEGORY_ATTRIBUTES)
+    if unknown:
+        raise ValueError(f"Categorías de vocabulario desconocidas: {sorted(unknown)}")
+    unknown = set(weights) - set(ModeSelector.SCORE_WEIGHTS)
+    if unknown:
+        raise ValueError(f"Pesos desconocidos: {sorted(unknown)}")
+
+    classifier_path = classifier.get('path')
+    if classifier_path:
+        classifier_path = str(Path(path).parent / classifier_path)
+        if not os.path.isdir(classifier_path):
+            raise ValueError(f"No existe el artefacto del clasificador: {classifier_path}")
+
+    return SelectorProfile(
+        vocabulary={
+            **ModeSelector.keyword_categories(),
+            **{name: [str(word).lower() for word in words or []] for name, words in vocabulary.items()}
+        },
+        weights={**ModeSelector.SCORE_WEIGHTS, **{k: float(v) for k, v in weights.items()}},
+        risk_threshold=float(thresholds.get('risk', ModeSelector.RISK_THRESHOLD)),
+        clarity_threshold=float(thresholds.get('clarity', ModeSelector.CLARITY_THRESHOLD)),
+        source=str(path),
+        classifier=classifier_path or None,
+        classifier_weight=float(classifier.get('weight', 0.5)) if classifier_path else 0.0
+    )
+
+
+class ConfigWatcher:
+    """
+    Vigila un archivo de configuración y reemplaza el perfil del selector
+    cuando cambia.
+
+    El perfil nuevo se compila por completo en el hilo del watcher y luego se
+    activa con una sola asignación, sin bloquear las llamadas a select_mode.
+    Si el archivo tiene errores, se conserva el perfil anterior.
+    """
+
+    def __init__(self, selector: ModeSelector, path: str, interval: float = 1.0):
+        """
+        Args:
+            selector: ModeSelector cuyo perfil se actualiza
+            path: Archivo YAML a vigilar
+            interval: Segundos entre revisiones del archivo
+        """
+        self.selector = selector
+        self.path = str(path)
+        self.interval = interval
+        self.reload_count = 0
+        self.last_error: Optional[str] = None
+        self.last_reload_ms: Optional[float] = None
+        self._signature = self._file_signature()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self) -> bool:
+        """
+        Recarga el perfil si el archivo cambió desde la última revisión.
+
+        Returns:
+            True si se activó un perfil nuevo
+        """
+        signature = self._file_signature()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+
+        start = time.perf_counter()
+        try:
+            profile = load_profile(self.path)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ Configuración inválida en {self.path}, se mantiene la anterior: {e}")
+            return False
+
+        self.selector.apply_profile(profile)
+        self.last_reload_ms = (time.perf_counter() - start) * 1000
+        self.last_error = None
+        self.reload_count += 1
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """Inicia la vigilancia en un hilo daemon"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='martin-config-watcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Detiene la vigilancia"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
@@ -0,0 +1,253 @@
+"""
+SimilarityCache - Caché de respuestas por tareas casi idénticas (MinHash + LSH)
+
+"Ayúdame con SOC 2" y "ayudame con soc2 por favor" piden lo mismo pero no
+comparten hash exacto. Cada tarea se normaliza (mayúsculas, tildes,
+muletillas), se parte en n-gramas de caracteres y se resume en una firma
+MinHash. Las firmas se indexan en buckets LSH por bandas; una consulta solo
+compara contra los candidatos de sus buckets y reutiliza la respuesta si la
+similitud de Jaccard estimada supera el umbral. Todo es local: no hay
+servicio de embeddings.
+
+La similitud no basta: "SOC 2" y "SOC 1" o "¿Debo cifrar backups?" y
+"¿No debo cifrar backups?" casi no se distinguen por n-gramas. Por eso una
+entrada solo se reutiliza si además coinciden exactamente sus tokens de
+guarda: números y versiones, identificadores de estándares y negaciones.
+
+Solo debe usarse para respuestas informativas (PASSIVE y DIRECT sin
+ejecución); nunca para el MODO SEGURO.
+"""
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Dict, List, Optional, Tuple
+import re
+import threading
+import unicodedata
+import zlib
+
+import numpy as np
+
+# Palabras que no cambian el sentido de la petición
+FILLER_WORDS = frozenset({
+    'a', 'al', 'an', 'and', 'con', 'de', 'del', 'el', 'en', 'for', 'in', 'la', 'las',
+    'los', 'me', 'mi', 'of', 'para', 'please', 'por', 'favor', 'the', 'to', 'un',
+    'una', 'with', 'y',
+})
+
+# Identificadores de estándares y normas: deben coincidir exactamente
+STANDARD_WORDS = frozenset({
+    'soc', 'iso', 'iec', 'pci', 'dss', 'nist', 'csf', 'gdpr', 'rgpd', 'hipaa', 'sox',
+    'ens', 'cis', 'cobit', 'itil', 'fedramp', 'tisax', 'dora', 'nis',
+})
+
+# Negaciones: invierten el sentido de la petición
+NEGATION_WORDS = frozenset({'no', 'not', 'sin', 'nunca', 'never', 'without'})
+
+_WORD_RE = re.compile(r'\w+')
+_GUARD_TOKEN_RE = re.compile(r'\d+(?:[.,:]\d+)*|[^\W\d_]+')
+_ROMAN_RE = re.compile(r'^(?:i{1,3}|iv|vi{0,3}|ix|x)$')
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_task(task: str) -> str:
+    """
+    Normaliza una tarea para compararla con otras.
+
+    Pliega mayúsculas, acentos y espacios:
+    "  Genera   Política de Contraseñas " -> "genera politica de contrasenas"
+    """
+    text = unicodedata.normalize('NFKD', task.casefold())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.split())
+
+
+def shingles(task: str, size: int = 3) -> List[str]:
+    """
+    N-gramas de caracteres de la tarea normalizada y sin muletillas.
+
+    Los espacios se eliminan para que "soc 2" y "soc2" coincidan.
+    """
+    words = [word for word in _WORD_RE.findall(normalize_task(task)) if word not in FILLER_WORDS]
+    text = ''.join(words)
+    if len(text) <= size:
+        return [text] if text else []
+    return [text[i:i + size] for i in range(len(text) - size + 1)]
+
+
+def guard_tokens(task: str) -> frozenset:
+    """
+    Tokens que deben coincidir exactamente para reutilizar una respuesta.
+
+    Números y versiones ("2", "27001", "3.2"), numerales romanos ("tipo ii"),
+    identificadores de estándares ("soc", "pci") y negaciones ("no", "sin").
+    Letras y dígitos pegados se separan, así "soc2" y "SOC 2" coinciden.
+    """
+    return frozenset(
+        token for token in _GUARD_TOKEN_RE.findall(normalize_task(task))
+        if token[0].isdigit() or token in STANDARD_WORDS or token in NEGATION_WORDS
+        or _ROMAN_RE.match(token)
+    )
+
+
+class MinHasher:
+    """
+    Firmas MinHash de num_perm permutaciones (a*x + b mod p).
+
+    x es un crc32 (< 2^32) y a, b se eligen por debajo de 2^32, así que
+    a*x + b cabe en uint64 sin desbordar antes del módulo.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    def signature(self, task: str) -> np.ndarray:
+        """Firma (num_perm,) uint32 de una tarea"""
+        grams = set(shingles(task))
+        if not grams:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashes = np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams),
+                             dtype=np.uint64, count=len(grams))
+        # (a * h + b) mod p, truncado a 32 bits
+        permuted = (np.outer(self._a, hashes) + self._b[:, np.newaxis]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+class SimilarityCache:
+    """
+    Caché LRU de respuestas indexado por LSH sobre firmas MinHash.
+
+    Cada entrada pertenece a un espacio (namespace), p.ej. modo + contexto,
+    y solo se reutiliza dentro de él y si sus tokens de guarda coinciden
+    con los de la consulta (ver guard_tokens).
+    """
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 2048,
+                 num_perm: int = 64, bands: int = 16):
+        """
+        Args:
+            threshold: Similitud de Jaccard estimada mínima para reutilizar
+            max_entries: Respuestas retenidas (LRU)
+            num_perm: Permutaciones de la firma MinHash
+            bands: Bandas LSH (num_perm debe ser divisible por bands)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm debe ser divisible por bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+
+        self._entries: "OrderedDict[int, Tuple[str, np.ndarray, frozenset, Any]]" = OrderedDict()
+        self._buckets: Dict[tuple, List[int]] = {}
+        self._ids = count()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.guard_rejections = 0
+
+    def _band_keys(self, namespace: str, signature: np.ndarray) -> List[tuple]:
+        rows = self.rows
+        return [
+            (namespace, band, signature[band * rows:(band + 1) * rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def lookup(self, task: str, namespace: str = '') -> Optional[Tuple[Any, float]]:
+        """
+        Busca una respuesta para una tarea casi idéntica.
+
+        Returns:
+            (respuesta, similitud estimada) o None
+        """
+        signature = self.hasher.signature(task)
+        guard = guard_tokens(task)
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(namespace, signature):
+                candidates.update(self._buckets.get(key, ()))
+
+            best, best_similarity, rejected = None, 0.0, False
+            for entry_id in candidates:
+                _, stored, stored_guard, _ = self._entries[entry_id]
+                similarity = float(np.mean(stored == signature))
+                if similarity < self.threshold:
+                    continue
+                if stored_guard != guard:
+                    rejected = True
+                    continue
+                if similarity > best_similarity:
+                    best, best_similarity = entry_id, similarity
+
+            if best is None:
+                self.misses += 1
+                if rejected:
+                    self.guard_rejections += 1
+                return None
+
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best][3], best_similarity
+
+    def store(self, task: str, value: Any, namespace: str = ''):
+        """Guarda la respuesta de una tarea"""
+        signature = self.hasher.signature(task)
+        guard = guard_tokens(task)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (namespace, signature, guard, value)
+            for key in self._band_keys(namespace, signature):
+                self._buckets.setdefault(key, []).append(entry_id)
+            self.stores += 1
+
+            while len(self._entries) > self.max_entries:
+                old_id, (old_namespace, old_signature, _, _) = self._entries.popitem(last=False)
+                for key in self._band_keys(old_namespace, old_signature):
+                    bucket = self._buckets[key]
+                    bucket.remove(old_id)
+                    if not bucket:
+                        del self._buckets[key]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas del caché"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'buckets': len(self._buckets),
+            'threshold': self.threshold,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'guard_rejections': self.guard_rejections,
+        }
+
+
+_default_cache: Optional[SimilarityCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_similarity_cache() -> SimilarityCache:
+    """Caché de similitud compartido por todos los agentes del proceso"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = SimilarityCache()
+        return _default_cache
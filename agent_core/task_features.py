@@ -0,0 +1,109 @@
+"""
+TaskFeatures - Análisis único de la tarea compartido por todo el pipeline
+(ModeSelector, ReasoningEngines y herramientas)
+"""
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from agent_core.keyword_matcher import KeywordMatcher
+
+
+# Palabras que indican que se debe usar el Policy Generator
+POLICY_KEYWORDS = ['genera', 'crea', 'escribe', 'crear', 'generar', 'policy', 'política', 'politica']
+
+# Palabra clave -> tipo de política (el orden define la prioridad)
+POLICY_TYPES = {
+    'password': 'password_policy',
+    'contraseña': 'password_policy',
+    'contraseñas': 'password_policy',
+    'incidente': 'incident_response',
+    'incidentes': 'incident_response',
+    'incident': 'incident_response',
+    'acceso': 'access_control',
+    'access': 'access_control',
+    'dato': 'data_classification',
+    'datos': 'data_classification',
+    'data': 'data_classification',
+    'backup': 'backup_recovery',
+    'recuperación': 'backup_recovery',
+    'recuperacion': 'backup_recovery'
+}
+
+# Palabras que hacen que la validación simulada del MODO SEGURO rechace
+VALIDATION_DANGER_KEYWORDS = ['delete', 'remove', 'destroy', 'disable', 'drop', 'eliminar', 'borrar']
+
+# Categorías extra que el pipeline compila junto al vocabulario del ModeSelector
+PIPELINE_CATEGORIES = {
+    'policy_trigger': POLICY_KEYWORDS,
+    'policy_type': list(POLICY_TYPES),
+    'validation_danger': VALIDATION_DANGER_KEYWORDS,
+}
+
+
+class TaskFeatures:
+    """
+    Resultado de analizar una tarea una sola vez.
+
+    Contiene el texto normalizado, tokens, coincidencias del matcher por
+    categoría y el tipo de política detectado. Se calcula una vez por
+    request en MARTINAgent.process y se pasa al selector, a los motores y a
+    las herramientas.
+    """
+
+    __slots__ = ('text', 'normalized', 'tokens', 'word_count', 'matches', 'hits',
+                 'has_question', 'has_upper', 'policy_type')
+
+    def __init__(self, text: str, normalized: str, tokens: Tuple[str, ...],
+                 matches: FrozenSet[str], hits: Dict[str, int],
+                 has_question: bool, has_upper: bool, policy_type: Optional[str]):
+        self.text = text
+        self.normalized = normalized
+        self.tokens = tokens
+        self.word_count = len(tokens)
+        self.matches = matches
+        self.hits = hits
+        self.has_question = has_question
+        self.has_upper = has_upper
+        self.policy_type = policy_type
+
+    @classmethod
+    def extract(cls, task: str, matcher: KeywordMatcher) -> 'TaskFeatures':
+        """
+        Analiza la tarea con una sola pasada del matcher.
+
+        Args:
+            task: Instrucción del usuario
+            matcher: Matcher compilado con las categorías del pipeline
+        """
+        normalized = task.lower()
+        matches = matcher.find_all(normalized)
+        hits = matcher.count_categories(matches)
+
+        policy_type = None
+        if hits.get('policy_trigger'):
+            for keyword, detected in POLICY_TYPES.items():
+                if keyword in matches:
+                    policy_type = detected
+                    break
+
+        return cls(
+            text=task,
+            normalized=normalized,
+            tokens=tuple(normalized.split()),
+            matches=matches,
+            hits=hits,
+            has_question='?' in task,
+            has_upper=any(char.isupper() for char in task),
+            policy_type=policy_type,
+        )
+
+    @property
+    def should_generate_policy(self) -> bool:
+        """True si la tarea pide generar/crear/escribir algo tipo política"""
+        return self.hits.get('policy_trigger', 0) > 0
+
+    def has_any(self, category: str) -> bool:
+        """True si hay al menos una palabra clave de la categoría"""
+        return self.hits.get(category, 0) > 0
+
+    def __repr__(self) -> str:
+        return f"TaskFeatures(words={self.word_count}, policy_type={self.policy_type})"
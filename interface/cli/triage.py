@@ -0,0 +1,233 @@
+"""
+Triage masivo de tareas con el ModeSelector
+
+Clasifica exports grandes (JSONL o CSV) en colas PASSIVE / DIRECT / SAFE
+sin cargar el archivo completo en memoria:
+
+    python main.py --mode triage --input tickets.jsonl --output triage.jsonl --workers 8
+
+El proceso principal solo lee y escribe líneas; el parseo, la clasificación
+por lotes (ModeSelector.select_modes) y la serialización se hacen en un pool
+de procesos. Como máximo hay 2 lotes por worker en vuelo, así que la memoria
+no depende del tamaño del archivo. La salida conserva el orden de entrada y
+agrega el campo/columna "mode" a cada registro.
+"""
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import csv
+import json
+import os
+import sys
+import time
+
+from agent_core.mode_selector import MODE_EMOJI, ModeSelector
+
+TASK_FIELDS = ('task', 'input', 'text')
+PROGRESS_INTERVAL = 5.0  # segundos entre reportes de progreso
+
+# Estado de cada worker (se fija en _init_worker)
+_worker_state: Dict[str, Any] = {}
+
+
+def detect_format(path: str) -> str:
+    """'csv' o 'jsonl' según la extensión del archivo"""
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def _init_worker(file_format: str, header: Optional[List[str]], default_context: Dict,
+                 config_path: Optional[str]):
+    selector = ModeSelector(log_capacity=1)
+    if config_path:
+        selector.load_config(config_path)
+    _worker_state.update(
+        selector=selector, format=file_format, header=header, default_context=default_context
+    )
+
+
+def _parse(record, file_format: str, header: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    if file_format == 'csv':
+        return dict(zip(header, record))
+    record = record.strip()
+    if not record:
+        return None
+    try:
+        item = json.loads(record)
+    except json.JSONDecodeError:
+        return None
+    return item if isinstance(item, dict) else None
+
+
+def _context(item: Dict[str, Any], default_context: Dict) -> Dict:
+    context = dict(default_context)
+    if isinstance(item.get('context'), dict):
+        context.update(item['context'])
+    if item.get('environment'):
+        context['environment'] = item['environment']
+    if 'has_active_users' in item:
+        value = item['has_active_users']
+        context['has_active_users'] = value.lower() in ('1', 'true', 'yes', 'si', 'sí') if isinstance(value, str) else bool(value)
+    return context
+
+
+def _triage_chunk(records: List[Any]) -> Tuple[List[Any], Counter, int]:
+    """
+    Clasifica un lote de registros crudos (líneas JSONL o filas CSV).
+
+    Returns:
+        (registros de salida, conteo por modo, registros descartados)
+    """
+    state = _worker_state
+    file_format, header = state['format'], state['header']
+
+    items, tasks, contexts = [], [], []
+    for record in records:
+        item = _parse(record, file_format, header)
+        task = next((item[field] for field in TASK_FIELDS if item and item.get(field)), None)
+        if not isinstance(task, str):
+            continue
+        items.append(item)
+        tasks.append(task)
+        contexts.append(_context(item, state['default_context']))
+
+    modes = state['selector'].select_modes(tasks, contexts, log=False)
+
+    output = []
+    for item, mode in zip(items, modes):
+        if file_format == 'csv':
+            output.append([item.get(column, '') for column in header] + [mode])
+        else:
+            item['mode'] = mode
+            output.append(json.dumps(item, ensure_ascii=False) + '\n')
+
+    return output, Counter(modes), len(records) - len(items)
+
+
+def _chunks(iterator: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_triage(input_path: str, output_path: str, workers: int = 1, chunk_size: int = 2000,
+               environment: str = 'development', config_path: Optional[str] = None,
+               verbose: bool = True) -> Dict[str, Any]:
+    """
+    Clasifica todas las tareas de input_path y escribe output_path en streaming.
+
+    Args:
+        input_path: Archivo JSONL (una tarea por línea) o CSV con columna task/input/text
+        output_path: Archivo de salida (mismo formato que la entrada, con "mode")
+        workers: Procesos del pool (1 = en el proceso actual)
+        chunk_size: Tareas por lote enviado a select_modes
+        environment: Ambiente por defecto si el registro no trae uno
+        config_path: YAML de configuración del ModeSelector (opcional)
+        verbose: Si True, imprime progreso periódico
+
+    Returns:
+        Reporte con totales, throughput y distribución de modos
+    """
+    file_format = detect_format(input_path)
+    default_context = {'environment': environment}
+    distribution: Counter = Counter()
+    total = skipped = 0
+    start = last_progress = time.perf_counter()
+
+    with open(input_path, encoding='utf-8', newline='') as source, \
+            open(output_path, 'w', encoding='utf-8', newline='') as target:
+        header = None
+        if file_format == 'csv':
+            reader = csv.reader(source)
+            header = next(reader, [])
+            writer = csv.writer(target)
+            writer.writerow(header + ['mode'])
+            records: Iterator[Any] = reader
+        else:
+            records = source
+
+        def write(result):
+            nonlocal total, skipped, last_progress
+            output, counts, dropped = result
+            if file_format == 'csv':
+                writer.writerows(output)
+            else:
+                target.writelines(output)
+            distribution.update(counts)
+            total += len(output)
+            skipped += dropped
+
+            now = time.perf_counter()
+            if verbose and now - last_progress >= PROGRESS_INTERVAL:
+                last_progress = now
+                print(f"⏳ {total:,} tareas clasificadas ({total / (now - start):,.0f} tareas/s)",
+                      file=sys.stderr)
+
+        init_args = (file_format, header, default_context, config_path)
+        if workers <= 1:
+            _init_worker(*init_args)
+            for chunk in _chunks(iter(records), chunk_size):
+                write(_triage_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=init_args) as pool:
+                # Ventana acotada de lotes en vuelo; se escriben en orden de entrada
+                pending: deque = deque()
+                for chunk in _chunks(iter(records), chunk_size):
+                    pending.append(pool.submit(_triage_chunk, chunk))
+                    if len(pending) >= workers * 2:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+
+    elapsed = time.perf_counter() - start
+    return {
+        'input': input_path,
+        'output': output_path,
+        'total_tasks': total,
+        'skipped': skipped,
+        'elapsed_seconds': elapsed,
+        'tasks_per_second': total / elapsed if elapsed > 0 else float('inf'),
+        'modes_distribution': dict(distribution),
+        'workers': workers,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Resumen legible de un triage"""
+    total = report['total_tasks']
+    lines = [
+        "📋 TRIAGE DE MODOS",
+        "=" * 60,
+        f"Entrada: {report['input']} -> {report['output']}",
+        f"Tareas: {total:,} | Descartadas: {report['skipped']:,} | Workers: {report['workers']}",
+        f"Tiempo: {report['elapsed_seconds']:.1f}s ({report['tasks_per_second']:,.0f} tareas/s)",
+        "-" * 60,
+    ]
+    for mode in ('PASSIVE', 'DIRECT', 'SAFE'):
+        count = report['modes_distribution'].get(mode, 0)
+        share = count / total * 100 if total else 0.0
+        lines.append(f"{MODE_EMOJI[mode]} {mode:<8} {count:>12,}  ({share:5.1f}%)")
+    return "\n".join(lines)
+
+
+def run_triage_mode(args):
+    """Punto de entrada desde main.py --mode triage"""
+    if not args.input:
+        print("❌ --input es obligatorio en modo triage")
+        sys.exit(1)
+
+    from agent_core.selector_config import DEFAULT_CONFIG_PATH
+
+    root, extension = os.path.splitext(args.input)
+    config_path = args.config or (str(DEFAULT_CONFIG_PATH) if os.path.exists(DEFAULT_CONFIG_PATH) else None)
+    report = run_triage(
+        args.input, args.output or f"{root}.triage{extension}",
+        workers=args.workers or os.cpu_count() or 1,
+        chunk_size=args.chunk_size,
+        environment=args.environment,
+        config_path=config_path,
+    )
+    print(format_report(report))
@@ -36,18 +36,19 @@ class MARTINInterface:
     def __init__(self, llm_provider="auto"):
         """
         Args:
-            llm_provider: "openai", "claude", o "auto"
+            llm_provider: "openai", "claude", "fake" (pruebas de carga), o "auto"
         """
         # Detectar API keys disponibles
         self.has_openai = os.getenv('OPENAI_API_KEY') is not None
         self.has_claude = os.getenv('ANTHROPIC_API_KEY') is not None
         
-        use_llm = self.has_openai or self.has_claude
+        use_llm = self.has_openai or self.has_claude or llm_provider == "fake"
         
         self.agent = MARTINAgent(
             use_llm=use_llm,
             llm_provider=llm_provider,
-            verbose=False
+            verbose=False,
+            watch_config=True
         )
         self.conversation = []
         
@@ -57,6 +58,8 @@ class MARTINInterface:
                 print("✅ Usando OpenAI GPT-4")
             elif self.agent.llm_provider == "claude":
                 print("✅ Usando Anthropic Claude 3.5 Sonnet")
+            elif self.agent.llm_provider == "fake":
+                print("🧪 Usando LLM falso (pruebas de carga)")
         else:
             print("⚠️  Sin API Keys - Usando modo simulado")
             print("   Para usar LLMs reales, configura API keys en .env")
@@ -71,12 +74,9 @@ class MARTINInterface:
         if provider == "claude" and not self.has_claude:
             return "❌ ANTHROPIC_API_KEY no configurada en .env"
         
-        # Reiniciar agente con nuevo proveedor
-        self.agent = MARTINAgent(
-            use_llm=True,
-            llm_provider=provider,
-            verbose=False
-        )
+        # Cambiar de cliente (compartido por el proceso) sin reconstruir el agente
+        if not self.agent.switch_llm(provider):
+            return f"❌ No se pudo inicializar {provider}"
         
         provider_names = {
             "openai": "OpenAI GPT-4",
@@ -85,30 +85,42 @@ class MARTINInterface:
         
         return f"✅ Cambiado a {provider_names.get(provider, provider)}"
     
-    def process_message(self, message, environment, history):
-        """Procesa mensaje del usuario"""
+    async def process_message(self, message, environment, history):
+        """
+        Procesa mensaje del usuario en streaming: muestra el modo elegido de
+        inmediato y el texto del LLM a medida que llega.
+        """
         
         if not message.strip():
-            return history, "", "Por favor ingresa un mensaje"
+            yield history, "", "Por favor ingresa un mensaje"
+            return
         
         context = {
             'environment': environment
         }
         
-        # Procesar con M.A.R.T.I.N.
-        result = self.agent.process(message, context)
-        
-        # Formatear respuesta
-        response = self._format_response(result)
-        mode_info = self._format_mode_info(result)
+        history.append((message, ""))
+        header = ""
+        mode_info = ""
+        partial = ""
         
-        # Agregar a historial
-        history.append((message, response))
-        
-        return history, "", mode_info
+        # Procesar con M.A.R.T.I.N.
+        async for chunk in self.agent.astream(message, context):
+            if chunk['type'] == 'mode':
+                header = self._format_header(chunk['mode'])
+                mode_info = str(chunk['explanation'])
+                history[-1] = (message, header)
+            elif chunk['type'] == 'token':
+                partial += chunk['text']
+                history[-1] = (message, header + partial)
+            else:
+                result = chunk['result']
+                history[-1] = (message, self._format_response(result))
+                mode_info = self._format_mode_info(result)
+            yield history, "", mode_info
     
-    def _format_response(self, result):
-        """Formatea la respuesta de M.A.R.T.I.N. para mostrar en UI"""
+    def _format_header(self, mode):
+        """Encabezado de la respuesta según el modo"""
         
         mode_emoji = {
             'PASSIVE': '🟦',
@@ -116,9 +128,13 @@ class MARTINInterface:
             'SAFE': '🟨'
         }
         
-        emoji = mode_emoji.get(result['mode'], '⚪')
+        emoji = mode_emoji.get(mode, '⚪')
+        return f"{emoji} **Modo {mode} activado**\n\n"
+    
+    def _format_response(self, result):
+        """Formatea la respuesta de M.A.R.T.I.N. para mostrar en UI"""
         
-        response = f"{emoji} **Modo {result['mode']} activado**\n\n"
+        response = self._format_header(result['mode'])
         response += result['message']
         
         if result.get('requires_user_action'):
@@ -128,7 +144,10 @@ class MARTINInterface:
     
     def _format_mode_info(self, result):
         """Muestra información sobre por qué se eligió ese modo"""
-        return result.get('mode_explanation', 'No hay explicación disponible')
+        explanation = result.get('mode_explanation')
+        if explanation is None:
+            return 'No hay explicación disponible'
+        return str(explanation)
     
     def reset_conversation(self):
         """Reinicia la conversación"""
@@ -288,11 +307,11 @@ LLM: {llm_info}
             """)
             
             # Event handlers
-            def submit(message, env, history):
-                new_history, cleared_input, mode_explanation = self.process_message(
+            async def submit(message, env, history):
+                async for new_history, cleared_input, mode_explanation in self.process_message(
                     message, env, history
-                )
-                return new_history, cleared_input, mode_explanation
+                ):
+                    yield new_history, cleared_input, mode_explanation
             
             submit_btn.click(
                 submit,
@@ -46,7 +46,7 @@ def run_cli_mode():
         print("✅ API Key detectada. Usando GPT-4 para respuestas.\n")
     
     # Inicializar agente
-    agent = MARTINAgent(use_llm=use_llm, verbose=False)
+    agent = MARTINAgent(use_llm=use_llm, verbose=False, watch_config=True)
     
     print("Comandos disponibles:")
     print("  /help     - Muestra esta ayuda")
@@ -102,20 +102,19 @@ def run_cli_mode():
                     result = agent.confirm_action(pending_confirmation['id'], confirmed=True)
                     print("\n✅ Acción confirmada y ejecutada")
                     pending_confirmation = None
+                    print_response(result)
                 elif user_input.lower() in ['no', 'n', 'cancelar', 'cancel']:
                     result = agent.confirm_action(pending_confirmation['id'], confirmed=False)
                     print("\n❌ Acción cancelada")
                     pending_confirmation = None
+                    print_response(result)
                 else:
                     # No es confirmación, es un nuevo input
                     pending_confirmation = None
-                    result = agent.process(user_input, context)
+                    result = stream_response(agent, user_input, context)
             else:
-                # Procesar input normal
-                result = agent.process(user_input, context)
-            
-            # Mostrar respuesta
-            print_response(result)
+                # Procesar input normal (la respuesta se imprime a medida que llega)
+                result = stream_response(agent, user_input, context)
             
             # Verificar si requiere confirmación
             if result.get('requires_user_action'):
@@ -180,6 +179,9 @@ Comandos disponibles:
                     print(f"\n[{i}] {item['timestamp']}")
                     print(f"Tu: {item['input'][:100]}...")
                     print(f"Modo: {item.get('mode_selected', 'N/A')}")
+                    explanation = item.get('result', {}).get('mode_explanation')
+                    if explanation is not None:
+                        print(f"Razón: {getattr(explanation, 'reason', explanation)}")
     
     elif command == '/summary':
         summary = agent.get_session_summary()
@@ -235,21 +237,53 @@ Comandos disponibles:
         print(f"❌ Comando desconocido: {command}")
         print("Usa /help para ver los comandos disponibles")
 
-def print_response(result: dict):
-    """Imprime la respuesta de M.A.R.T.I.N. de forma bonita"""
+def stream_response(agent: MARTINAgent, user_input: str, context: dict) -> dict:
+    """
+    Procesa el input mostrando la respuesta a medida que llega: primero el
+    modo, luego el texto del LLM y al final los avisos. Retorna el resultado.
+    """
+    header_shown = streamed = False
+    result = None
+    for chunk in agent.stream(user_input, context):
+        if chunk['type'] == 'mode':
+            print_header(chunk['mode'])
+            header_shown = True
+        elif chunk['type'] == 'token':
+            print(chunk['text'], end='', flush=True)
+            streamed = True
+        else:
+            result = chunk['result']
+    
+    if streamed:
+        print()
+        print_footer(result)
+    else:
+        print_response(result, header=not header_shown)
+    return result
+
+def print_header(mode: str):
+    """Encabezado de la respuesta según el modo"""
     mode_emoji = {
         'PASSIVE': '🟦',
         'DIRECT': '🟩',
         'SAFE': '🟨'
-    }.get(result.get('mode', ''), '⚪')
+    }.get(mode, '⚪')
     
-    print(f"\n{mode_emoji} M.A.R.T.I.N. ({result.get('mode', 'UNKNOWN')}):")
+    print(f"\n{mode_emoji} M.A.R.T.I.N. ({mode or 'UNKNOWN'}):")
     print("-"*60)
+
+def print_response(result: dict, header: bool = True):
+    """Imprime la respuesta de M.A.R.T.I.N. de forma bonita"""
+    if header:
+        print_header(result.get('mode', ''))
     
     # Mostrar el mensaje principal
     message = result.get('message', result.get('results', 'Sin respuesta'))
     print(message)
-    
+    print_footer(result)
+
+def print_footer(result: dict):
+    """Avisos finales de la respuesta"""
     # Si está bloqueado, mostrar advertencia especial
     if result.get('status') == 'blocked':
         print("\n⚠️ ACCIÓN BLOQUEADA POR SEGURIDAD")
@@ -267,7 +301,7 @@ def main():
     
     parser.add_argument(
         '--mode',
-        choices=['cli', 'web', 'test'],
+        choices=['cli', 'web', 'test', 'triage'],
         default='cli',
         help='Modo de ejecución (default: cli)'
     )
@@ -284,10 +318,23 @@ def main():
         help='Modo verbose (más información de debug)'
     )
     
+    # Opciones del modo triage
+    triage = parser.add_argument_group('triage', 'Clasificación masiva de tareas (--mode triage)')
+    triage.add_argument('--input', help='Archivo JSONL o CSV con tareas')
+    triage.add_argument('--output', help='Archivo de salida (default: <input>.triage.<ext>)')
+    triage.add_argument('--workers', type=int, default=0, help='Procesos del pool (default: CPUs)')
+    triage.add_argument('--chunk-size', type=int, default=2000, help='Tareas por lote')
+    triage.add_argument('--environment', default='development',
+                        help='Ambiente por defecto de las tareas (default: development)')
+    triage.add_argument('--config', help='YAML de configuración del ModeSelector')
+    
     args = parser.parse_args()
     
     if args.mode == 'cli':
         run_cli_mode()
+    elif args.mode == 'triage':
+        from interface.cli.triage import run_triage_mode
+        run_triage_mode(args)
     elif args.mode == 'web':
         print("🚧 Interfaz web próximamente...")
         print("Por ahora, usa: python ui/gradio_interface.py")
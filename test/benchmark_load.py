@@ -0,0 +1,134 @@
+"""
+Benchmark de carga de M.A.R.T.I.N. con el proveedor falso (sin red ni API keys)
+
+Abre muchas sesiones concurrentes en un solo event loop (aprocess) contra un
+FakeLLM con latencia, velocidad de tokens y errores inyectados, y reporta:
+- Throughput y latencias p50/p95 por request
+- Llamadas, errores y 429 vistos por el proveedor falso
+- Cola y esperas del control de admisión
+
+Uso:
+    python test/benchmark_load.py                              # 50 sesiones x 4 requests
+    python test/benchmark_load.py --sessions 200 --max-concurrency 16
+    python test/benchmark_load.py --burst-every 20 --burst-length 5 --output load.jsonl
+"""
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.fake_llm import FakeLLM
+from agent_core.llm_registry import get_llm_registry
+from agent_core.martin_agent import MARTINAgent
+
+TASKS = [
+    "Ayúdame con SOC 2",
+    "Explícame qué es compliance",
+    "Genera un reporte de accesos del último mes",
+    "Revisa la política de contraseñas",
+]
+
+
+async def run_session(agent: MARTINAgent, session: int, requests: int) -> List[float]:
+    """Latencias de las requests de una sesión (tareas distintas por sesión)"""
+    latencies = []
+    for index in range(requests):
+        task = f"{TASKS[index % len(TASKS)]} (sesión {session})"
+        start = time.perf_counter()
+        await agent.aprocess(task, {'environment': 'development'})
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    fake = FakeLLM(latency=args.latency, latency_distribution=args.distribution,
+                   tokens_per_second=args.tps, response_tokens=args.response_tokens,
+                   error_rate=args.error_rate, burst_every=args.burst_every,
+                   burst_length=args.burst_length, max_concurrency=args.max_concurrency,
+                   seed=args.seed)
+    registry = get_llm_registry()
+    registry.register("fake", fake)
+    limits = {'fake': {'max_in_flight': args.max_in_flight, 'rpm': args.rpm, 'tpm': args.tpm}}
+
+    agents = [MARTINAgent(use_llm=True, llm_provider="fake", verbose=False, rate_limits=limits)
+              for _ in range(args.sessions)]
+    start = time.perf_counter()
+    sessions = await asyncio.gather(*(run_session(agent, index, args.requests)
+                                      for index, agent in enumerate(agents)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for session in sessions for latency in session)
+    return {
+        'sessions': args.sessions,
+        'requests': len(latencies),
+        'elapsed_s': elapsed,
+        'throughput_rps': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'provider': fake.stats(),
+        'rate_limits': agents[0].reasoning.limiter_stats().get('fake', {}),
+        'circuit_breaker': agents[0].reasoning.breaker_stats().get('fake', {}),
+    }
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    provider, limiter = result['provider'], result['rate_limits']
+    breaker = result['circuit_breaker']
+    return "\n".join([
+        f"🚀 {result['requests']} requests en {result['elapsed_s']:.2f}s "
+        f"({result['throughput_rps']:.1f} req/s, {result['sessions']} sesiones)",
+        f"   Latencia: p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms",
+        f"   Proveedor: {provider['calls']} llamadas, {provider['errors']} errores, "
+        f"{provider['rate_limited']} 429, pico de {provider['peak_in_flight']} simultáneas",
+        f"   Admisión: cola máxima {limiter.get('max_queue_depth', 0)}, "
+        f"espera media {limiter.get('avg_wait', 0) * 1000:.0f} ms, "
+        f"{limiter.get('timeouts', 0)} timeouts",
+        f"   Circuito: {breaker.get('state', '-')}, {breaker.get('rejected', 0)} llamadas evitadas, "
+        f"{breaker.get('probes', 0)} pruebas de recuperación",
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga con el LLM falso')
+    parser.add_argument('--sessions', type=int, default=50, help='Sesiones concurrentes')
+    parser.add_argument('--requests', type=int, default=4, help='Requests por sesión')
+    parser.add_argument('--latency', type=float, default=0.3, help='Segundos hasta el primer token')
+    parser.add_argument('--distribution', default='lognormal', help='constant, uniform o lognormal')
+    parser.add_argument('--tps', type=float, default=200.0, help='Tokens por segundo')
+    parser.add_argument('--response-tokens', type=int, default=80, help='Tokens por respuesta')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidad de error 500')
+    parser.add_argument('--burst-every', type=int, default=0, help='Período de las ráfagas de 429')
+    parser.add_argument('--burst-length', type=int, default=0, help='Llamadas por ráfaga de 429')
+    parser.add_argument('--max-concurrency', type=int, help='Llamadas simultáneas que acepta el proveedor')
+    parser.add_argument('--max-in-flight', type=int, default=8, help='Límite del control de admisión')
+    parser.add_argument('--rpm', type=float, help='Requests por minuto del control de admisión')
+    parser.add_argument('--tpm', type=float, help='Tokens por minuto del control de admisión')
+    parser.add_argument('--seed', type=int, default=0, help='Semilla del proveedor falso')
+    parser.add_argument('--output', help='Archivo JSONL al que agregar el resultado')
+    args = parser.parse_args()
+
+    # Caché de respuestas vacío: las corridas no se contaminan entre sí
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ['MARTIN_LLM_CACHE'] = os.path.join(directory, 'llm_cache.sqlite')
+        result = asyncio.run(run_load(args))
+    print("⏱️  CARGA CON LLM FALSO")
+    print("=" * 60)
+    print(format_result(result))
+
+    if args.output:
+        record = dict(result, config=vars(args), timestamp=datetime.now().isoformat())
+        with open(args.output, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"\n📁 Resultado agregado a {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark de arranque en frío de M.A.R.T.I.N.
+
+Ejecuta cada punto de entrada en un proceso nuevo con `python -X importtime`
+(en modo simulado: sin API keys) y reporta:
+- Tiempo total del proceso y tiempo total de imports
+- Los módulos que más tardan en importarse
+- Si se importó algún SDK de LLM (no debería pasar en modo simulado)
+
+Uso:
+    python test/benchmark_startup.py                   # todos los puntos de entrada
+    python test/benchmark_startup.py cli --repeat 5    # solo main.py --mode cli
+    python test/benchmark_startup.py --output startup.jsonl   # agrega los resultados
+"""
+from typing import Any, Dict, List, Tuple
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Punto de entrada -> (argumentos de python, entrada estándar)
+TARGETS = {
+    'cli': (['main.py', '--mode', 'cli'], "1\n/quit\n"),
+    'quick_start': (['quick_start.py'], "\n\n\n\n"),
+    'gradio': (['-c', 'import interface.gradio_app'], ""),
+}
+
+# Módulos que el modo simulado no debería cargar
+LLM_SDK_MODULES = ('langchain', 'langchain_core', 'langchain_openai', 'langchain_anthropic',
+                   'openai', 'anthropic', 'tiktoken')
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Interpreta la salida de -X importtime.
+
+    Returns:
+        (ms totales de imports de primer nivel, [(módulo, ms acumulados)])
+    """
+    total_us = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        cumulative_us = int(cumulative)
+        # Los imports anidados vienen indentados bajo el que los disparó
+        if not name.startswith('  '):
+            total_us += cumulative_us
+        modules.append((name.strip(), cumulative_us / 1000))
+    return total_us / 1000, modules
+
+
+def run_target(name: str) -> Dict[str, Any]:
+    """Ejecuta un punto de entrada una vez y mide su arranque"""
+    arguments, stdin = TARGETS[name]
+    env = {key: value for key, value in os.environ.items()
+           if key not in ('OPENAI_API_KEY', 'ANTHROPIC_API_KEY')}
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + arguments,
+        cwd=ROOT, input=stdin, capture_output=True, text=True, env=env, timeout=300,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    import_ms, modules = parse_importtime(process.stderr)
+    top_level = {module.split('.')[0] for module, _ in modules}
+    return {
+        'target': name,
+        'ok': process.returncode == 0,
+        'wall_ms': wall_ms,
+        'import_ms': import_ms,
+        'modules': modules,
+        'sdk_imports': sorted(top_level & set(LLM_SDK_MODULES)),
+        'error': process.stderr.strip().splitlines()[-1] if process.returncode else None,
+    }
+
+
+def benchmark(name: str, repeat: int = 3) -> Dict[str, Any]:
+    """Mediana de varias ejecuciones de un punto de entrada"""
+    runs = [run_target(name) for _ in range(repeat)]
+    last = runs[-1]
+    slowest = sorted(last['modules'], key=lambda item: item[1], reverse=True)
+    return {
+        'target': name,
+        'ok': all(run['ok'] for run in runs),
+        'wall_ms': statistics.median(run['wall_ms'] for run in runs),
+        'import_ms': statistics.median(run['import_ms'] for run in runs),
+        'slowest': slowest[:10],
+        'sdk_imports': last['sdk_imports'],
+        'error': last['error'],
+    }
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    if not result['ok']:
+        return f"❌ {result['target']}: {result['error']}"
+    lines = [
+        f"🚀 {result['target']}: {result['wall_ms']:.0f} ms de proceso, "
+        f"{result['import_ms']:.0f} ms en imports",
+    ]
+    for module, ms in result['slowest'][:5]:
+        lines.append(f"   {ms:8.1f} ms  {module}")
+    if result['sdk_imports']:
+        lines.append(f"   ⚠️ SDKs de LLM importados en modo simulado: {', '.join(result['sdk_imports'])}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de arranque en frío de M.A.R.T.I.N.')
+    parser.add_argument('targets', nargs='*', help=f"Puntos de entrada ({', '.join(TARGETS)}; por defecto todos)")
+    parser.add_argument('--repeat', type=int, default=3, help='Ejecuciones por punto de entrada')
+    parser.add_argument('--output', help='Archivo JSONL al que agregar los resultados')
+    args = parser.parse_args()
+    unknown = set(args.targets) - set(TARGETS)
+    if unknown:
+        parser.error(f"punto de entrada desconocido: {', '.join(sorted(unknown))}")
+
+    results = [benchmark(name, args.repeat) for name in args.targets or list(TARGETS)]
+    print("⏱️  ARRANQUE EN FRÍO (modo simulado)")
+    print("=" * 60)
+    for result in results:
+        print(format_result(result))
+
+    if args.output:
+        timestamp = datetime.now().isoformat()
+        with open(args.output, 'a', encoding='utf-8') as file:
+            for result in results:
+                record = dict(result, timestamp=timestamp)
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"\n📁 Resultados agregados a {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Reproduce conversaciones exportadas contra un cassette de llamadas al LLM
+
+Cada conversación exportada con MARTINAgent.export_conversation('json') se
+vuelve a procesar con un agente nuevo que responde desde el cassette (sin
+red ni API keys). Reporta el tiempo total, las respuestas que no estaban
+grabadas y cuántos mensajes difieren de los originales.
+
+Grabar un cassette:
+    agent = MARTINAgent(use_llm=True, cassette="dia.cassette", cassette_mode="record")
+
+Uso:
+    python test/replay_cassette.py dia.cassette martin_session_*.json   # en el orden grabado
+    python test/replay_cassette.py dia.cassette sesion.json --timed
+"""
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.llm_cassette import CASSETTE_REPLAY, CASSETTE_REPLAY_TIMED, open_cassette
+from agent_core.martin_agent import MARTINAgent
+
+
+def replay_conversation(cassette_path: str, conversation: List[Dict[str, Any]],
+                        timed: bool = False) -> Dict[str, Any]:
+    """Procesa de nuevo una conversación y la compara con la original"""
+    agent = MARTINAgent(use_llm=True, verbose=False, rate_limits=False, cassette=cassette_path,
+                        cassette_mode=CASSETTE_REPLAY_TIMED if timed else CASSETTE_REPLAY)
+    different = 0
+    for interaction in conversation:
+        result = agent.process(interaction['input'], interaction.get('context') or {})
+        if result.get('message') != interaction['result'].get('message'):
+            different += 1
+    return {'interactions': len(conversation), 'different': different}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reproduce conversaciones contra un cassette')
+    parser.add_argument('cassette', help='Cassette grabado')
+    parser.add_argument('sessions', nargs='+', help='Conversaciones exportadas (JSON)')
+    parser.add_argument('--timed', action='store_true', help='Respetar las latencias grabadas')
+    args = parser.parse_args()
+
+    cassette = open_cassette(args.cassette)
+    start = time.perf_counter()
+    interactions = different = 0
+    for path in args.sessions:
+        with open(path, encoding='utf-8') as file:
+            conversation = json.load(file)['conversation']
+        result = replay_conversation(args.cassette, conversation, args.timed)
+        interactions += result['interactions']
+        different += result['different']
+    elapsed = time.perf_counter() - start
+
+    stats = cassette.stats()
+    print("📼 REPRODUCCIÓN DE CASSETTE")
+    print("=" * 60)
+    print(f"🚀 {interactions} interacciones de {len(args.sessions)} sesiones en {elapsed:.2f}s")
+    print(f"   Respuestas: {stats['hits']} reproducidas, {stats['misses']} sin grabar")
+    print(f"   {'✅' if not different else '❌'} {different} mensajes distintos de los originales")
+    sys.exit(1 if different or stats['misses'] else 0)
+
+
+if __name__ == "__main__":
+    main()
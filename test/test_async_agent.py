@@ -0,0 +1,118 @@
+"""
+Tests del camino asíncrono (ReasoningEngines a* y MARTINAgent.aprocess)
+"""
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.martin_agent import MARTINAgent
+from agent_core.reasoning_engines import ReasoningEngines
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class EchoLLM:
+    """LLM de prueba con invoke/ainvoke; ainvoke cede el event loop"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+
+    def invoke(self, prompt):
+        return Reply(f"respuesta a {len(prompt)} caracteres")
+
+    async def ainvoke(self, prompt):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        return self.invoke(prompt)
+
+
+def engines_with(llm):
+    engines = ReasoningEngines(use_llm=False)
+    engines.use_llm = True
+    engines.llm = llm
+    return engines
+
+
+TASKS = ["Ayúdame con SOC 2", "Explícame qué es compliance", "Delete all users from database"]
+
+
+def test_async_engines_match_sync():
+    engines = engines_with(EchoLLM())
+    for name in ('passive_reasoning', 'direct_reasoning', 'safe_reasoning'):
+        for task in TASKS:
+            sync_result = getattr(engines, name)(task, {})
+            async_result = asyncio.run(getattr(engines, 'a' + name)(task, {}))
+            assert async_result == sync_result
+
+
+def test_aprocess_matches_process_with_confirmation_flow():
+    sync_agent = MARTINAgent(use_llm=False, verbose=False)
+    async_agent = MARTINAgent(use_llm=False, verbose=False)
+
+    async def run():
+        return [await async_agent.aprocess(text) for text in ("Ayúdame con SOC 2", "sí", "Delete all users", "no")]
+
+    async_results = asyncio.run(run())
+    sync_results = [sync_agent.process(text) for text in ("Ayúdame con SOC 2", "sí", "Delete all users", "no")]
+
+    ignore = ('timestamp', 'mode_explanation')
+    for a, b in zip(async_results, sync_results):
+        assert {k: v for k, v in a.items() if k not in ignore} == {k: v for k, v in b.items() if k not in ignore}
+    assert [r.get('confirmation') for r in async_results] == [None, 'accepted', None, 'rejected']
+
+
+def test_sessions_share_one_event_loop():
+    llm = EchoLLM(delay=0.05)
+    agents = []
+    for _ in range(50):
+        agent = MARTINAgent(use_llm=False, verbose=False)
+        agent.reasoning = engines_with(llm)
+        agents.append(agent)
+
+    async def run():
+        return await asyncio.gather(*(agent.aprocess("Explícame qué es compliance") for agent in agents))
+
+    results = asyncio.run(run())
+    assert len(results) == 50
+    assert llm.max_active == 50
+
+
+def test_shared_agent_keeps_each_decision():
+    # Una sola instancia atendiendo sesiones concurrentes (como la app Gradio)
+    agent = MARTINAgent(use_llm=False, verbose=False)
+    agent.reasoning = engines_with(EchoLLM(delay=0.05))
+    tasks = ["Ayúdame con SOC 2", "Genera reporte de gaps SOC 2 para TechStartup",
+             "Delete all users from database"]
+
+    async def collect(task):
+        return [chunk async for chunk in agent.astream(task)]
+
+    async def run():
+        results = await asyncio.gather(*(agent.aprocess(task) for task in tasks))
+        streams = await asyncio.gather(*(collect(task) for task in tasks))
+        return results, streams
+
+    results, streams = asyncio.run(run())
+    assert len({result['mode'] for result in results}) == 3
+    for task, result, chunks in zip(tasks, results, streams):
+        decision = result['mode_explanation']
+        assert (decision.task, decision.selected_mode) == (task, result['mode'])
+        first, last = chunks[0], chunks[-1]
+        assert first['explanation'] is last['result']['mode_explanation']
+        assert (first['explanation'].task, first['mode']) == (task, result['mode'])
+
+
+if __name__ == "__main__":
+    test_async_engines_match_sync()
+    test_aprocess_matches_process_with_confirmation_flow()
+    test_sessions_share_one_event_loop()
+    test_shared_agent_keeps_each_decision()
+    print("✅ Tests del camino asíncrono completados!")
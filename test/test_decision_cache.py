@@ -0,0 +1,90 @@
+"""
+Tests de la caché LRU de decisiones del ModeSelector
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.decision_cache import DecisionCache
+from agent_core.mode_selector import ModeSelector
+
+
+def test_hits_and_context_fields():
+    selector = ModeSelector(cache_size=16)
+
+    first = selector.select_mode("Genera política de contraseñas", {'environment': 'development'})
+    second = selector.select_mode("Genera política de contraseñas", {'environment': 'development'})
+    production = selector.select_mode("Genera política de contraseñas", {'environment': 'production'})
+
+    assert first == second
+    assert production == 'SAFE'
+    assert selector.cache_stats()['hits'] == 1
+    assert selector.cache_stats()['misses'] == 2
+    assert len(selector.decision_log) == 3
+
+
+def test_cached_decision_matches_uncached():
+    cached = ModeSelector(cache_size=4)
+    plain = ModeSelector()
+    tasks = ['Ayúdame con SOC 2', 'Delete all users from database', 'Genera reporte ISO 27001'] * 3
+
+    for task in tasks:
+        assert cached.select_mode(task) == plain.select_mode(task)
+        assert cached.decision_log[-1].to_dict() == plain.decision_log[-1].to_dict()
+
+
+def test_variants_are_not_folded():
+    # Mayúsculas y acentos cambian el puntaje: cada variante tiene su propia decisión
+    variants = [
+        ('produccion guia produccion contrasena', 'producción guía producción contraseña'),
+        ('la crea', 'la Crea'),
+        ('Genera política de contraseñas', 'genera  politica de CONTRASEÑAS'),
+    ]
+    for pair in variants:
+        for order in (pair, pair[::-1]):
+            cached = ModeSelector(cache_size=128)
+            plain = ModeSelector()
+            for task in order * 2:
+                assert cached.select_mode(task) == plain.select_mode(task), task
+                assert cached.decision_log[-1].to_dict() == plain.decision_log[-1].to_dict()
+            assert cached.cache_stats()['hits'] == 2
+    assert ModeSelector().select_mode('producción guía producción contraseña') == 'SAFE'
+    assert ModeSelector().select_mode('la crea') != ModeSelector().select_mode('la Crea')
+
+
+def test_lru_eviction():
+    cache = DecisionCache(max_size=2)
+    cache.put('a', 0, (0.0, 1.0, 3))
+    cache.put('b', 0, (0.0, 1.0, 3))
+    cache.get('a', 0)
+    cache.put('c', 0, (0.0, 1.0, 3))
+
+    assert cache.get('b', 0) is None
+    assert cache.get('a', 0) is not None
+    assert cache.stats()['evictions'] == 1
+
+
+def test_invalidation_on_config_change():
+    selector = ModeSelector(cache_size=16)
+    task = 'Genera reporte de gaps SOC 2 para TechStartup'
+
+    assert selector.select_mode(task) == 'DIRECT'
+    selector.set_thresholds(clarity=1.5)
+    assert selector.select_mode(task) == 'PASSIVE'
+
+    selector.set_keywords('danger', ModeSelector.DANGER_KEYWORDS + ['reporte'])
+    assert selector.decision_log[-1].risk_score == 0.0
+    selector.select_mode(task)
+    assert selector.decision_log[-1].risk_score == 0.25
+    assert selector.cache_stats()['invalidations'] == 2
+    # El vocabulario de la clase no cambia
+    assert 'reporte' not in ModeSelector.DANGER_KEYWORDS
+
+
+if __name__ == "__main__":
+    test_hits_and_context_fields()
+    test_cached_decision_matches_uncached()
+    test_variants_are_not_folded()
+    test_lru_eviction()
+    test_invalidation_on_config_change()
+    print("✅ Tests de DecisionCache completados!")
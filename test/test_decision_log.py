@@ -0,0 +1,84 @@
+"""
+Tests del DecisionLog circular del ModeSelector
+"""
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.mode_selector import ModeSelector, DecisionLog, DecisionRecord
+
+
+def make_record(i):
+    return DecisionRecord(f"tarea {i}", 0.0, 1.0, 'development', 'DIRECT', 3)
+
+
+def test_ring_buffer_keeps_latest():
+    log = DecisionLog(capacity=3)
+    for i in range(10):
+        log.append(make_record(i))
+
+    assert len(log) == 3
+    assert log.total == 10
+    assert [r.task for r in log] == ['tarea 7', 'tarea 8', 'tarea 9']
+    assert [r.task for r in log.recent(2)] == ['tarea 9', 'tarea 8']
+    assert log[-1].task == 'tarea 9'
+    assert log[0].task == 'tarea 7'
+
+
+def test_spill_to_disk():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'decisions.jsonl')
+        log = DecisionLog(capacity=2, spill_path=path)
+        for i in range(5):
+            log.append(make_record(i))
+        log.close()
+
+        with open(path, encoding='utf-8') as f:
+            spilled = [json.loads(line)['task'] for line in f]
+
+    assert spilled == ['tarea 0', 'tarea 1', 'tarea 2']
+
+
+def test_selector_memory_stays_bounded():
+    selector = ModeSelector(log_capacity=5)
+    assert selector.explain_last_decision() == "No hay decisiones registradas aún"
+
+    for _ in range(50):
+        selector.select_mode('Ayúdame con SOC 2')
+    selector.select_mode('Delete all users from database')
+
+    assert len(selector.decision_log) == 5
+    assert 'SAFE' in selector.explain_last_decision()
+    stats = selector.get_statistics()
+    assert stats['total_decisions'] == 51
+    assert stats['modes_distribution'] == {'PASSIVE': 4, 'SAFE': 1}
+
+
+def test_agent_attaches_record_and_renders_on_demand():
+    from agent_core.martin_agent import MARTINAgent
+
+    agent = MARTINAgent(use_llm=False, verbose=False)
+    result = agent.process('Delete all users from database')
+    record = result['mode_explanation']
+
+    assert isinstance(record, DecisionRecord)
+    assert record is agent.mode_selector.last_decision()
+    assert str(record) == agent.mode_selector.explain_last_decision()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = agent.export_conversation('json', os.path.join(tmp, 'session.json'))
+        with open(path, encoding='utf-8') as f:
+            exported = json.load(f)['conversation'][0]['result']['mode_explanation']
+
+    assert exported['selected_mode'] == 'SAFE'
+    assert exported['reason'] == record.reason
+
+
+if __name__ == "__main__":
+    test_ring_buffer_keeps_latest()
+    test_spill_to_disk()
+    test_selector_memory_stays_bounded()
+    test_agent_attaches_record_and_renders_on_demand()
+    print("✅ Tests del DecisionLog completados!")
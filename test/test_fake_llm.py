@@ -0,0 +1,107 @@
+"""
+Tests del proveedor LLM falso para pruebas de carga
+"""
+import sys
+import os
+import asyncio
+import json
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.fake_llm import FakeLLM, FakeLLMError
+from agent_core.llm_registry import get_llm_registry
+from agent_core.reasoning_engines import ReasoningEngines
+
+
+def test_latency_and_token_rate():
+    fake = FakeLLM(latency=0.05, latency_distribution='constant', tokens_per_second=200,
+                   response_tokens=20)
+    start = time.perf_counter()
+    reply = fake.invoke("Ayúdame con SOC 2")
+    elapsed = time.perf_counter() - start
+    # 50 ms hasta el primer token + 22 tokens (prefijo + 20 palabras) a 200 tokens/s
+    assert 0.14 <= elapsed < 0.4
+    assert reply.usage_metadata['output_tokens'] == 22
+
+    chunks = list(fake.stream("Ayúdame con SOC 2"))
+    first_token = None
+    assert len(chunks) == 22 and ''.join(chunk.content for chunk in chunks) == reply.content
+
+    async def first_chunk():
+        nonlocal first_token
+        began = time.perf_counter()
+        async for _ in fake.astream("Ayúdame con SOC 2"):
+            first_token = time.perf_counter() - began
+            break
+
+    asyncio.run(first_chunk())
+    assert 0.04 <= first_token < 0.1
+    assert fake.stats()['in_flight'] == 0 and fake.stats()['calls'] == 3
+
+
+def test_runs_are_reproducible():
+    def run(seed):
+        fake = FakeLLM(latency=0.0, tokens_per_second=None, error_rate=0.3, seed=seed)
+        outcomes = []
+        for index in range(30):
+            try:
+                outcomes.append(fake.invoke(f"tarea {index % 3}").content)
+            except FakeLLMError as e:
+                outcomes.append(e.status_code)
+        return outcomes
+
+    first, second = run(7), run(7)
+    assert first == second
+    assert 500 in first and any(isinstance(outcome, str) for outcome in first)
+    assert run(8) != first
+
+
+def test_rate_limit_bursts_and_concurrency():
+    fake = FakeLLM(latency=0.0, tokens_per_second=None, burst_every=5, burst_length=2, retry_after=2.0)
+    statuses = []
+    for _ in range(10):
+        try:
+            fake.invoke("p")
+            statuses.append(200)
+        except FakeLLMError as e:
+            statuses.append(e.status_code)
+            assert e.retry_after == 2.0
+    assert statuses == [200, 200, 200, 429, 429] * 2
+    assert fake.stats()['rate_limited'] == 4
+
+    limited = FakeLLM(latency=0.05, latency_distribution='constant', tokens_per_second=None,
+                      max_concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*(limited.ainvoke("p") for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert sum(isinstance(result, FakeLLMError) for result in results) == 3
+    assert limited.stats()['peak_in_flight'] == 5 and limited.stats()['in_flight'] == 0
+
+
+def test_engines_select_fake_provider():
+    registry = get_llm_registry()
+    os.environ['FAKE_LLM_CONFIG'] = json.dumps({'latency': 0.0, 'tokens_per_second': None})
+    try:
+        engines = ReasoningEngines(use_llm=True, llm_provider="fake", llm_cache=False,
+                                   similarity_cache=False)
+        assert engines.use_llm and engines.llm_provider == "fake"
+        assert isinstance(engines.llm.inner, FakeLLM)
+        assert engines.passive_reasoning("Ayúdame con SOC 2")['plan'].startswith("Respuesta simulada")
+
+        # La respuesta estructurada del MODO SEGURO se interpreta sin el flujo de dos pasos
+        result = engines.safe_reasoning("Elimina todos los logs de producción", {'environment': 'production'})
+        assert result['safe_strategy'] == "single" and result['status'] == "blocked"
+        assert engines.llm.inner.stats()['calls'] == 2
+    finally:
+        del os.environ['FAKE_LLM_CONFIG']
+        registry.clear()
+
+
+if __name__ == "__main__":
+    test_latency_and_token_rate()
+    test_runs_are_reproducible()
+    test_rate_limit_bursts_and_concurrency()
+    test_engines_select_fake_provider()
+    print("✅ Tests del proveedor LLM falso completados!")
@@ -0,0 +1,81 @@
+"""
+Tests del KeywordMatcher: mismos conteos que la búsqueda por substring
+"""
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.keyword_matcher import KeywordMatcher
+from agent_core.mode_selector import ModeSelector
+
+
+SAMPLE_TASKS = [
+    'Ayúdame con SOC 2',
+    '¿Cómo preparo mi startup para compliance?',
+    'Genera una política de contraseñas según ISO 27001',
+    'Delete all users from the production database',
+    'Deshabilita la autenticación multifactor del usuario admin@empresa.com',
+    'Escanea mi organización de GitHub buscando problemas de compliance',
+    'Elimina todos los repositorios privados de la organización',
+    'Compliance',
+    'dbdbdb authauthentication generarr genera políticaa',
+]
+
+
+def naive_counts(categories, text):
+    """Conteo de referencia: una pasada por palabra clave"""
+    return {
+        name: sum(1 for word in words if word in text)
+        for name, words in categories.items()
+    }
+
+
+def test_matches_substring_semantics():
+    categories = ModeSelector.keyword_categories()
+    matcher = KeywordMatcher(categories)
+
+    for task in SAMPLE_TASKS:
+        text = task.lower()
+        assert matcher.scan(text) == naive_counts(categories, text), task
+
+
+def test_overlapping_and_repeated_patterns():
+    categories = {
+        'a': ['he', 'she', 'his', 'hers', 'he'],
+        'b': ['she', 'ushe'],
+    }
+    matcher = KeywordMatcher(categories)
+
+    assert matcher.scan('ushers') == {'a': 4, 'b': 2}
+    assert matcher.find_all('ushers') == frozenset({'he', 'she', 'hers', 'ushe'})
+    assert matcher.scan('') == {'a': 0, 'b': 0}
+
+
+def test_random_texts_against_reference():
+    rng = random.Random(7)
+    categories = ModeSelector.keyword_categories()
+    matcher = KeywordMatcher(categories)
+    vocabulary = [word for words in categories.values() for word in words]
+    filler = ['de', 'la', 'para', 'x', 'política', 'todo', 'ab', ' ']
+
+    for _ in range(300):
+        parts = rng.choices(vocabulary + filler, k=rng.randint(0, 12))
+        text = rng.choice(['', ' ', '-']).join(parts).lower()
+        assert matcher.scan(text) == naive_counts(categories, text), text
+
+
+def test_large_vocabulary():
+    words = [f'kw{i:05d}' for i in range(5000)]
+    matcher = KeywordMatcher({'big': words})
+
+    assert len(matcher) == 5000
+    assert matcher.scan('foo kw00042 bar kw04999 kw00042') == {'big': 2}
+
+
+if __name__ == "__main__":
+    test_matches_substring_semantics()
+    test_overlapping_and_repeated_patterns()
+    test_random_texts_against_reference()
+    test_large_vocabulary()
+    print("✅ Tests del KeywordMatcher completados!")
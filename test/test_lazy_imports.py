@@ -0,0 +1,50 @@
+"""
+Tests de imports diferidos: el modo simulado no carga SDKs de LLM ni tools
+"""
+import sys
+import os
+import subprocess
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_startup import LLM_SDK_MODULES, ROOT, parse_importtime
+
+SIMULATED_SESSION = """
+import sys
+from agent_core.martin_agent import MARTINAgent
+agent = MARTINAgent(use_llm=False, verbose=False)
+agent.process("Ayúdame con SOC 2", {})
+agent.process("Explícame qué es compliance", {})
+agent.process("Elimina todos los logs de producción", {'environment': 'production'})
+agent.get_session_summary()
+loaded = sorted({name.split('.')[0] for name in sys.modules})
+print(' '.join(loaded))
+"""
+
+
+def test_simulated_session_imports_no_sdk():
+    env = {key: value for key, value in os.environ.items()
+           if key not in ('OPENAI_API_KEY', 'ANTHROPIC_API_KEY')}
+    output = subprocess.run([sys.executable, '-c', SIMULATED_SESSION], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    loaded = set(output.split())
+    assert 'agent_core' in loaded
+    assert not loaded & set(LLM_SDK_MODULES)
+    assert 'tools' not in loaded and 'asyncio' not in loaded
+
+
+def test_parse_importtime():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 |   _io",
+        "import time:       200 |       1500 | agent_core.mode_selector",
+        "import time:       300 |        500 | json",
+    ])
+    total_ms, modules = parse_importtime(stderr)
+    assert total_ms == 2.0
+    assert modules[1] == ('agent_core.mode_selector', 1.5)
+
+
+if __name__ == "__main__":
+    test_simulated_session_imports_no_sdk()
+    test_parse_importtime()
+    print("✅ Tests de imports diferidos completados!")
@@ -0,0 +1,208 @@
+"""
+Tests del circuit breaker por proveedor y sus respaldos
+"""
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.fake_llm import FakeLLM
+from agent_core.llm_breaker import (BREAKER_CLOSED, BREAKER_HALF_OPEN, BREAKER_OPEN, DEFAULT_BREAKER,
+                                    BreakerLLM, CircuitBreaker, CircuitOpenError,
+                                    get_circuit_breaker)
+from agent_core.llm_cache import CachedLLM, LLMResponseCache, make_key
+from agent_core.llm_hedging import HedgedLLM
+from agent_core.llm_limiter import AdmissionTimeout
+from agent_core.llm_registry import get_llm_registry
+from agent_core.reasoning_engines import ReasoningEngines
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class OutageLLM:
+    """Proveedor que, mientras está caído, tarda `delay` y falla"""
+
+    temperature = 0
+    model_name = "outage"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.down = True
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        if self.down:
+            time.sleep(self.delay)
+            raise TimeoutError("Request timed out")
+        return Reply(f"ok: {prompt}")
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+def fail(breaker, times, error=None):
+    for _ in range(times):
+        breaker.failure(error or TimeoutError("timeout"))
+
+
+def test_state_machine_without_probe():
+    breaker = CircuitBreaker("prueba", failure_threshold=3, reset_timeout=0.05, probe=False)
+    fail(breaker, 2)
+    breaker.success()
+    fail(breaker, 2)
+    # Cuotas y colas no son caídas del proveedor
+    fail(breaker, 5, RuntimeError("429 Too Many Requests"))
+    fail(breaker, 5, AdmissionTimeout("cola llena"))
+    assert breaker.state == BREAKER_CLOSED and breaker.failures == 2
+
+    fail(breaker, 1)
+    assert breaker.state == BREAKER_OPEN and not breaker.allow()
+
+    # Pasado reset_timeout, una sola llamada hace de prueba
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == BREAKER_HALF_OPEN
+    assert not breaker.allow()
+    fail(breaker, 1)
+    assert breaker.state == BREAKER_OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == BREAKER_CLOSED and breaker.allow()
+    assert breaker.stats()['transitions'] == {'closed->open': 1, 'open->half_open': 2,
+                                              'half_open->open': 1, 'half_open->closed': 1}
+    assert breaker.stats()['rejected'] == 2
+
+
+def test_background_probe_closes_after_recovery():
+    provider = OutageLLM()
+    breaker = CircuitBreaker("prueba", failure_threshold=2, reset_timeout=0.05)
+    llm = BreakerLLM(provider, breaker, "prueba", probe=provider)
+    for _ in range(2):
+        try:
+            llm.invoke("hola")
+        except TimeoutError:
+            pass
+    assert breaker.state == BREAKER_OPEN
+
+    # Mientras está abierto no se llama al proveedor (ni siquiera la primera tras reset_timeout)
+    time.sleep(0.12)
+    calls = provider.calls
+    try:
+        llm.invoke("hola")
+        assert False, "debería estar abierto"
+    except CircuitOpenError:
+        pass
+    assert breaker.stats()['probes'] >= 1 and breaker.stats()['probe_failures'] >= 1
+
+    provider.down = False
+    deadline = time.monotonic() + 1.0
+    while breaker.state != BREAKER_CLOSED and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert breaker.state == BREAKER_CLOSED
+    assert provider.calls > calls
+    assert llm.invoke("hola").content == "ok: hola"
+
+
+def test_fallbacks_cache_then_provider_then_mock():
+    cache = LLMResponseCache(ttl=0.01)
+    primary = OutageLLM()
+    breaker = CircuitBreaker("caido", failure_threshold=1, reset_timeout=60, probe=False)
+    other = FakeLLM(latency=0, tokens_per_second=None)
+    other_breaker = CircuitBreaker("otro", failure_threshold=1, reset_timeout=60, probe=False)
+    llm = BreakerLLM(primary, breaker, "caido", stale_cache=cache,
+                     fallback=BreakerLLM(other, other_breaker, "otro"))
+    cache.put(make_key("caido", "outage", 0, "vieja"), "respuesta de ayer")
+    time.sleep(0.02)
+
+    try:
+        llm.invoke("nueva")
+        assert False, "el proveedor está caído"
+    except TimeoutError:
+        pass
+    assert breaker.state == BREAKER_OPEN
+
+    calls = primary.calls
+    assert llm.invoke("vieja").content == "respuesta de ayer"
+    assert llm.invoke("nueva").content.startswith("Respuesta simulada")
+    assert ''.join(chunk.content for chunk in llm.stream("nueva")).startswith("Respuesta simulada")
+    assert asyncio.run(llm.ainvoke("vieja")).content == "respuesta de ayer"
+
+    other_breaker.failure(TimeoutError("timeout"))
+    start = time.perf_counter()
+    try:
+        llm.invoke("nueva")
+        assert False, "sin respaldos disponibles"
+    except CircuitOpenError as e:
+        assert e.provider == "caido" and e.retry_in > 50
+    assert time.perf_counter() - start < 0.01
+    assert primary.calls == calls
+    assert llm.stats()['fallbacks'] == {'cache': 2, 'provider': 2, 'mock': 1}
+
+
+def test_other_sources_never_cached_as_primary():
+    cache = LLMResponseCache()
+    breaker = CircuitBreaker("caido", failure_threshold=1, reset_timeout=60, probe=False)
+    breaker.failure(TimeoutError("timeout"))
+    other = FakeLLM(latency=0, tokens_per_second=None)
+    llm = CachedLLM(BreakerLLM(OutageLLM(), breaker, "caido", stale_cache=cache, fallback=other),
+                    cache, "caido")
+    assert llm.invoke("nueva").source == 'fallback'
+    assert ''.join(chunk.content for chunk in llm.stream("nueva")).startswith("Respuesta simulada")
+    assert cache.get(make_key("caido", "outage", 0, "nueva")) is None
+
+    # Tampoco la respuesta del proveedor de hedging
+    primary = OutageLLM()
+    hedged = CachedLLM(HedgedLLM(primary, other, "caido", "otro", histograms={}), cache, "caido")
+    assert hedged.invoke("nueva").source == 'hedge'
+    assert cache.stats()['stores'] == 0
+
+    primary.down = False
+    assert hedged.invoke("nueva").content == "ok: nueva"
+    assert cache.get(make_key("caido", "outage", 0, "nueva")) == "ok: nueva"
+
+
+def test_engines_answer_instantly_during_outage():
+    outage = OutageLLM(delay=0.2)
+    registry = get_llm_registry()
+    registry.register("fake", outage)
+    breaker = get_circuit_breaker("fake", {'failure_threshold': 2, 'reset_timeout': 60, 'probe': False})
+    breaker.reset()
+    try:
+        engines = ReasoningEngines(use_llm=True, llm_provider="fake", llm_cache=False,
+                                   similarity_cache=False, coalesce=False)
+        for _ in range(2):
+            assert "Error al llamar LLM" in engines.passive_reasoning("Ayúdame con SOC 2")['plan']
+
+        start = time.perf_counter()
+        result = engines.passive_reasoning("Ayúdame con SOC 2")
+        assert time.perf_counter() - start < 0.05
+        assert "circuito abierto" in result['plan'] and outage.calls == 2
+        stats = engines.breaker_stats()['fake']
+        assert stats['state'] == BREAKER_OPEN and stats['fallbacks']['mock'] == 1
+
+        # Con otro proveedor registrado, responde ese
+        registry.register("openai", FakeLLM(latency=0, tokens_per_second=None))
+        get_circuit_breaker("openai").reset()
+        engines = ReasoningEngines(use_llm=True, llm_provider="fake", llm_cache=False,
+                                   similarity_cache=False, fallback_provider="openai")
+        assert engines.passive_reasoning("Ayúdame con SOC 2")['plan'].startswith("Respuesta simulada")
+        assert set(engines.breaker_stats()) == {"fake", "openai"}
+        assert engines.breaker_stats()['fake']['fallbacks']['provider'] == 1
+    finally:
+        get_circuit_breaker("fake", DEFAULT_BREAKER).reset()
+        registry.clear()
+
+
+if __name__ == "__main__":
+    test_state_machine_without_probe()
+    test_background_probe_closes_after_recovery()
+    test_fallbacks_cache_then_provider_then_mock()
+    test_other_sources_never_cached_as_primary()
+    test_engines_answer_instantly_during_outage()
+    print("✅ Tests del circuit breaker completados!")
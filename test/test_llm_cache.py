@@ -0,0 +1,160 @@
+"""
+Tests del caché persistente de respuestas del LLM
+"""
+import sys
+import os
+import asyncio
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core import llm_cache
+from agent_core.llm_cache import CachedLLM, LLMResponseCache, make_key
+from agent_core.llm_wrappers import LLMResponse
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class CountingLLM:
+    model_name = 'gpt-4'
+
+    def __init__(self, temperature=0):
+        self.temperature = temperature
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return Reply(f"respuesta {self.calls}: {prompt}")
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+def _store(args):
+    path, worker = args
+    cache = LLMResponseCache(path)
+    for i in range(20):
+        cache.put(f"{worker}-{i}", "x" * 100)
+    cache.close()
+    return worker
+
+
+def test_memory_and_disk_tiers():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache.sqlite')
+        llm = CountingLLM()
+        cached = CachedLLM(llm, LLMResponseCache(path), provider='openai')
+
+        first = cached.invoke("Ayúdame con SOC 2").content
+        assert cached.invoke("Ayúdame con SOC 2").content == first
+        assert asyncio.run(cached.ainvoke("Ayúdame con SOC 2")).content == first
+        assert llm.calls == 1
+        assert cached.model_name == 'gpt-4'
+
+        # Otro proceso (otra conexión) encuentra la respuesta en disco
+        other = CachedLLM(CountingLLM(), LLMResponseCache(path), provider='openai')
+        assert other.invoke("Ayúdame con SOC 2").content == first
+        stats = other.cache.stats()
+        assert stats['disk_hits'] == 1 and stats['bytes_served'] > 0
+
+        # El proveedor es parte de la clave
+        claude = CachedLLM(CountingLLM(), LLMResponseCache(path), provider='claude')
+        claude.invoke("Ayúdame con SOC 2")
+        assert claude.llm.calls == 1
+
+
+def test_ttl_size_eviction_and_temperature():
+    cache = LLMResponseCache(ttl=0.05)
+    cache.put('a', 'hola')
+    assert cache.get('a') == 'hola'
+    time.sleep(0.06)
+    assert cache.get('a') is None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMResponseCache(os.path.join(tmp, 'cache.sqlite'), memory_size=1, max_bytes=1000)
+        cache.EVICT_EVERY = 1
+        for i in range(30):
+            cache.put(str(i), 'x' * 100)
+        stats = cache.stats()
+        assert stats['disk_bytes'] <= 1000
+        assert stats['evictions'] >= 20
+        assert cache.get('29') is not None and cache.get('0') is None
+        cache.close()
+
+    llm = CountingLLM(temperature=0.7)
+    cached = CachedLLM(llm, LLMResponseCache())
+    cached.invoke("hola")
+    cached.invoke("hola")
+    assert llm.calls == 2
+    assert make_key('openai', 'gpt-4', 0, 'hola') != make_key('openai', 'gpt-4', 0.7, 'hola')
+
+
+def test_shared_between_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache.sqlite')
+        LLMResponseCache(path).close()
+        with ProcessPoolExecutor(max_workers=3) as pool:
+            list(pool.map(_store, [(path, worker) for worker in range(3)]))
+
+        cache = LLMResponseCache(path)
+        assert cache.stats()['disk_entries'] == 60
+        assert cache.get('2-19') == 'x' * 100
+        cache.close()
+
+
+def test_default_cache_stays_in_memory():
+    saved, path = llm_cache._default_cache, os.environ.pop('MARTIN_LLM_CACHE', None)
+    llm_cache._default_cache = None
+    try:
+        assert llm_cache.get_default_cache().path is None
+        llm_cache._default_cache = None
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ['MARTIN_LLM_CACHE'] = os.path.join(tmp, 'cache.sqlite')
+            cache = llm_cache.get_default_cache()
+            assert cache.path == os.environ['MARTIN_LLM_CACHE']
+            cache.close()
+    finally:
+        llm_cache._default_cache = saved
+        os.environ.pop('MARTIN_LLM_CACHE', None)
+        if path is not None:
+            os.environ['MARTIN_LLM_CACHE'] = path
+
+
+def test_degraded_answers_are_not_stored():
+    class OtherSourceLLM(CountingLLM):
+        def __init__(self, source):
+            super().__init__()
+            self.source = source
+
+        def invoke(self, prompt):
+            self.calls += 1
+            return LLMResponse(f"respuesta {self.calls}", source=self.source)
+
+        def stream(self, prompt):
+            yield LLMResponse("respuesta ", source=self.source)
+            yield LLMResponse("parcial", source=self.source)
+
+    for source in ('fallback', 'hedge', 'stale_cache'):
+        cache = LLMResponseCache()
+        cached = CachedLLM(OtherSourceLLM(source), cache, provider='openai')
+        cached.invoke("Ayúdame con SOC 2")
+        asyncio.run(cached.ainvoke("Ayúdame con SOC 2"))
+        assert ''.join(chunk.content for chunk in cached.stream("Ayúdame con SOC 2")) == "respuesta parcial"
+        assert cached.llm.calls == 2 and cache.stats()['stores'] == 0
+
+    cache = LLMResponseCache()
+    CachedLLM(OtherSourceLLM('coalesced'), cache, provider='openai').invoke("Ayúdame con SOC 2")
+    assert cache.stats()['stores'] == 1
+
+
+if __name__ == "__main__":
+    test_memory_and_disk_tiers()
+    test_ttl_size_eviction_and_temperature()
+    test_shared_between_processes()
+    test_default_cache_stays_in_memory()
+    test_degraded_answers_are_not_stored()
+    print("✅ Tests del caché LLM completados!")
@@ -0,0 +1,119 @@
+"""
+Tests de grabación y reproducción de llamadas al LLM (cassettes)
+"""
+import sys
+import os
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.fake_llm import FakeLLM
+from agent_core.llm_cassette import Cassette, CassetteMiss, ReplayLLM, zstandard
+from agent_core.llm_registry import get_llm_registry
+from agent_core.martin_agent import MARTINAgent
+
+TRAFFIC = [
+    ("Ayúdame con SOC 2", {}),
+    ("Explícame qué es compliance", {}),
+    ("Genera un reporte de accesos del último mes", {'environment': 'development'}),
+    ("Elimina todos los logs de producción", {'environment': 'production'}),
+    ("Ayúdame con SOC 2", {}),
+]
+
+
+def test_cassette_roundtrip():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'llm.cassette'
+        cassette = Cassette(path, flush_every=2)
+        cassette.record("hola", "respuesta 1", "openai", latency=0.5, first_token=0.1)
+        cassette.record("hola", "respuesta 2", "openai")
+        cassette.record("chau", "adiós")
+        assert cassette.stats()['pending'] == 1
+        cassette.flush()
+
+        loaded = Cassette(path)
+        assert len(loaded) == 3 and loaded.provider == "openai"
+        entry = loaded.next("hola")
+        assert (entry['c'], entry['p'], entry['t'], entry['f']) == ("respuesta 1", "openai", 0.5, 0.1)
+        assert [loaded.next("hola")['c'] for _ in range(2)] == ["respuesta 2", "respuesta 2"]
+        try:
+            loaded.next("otro")
+            assert False, "debería faltar en el cassette"
+        except CassetteMiss:
+            pass
+        assert loaded.stats()['misses'] == 1
+        loaded.rewind()
+        assert loaded.next("hola")['c'] == "respuesta 1"
+
+        # Comprimido y detectado al leer
+        assert path.read_bytes()[:2] == b'\x1f\x8b' or zstandard is not None
+        if zstandard is None:
+            try:
+                Cassette(Path(directory) / 'otro.cassette', compression='zstd')
+                assert False, "zstd no está instalado"
+            except ImportError:
+                pass
+
+
+def test_timed_replay_follows_recorded_latency():
+    with tempfile.TemporaryDirectory() as directory:
+        cassette = Cassette(Path(directory) / 'llm.cassette')
+        cassette.record("p", "uno dos tres", latency=0.12, first_token=0.06)
+        instant, timed = ReplayLLM(cassette), ReplayLLM(cassette, timed=True)
+
+        start = time.perf_counter()
+        assert instant.invoke("p").content == "uno dos tres"
+        assert time.perf_counter() - start < 0.03
+
+        start = time.perf_counter()
+        chunks = [chunk.content for chunk in timed.stream("p")]
+        assert ''.join(chunks) == "uno dos tres" and len(chunks) == 3
+        assert 0.11 <= time.perf_counter() - start < 0.3
+
+        start = time.perf_counter()
+        assert asyncio.run(timed.ainvoke("p")).content == "uno dos tres"
+        assert 0.11 <= time.perf_counter() - start < 0.3
+
+
+def test_replayed_traffic_is_deterministic_and_fast():
+    registry = get_llm_registry()
+    registry.register("fake", FakeLLM(latency=0.05, latency_distribution='constant',
+                                      tokens_per_second=1000, seed=3))
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'dia.cassette'
+            recorder = MARTINAgent(use_llm=True, llm_provider="fake", verbose=False,
+                                   cassette=Cassette(path), cassette_mode="record")
+            start = time.perf_counter()
+            original = [recorder.process(task, dict(context))['message'] for task, context in TRAFFIC]
+            recorded = time.perf_counter() - start
+            recorder.reasoning.cassette.flush()
+            export = recorder.export_conversation('json', str(Path(directory) / 'sesion.json'))
+            assert recorder.get_session_summary()['cassette']['recorded'] >= len(TRAFFIC)
+
+            # Sin el proveedor: todo sale del cassette
+            registry.clear()
+            for _ in range(2):
+                replayer = MARTINAgent(use_llm=True, verbose=False, cassette=Cassette(path))
+                start = time.perf_counter()
+                with open(export, encoding='utf-8') as file:
+                    conversation = json.load(file)['conversation']
+                replayed = [replayer.process(item['input'], item['context'])['message']
+                            for item in conversation]
+                assert replayed == original
+                assert time.perf_counter() - start < recorded / 2
+                stats = replayer.reasoning.cassette_stats()
+                assert stats['misses'] == 0 and stats['hits'] == stats['loaded']
+            assert replayer.llm_provider == "fake"
+    finally:
+        registry.clear()
+
+
+if __name__ == "__main__":
+    test_cassette_roundtrip()
+    test_timed_replay_follows_recorded_latency()
+    test_replayed_traffic_is_deterministic_and_fast()
+    print("✅ Tests de cassettes completados!")
@@ -0,0 +1,156 @@
+"""
+Tests de las peticiones hedged entre proveedores (con proveedores falsos)
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.llm_hedging import HedgedLLM, LatencyHistogram, get_hedge_pool
+from agent_core.llm_registry import get_llm_registry
+from agent_core.reasoning_engines import ReasoningEngines
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class SlowLLM:
+    """Proveedor local con latencias inyectadas (una por llamada, se repite la última)"""
+
+    temperature = 0
+
+    def __init__(self, name, delays, fail=False):
+        self.model_name = name
+        self.delays = list(delays)
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    def _delay(self):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        return delay
+
+    def invoke(self, prompt):
+        time.sleep(self._delay())
+        if self.fail:
+            raise ConnectionError(f"{self.model_name} caído")
+        return Reply(self.model_name)
+
+    async def ainvoke(self, prompt):
+        try:
+            await asyncio.sleep(self._delay())
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise ConnectionError(f"{self.model_name} caído")
+        return Reply(self.model_name)
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(95) is None
+    for _ in range(95):
+        histogram.record(0.01)
+    for _ in range(5):
+        histogram.record(2.0)
+    assert 0.01 <= histogram.percentile(50) < 0.012
+    assert histogram.percentile(95) < 0.012
+    assert histogram.percentile(99) >= 2.0
+
+
+def test_deadline_follows_primary_latency():
+    primary = SlowLLM("openai", [0.01] * 20 + [0.5])
+    secondary = SlowLLM("claude", [0.02])
+    hedged = HedgedLLM(primary, secondary, "openai", "claude", min_samples=20,
+                       default_deadline=1.0, histograms={})
+
+    for _ in range(20):
+        assert hedged.invoke("p").content == "openai"
+    assert secondary.calls == 0
+    assert hedged.deadline() < 0.05
+
+    # La cola lenta del primario se resuelve con el secundario
+    start = time.perf_counter()
+    assert hedged.invoke("p").content == "claude"
+    assert time.perf_counter() - start < 0.2
+    assert hedged.stats()['hedged'] == 1 and hedged.stats()['secondary_wins'] == 1
+
+
+def test_async_cancels_loser_and_fails_over():
+    primary = SlowLLM("openai", [0.5])
+    secondary = SlowLLM("claude", [0.01])
+    hedged = HedgedLLM(primary, secondary, "openai", "claude", default_deadline=0.05, histograms={})
+
+    start = time.perf_counter()
+    assert asyncio.run(hedged.ainvoke("p")).content == "claude"
+    assert time.perf_counter() - start < 0.3
+    assert primary.cancelled == 1
+
+    # Un primario que falla pasa al secundario sin esperar el plazo
+    broken = HedgedLLM(SlowLLM("openai", [0.0], fail=True), SlowLLM("claude", [0.0]),
+                       "openai", "claude", default_deadline=10.0, histograms={})
+    assert broken.invoke("p").content == "claude"
+    assert asyncio.run(broken.ainvoke("p")).content == "claude"
+    assert broken.stats()['failovers'] == 2
+
+
+def test_queue_time_does_not_trigger_hedges():
+    # Pool ocupado: el primario espera un hilo más que el plazo, pero responde rápido
+    pool = ThreadPoolExecutor(max_workers=2)
+    try:
+        busy = [pool.submit(time.sleep, 0.2) for _ in range(2)]
+        primary = SlowLLM("openai", [0.01])
+        secondary = SlowLLM("claude", [0.0])
+        hedged = HedgedLLM(primary, secondary, "openai", "claude", default_deadline=0.05,
+                           histograms={}, pool=pool)
+        assert hedged.invoke("p").content == "openai"
+        assert secondary.calls == 0 and hedged.stats()['hedged'] == 0
+        assert all(future.done() for future in busy)
+    finally:
+        pool.shutdown()
+
+    # Sin pool propio todos comparten uno, y los contadores no pierden llamadas
+    hedged = HedgedLLM(SlowLLM("openai", [0.0]), SlowLLM("claude", [0.0]), "openai", "claude",
+                       histograms={})
+    assert hedged._pool is None and get_hedge_pool() is get_hedge_pool()
+
+    def worker():
+        for _ in range(50):
+            hedged.invoke("p")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert hedged.stats()['calls'] == 400
+
+
+def test_engines_wrap_registry_clients():
+    registry = get_llm_registry()
+    registry.register("openai", SlowLLM("openai", [0.0]))
+    registry.register("claude", SlowLLM("claude", [0.0]))
+    try:
+        engines = ReasoningEngines(use_llm=True, llm_provider="openai", llm_cache=False,
+                                   similarity_cache=False, hedge_provider="claude")
+        assert engines._layer(HedgedLLM) is not None
+        assert engines.passive_reasoning("Ayúdame con SOC 2")['plan'] == "openai"
+        assert engines.hedging_stats()['calls'] == 1
+    finally:
+        registry.clear()
+
+
+if __name__ == "__main__":
+    test_histogram_percentiles()
+    test_deadline_follows_primary_latency()
+    test_async_cancels_loser_and_fails_over()
+    test_queue_time_does_not_trigger_hedges()
+    test_engines_wrap_registry_clients()
+    print("✅ Tests de peticiones hedged completados!")
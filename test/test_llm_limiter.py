@@ -0,0 +1,224 @@
+"""
+Tests del control de admisión de llamadas al LLM (con un proveedor falso)
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.llm_limiter import (AdmissionController, AdmissionTimeout, DEFAULT_LIMITS,
+                                    RateLimitedLLM, TokenBucket, get_admission_controller)
+from agent_core.llm_registry import get_llm_registry
+from agent_core.reasoning_engines import ReasoningEngines
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class QuotaLLM:
+    """Proveedor que responde 429 si recibe más de `quota` llamadas simultáneas"""
+
+    temperature = 0
+    model_name = "quota"
+
+    def __init__(self, quota, delay=0.02):
+        self.quota = quota
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def _enter(self):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            if self.active > self.quota:
+                self.active -= 1
+                raise RuntimeError("429 Too Many Requests")
+
+    def _leave(self):
+        with self.lock:
+            self.active -= 1
+
+    def invoke(self, prompt):
+        self._enter()
+        time.sleep(self.delay)
+        self._leave()
+        return Reply("ok")
+
+    async def ainvoke(self, prompt):
+        self._enter()
+        await asyncio.sleep(self.delay)
+        self._leave()
+        return Reply("ok")
+
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.delay(60, now) == 0
+    bucket.consume(60)
+    assert abs(bucket.delay(1, now) - 1.0) < 1e-6
+    assert bucket.delay(1, now + 1.0) == 0
+    # Un costo mayor a la capacidad no bloquea para siempre
+    assert bucket.delay(1000, now + 60) == 0
+
+
+def test_burst_saturates_quota_without_failing():
+    llm = QuotaLLM(quota=3)
+    limited = RateLimitedLLM(llm, AdmissionController("fake", max_in_flight=3))
+    errors = []
+
+    def call():
+        try:
+            limited.invoke("p")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = limited.controller.stats()
+    assert errors == []
+    assert llm.peak == 3
+    assert stats['admitted'] == 20 and stats['in_flight'] == 0
+    assert stats['queue_depth'] == 0 and stats['max_queue_depth'] > 0
+    assert stats['p95_wait'] > 0
+
+
+def test_async_burst_and_fifo_order():
+    llm = QuotaLLM(quota=2)
+    limited = RateLimitedLLM(llm, AdmissionController("fake", max_in_flight=2))
+
+    async def burst():
+        return await asyncio.gather(*(limited.ainvoke("p") for _ in range(10)))
+
+    assert [reply.content for reply in asyncio.run(burst())] == ["ok"] * 10
+    assert llm.peak == 2
+
+    # Con un solo lugar, los hilos entran en el orden en que llegaron
+    controller = AdmissionController("fake", max_in_flight=1)
+    controller.acquire()
+    order = []
+
+    def wait(index):
+        controller.acquire()
+        order.append(index)
+        controller.release()
+
+    threads = []
+    for index in range(5):
+        threads.append(threading.Thread(target=wait, args=(index,)))
+        threads[-1].start()
+        time.sleep(0.01)
+    controller.release()
+    for thread in threads:
+        thread.join()
+    assert order == list(range(5))
+
+
+def test_wait_is_bounded():
+    controller = AdmissionController("fake", max_in_flight=1, max_wait=0.05)
+    controller.acquire()
+    start = time.perf_counter()
+    try:
+        controller.acquire()
+        assert False, "debería agotar la espera"
+    except AdmissionTimeout:
+        pass
+    assert time.perf_counter() - start < 0.5
+
+    async def timeout():
+        try:
+            await controller.aacquire()
+        except AdmissionTimeout:
+            return True
+
+    assert asyncio.run(timeout())
+    stats = controller.stats()
+    assert stats['timeouts'] == 2 and stats['queue_depth'] == 0 and stats['in_flight'] == 1
+
+
+def test_rate_limit_error_throttles_admission():
+    controller = AdmissionController("fake", max_in_flight=1)
+    limited = RateLimitedLLM(QuotaLLM(quota=0), controller)
+    try:
+        limited.invoke("p")
+    except RuntimeError:
+        pass
+    assert controller.stats()['throttled'] == 1 and controller.in_flight == 0
+    # La siguiente admisión espera el enfriamiento
+    assert controller.acquire() > 0.5
+
+
+def test_interrupted_call_releases_its_slot():
+    class InterruptedLLM:
+        def invoke(self, prompt):
+            raise KeyboardInterrupt
+
+    controller = AdmissionController("fake", max_in_flight=1, max_wait=0.05)
+    limited = RateLimitedLLM(InterruptedLLM(), controller)
+    for _ in range(2):
+        try:
+            limited.invoke("p")
+            assert False, "debería propagar la interrupción"
+        except KeyboardInterrupt:
+            pass
+    assert controller.in_flight == 0 and controller.stats()['timeouts'] == 0
+
+
+def test_throttle_wakes_queued_waiters():
+    controller = AdmissionController("fake", max_in_flight=1, max_wait=5.0)
+    controller.acquire()
+    waits = []
+    threads = [threading.Thread(target=lambda: waits.append(controller.acquire()) or controller.release())
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.02)
+    # Al liberar durante el enfriamiento, la cola espera el enfriamiento y no max_wait
+    controller.throttle(0.1)
+    controller.release()
+    for thread in threads:
+        thread.join()
+    assert len(waits) == 3 and max(waits) < 1.0
+
+
+def test_engines_use_shared_controller():
+    registry = get_llm_registry()
+    registry.register("openai", QuotaLLM(quota=8, delay=0))
+    try:
+        engines = ReasoningEngines(use_llm=True, llm_provider="openai", llm_cache=False,
+                                   similarity_cache=False,
+                                   rate_limits={'openai': {'max_in_flight': 4, 'tpm': 100000}})
+        assert engines._layer(RateLimitedLLM).controller is get_admission_controller("openai")
+        assert engines.passive_reasoning("Ayúdame con SOC 2")['plan'] == "ok"
+        stats = engines.limiter_stats()['openai']
+        assert stats['admitted'] >= 1 and stats['in_flight'] == 0
+
+        unlimited = ReasoningEngines(use_llm=True, llm_provider="openai", llm_cache=False,
+                                     rate_limits=False)
+        assert not isinstance(unlimited.llm.inner, RateLimitedLLM)
+        assert unlimited.limiter_stats() == {}
+    finally:
+        get_admission_controller("openai", DEFAULT_LIMITS)
+        registry.clear()
+
+
+if __name__ == "__main__":
+    test_token_bucket_refills()
+    test_burst_saturates_quota_without_failing()
+    test_async_burst_and_fifo_order()
+    test_wait_is_bounded()
+    test_rate_limit_error_throttles_admission()
+    test_interrupted_call_releases_its_slot()
+    test_throttle_wakes_queued_waiters()
+    test_engines_use_shared_controller()
+    print("✅ Tests del control de admisión completados!")
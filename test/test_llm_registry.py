@@ -0,0 +1,73 @@
+"""
+Tests del registro compartido de clientes LLM
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.llm_cache import LLMResponseCache
+from agent_core.llm_registry import LLMRegistry, get_llm_registry
+from agent_core.martin_agent import MARTINAgent
+from agent_core.reasoning_engines import ReasoningEngines
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class NamedLLM:
+    temperature = 0
+
+    def __init__(self, name):
+        self.model_name = name
+
+    def invoke(self, prompt):
+        return Reply(f"{self.model_name}: {len(prompt)}")
+
+
+def test_unknown_provider_and_missing_key():
+    registry = LLMRegistry()
+    assert registry.get("otro") is None
+
+    saved = os.environ.pop('OPENAI_API_KEY', None)
+    try:
+        assert registry.get("openai") is None
+        assert registry.stats()['created'] == 0
+    finally:
+        if saved is not None:
+            os.environ['OPENAI_API_KEY'] = saved
+
+
+def test_agents_share_clients_and_switch_without_rebuild():
+    registry = get_llm_registry()
+    openai, claude = NamedLLM("gpt-4"), NamedLLM("claude")
+    registry.register("openai", openai)
+    registry.register("claude", claude)
+    try:
+        first = ReasoningEngines(use_llm=True, llm_provider="openai", llm_cache=False,
+                                 rate_limits=False, coalesce=False, circuit_breaker=False)
+        second = ReasoningEngines(use_llm=True, llm_provider="openai", llm_cache=LLMResponseCache())
+        assert first.llm is openai
+        assert second.llm.inner is openai
+
+        agent = MARTINAgent(use_llm=True, llm_provider="openai", verbose=False, llm_cache=False)
+        agent.process("Ayúdame con SOC 2", {})
+        engines, session = agent.reasoning, agent.session_id
+
+        assert agent.switch_llm("claude")
+        assert agent.reasoning is engines and agent.session_id == session
+        assert agent.reasoning.llm.inner is claude and agent.llm_provider == "claude"
+        assert len(agent.get_conversation_history()) == 1
+
+        # Un proveedor no disponible deja el anterior activo
+        assert not agent.switch_llm("otro")
+        assert agent.llm_provider == "claude"
+    finally:
+        registry.clear()
+
+
+if __name__ == "__main__":
+    test_unknown_provider_and_missing_key()
+    test_agents_share_clients_and_switch_without_rebuild()
+    print("✅ Tests del registro de clientes LLM completados!")
@@ -0,0 +1,145 @@
+"""
+Tests de la agrupación de llamadas idénticas en vuelo (single-flight)
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.fake_llm import FakeLLM, FakeLLMError
+from agent_core.llm_registry import get_llm_registry
+from agent_core.llm_singleflight import CoalescedLLM, SingleFlight
+from agent_core.reasoning_engines import ReasoningEngines
+
+PROMPT = "Genera política de contraseñas según ISO 27001"
+
+
+def in_threads(target, count):
+    results = [None] * count
+
+    def run(index):
+        try:
+            results[index] = target()
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow_fake(**kwargs):
+    return FakeLLM(latency=0.1, latency_distribution='constant', tokens_per_second=None, **kwargs)
+
+
+def test_threads_share_one_call_and_its_error():
+    fake = slow_fake()
+    llm = CoalescedLLM(fake, SingleFlight(), "fake")
+    replies = in_threads(lambda: llm.invoke(PROMPT).content, 10)
+    assert len(set(replies)) == 1 and replies[0].startswith("Respuesta simulada")
+    assert fake.stats()['calls'] == 1
+    assert llm.group.stats() == {'calls': 10, 'provider_calls': 1, 'coalesced': 9, 'in_flight': 0}
+
+    broken = CoalescedLLM(slow_fake(error_rate=1.0), SingleFlight(), "fake")
+    errors = in_threads(lambda: broken.invoke(PROMPT), 5)
+    assert all(isinstance(error, FakeLLMError) for error in errors)
+    assert broken.inner.stats()['calls'] == 1
+
+    # Terminada la llamada, la siguiente vuelve al proveedor
+    llm.invoke(PROMPT)
+    assert fake.stats()['calls'] == 2
+
+
+def test_async_and_mixed_callers():
+    fake = slow_fake()
+    llm = CoalescedLLM(fake, SingleFlight(), "fake")
+
+    async def burst():
+        return await asyncio.gather(*(llm.ainvoke(PROMPT) for _ in range(10)))
+
+    assert len({reply.content for reply in asyncio.run(burst())}) == 1
+    assert fake.stats()['calls'] == 1
+
+    # Un hilo y un event loop esperando la misma llamada
+    thread_reply = []
+    thread = threading.Thread(target=lambda: thread_reply.append(llm.invoke(PROMPT)))
+    thread.start()
+    time.sleep(0.02)
+    async_reply = asyncio.run(llm.ainvoke(PROMPT))
+    thread.join()
+    assert async_reply.content == thread_reply[0].content
+    assert fake.stats()['calls'] == 2 and llm.group.stats()['coalesced'] == 10
+
+
+def test_cancelled_leader_still_serves_followers():
+    fake = slow_fake()
+    llm = CoalescedLLM(fake, SingleFlight(), "fake")
+
+    async def scenario():
+        leader = asyncio.ensure_future(llm.ainvoke(PROMPT))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(llm.ainvoke(PROMPT))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()).content.startswith("Respuesta simulada")
+    assert fake.stats()['calls'] == 1
+
+
+def test_streams_coalesce_and_abandoned_leader_falls_back():
+    fake = FakeLLM(latency=0.05, latency_distribution='constant', tokens_per_second=500,
+                   response_tokens=20)
+    llm = CoalescedLLM(fake, SingleFlight(), "fake")
+    streams = in_threads(lambda: [chunk.content for chunk in llm.stream(PROMPT)], 4)
+    full = max(streams, key=len)
+    assert len(full) == 22 and all(''.join(chunks) == ''.join(full) for chunks in streams)
+    assert sorted(len(chunks) for chunks in streams) == [1, 1, 1, 22]
+    assert fake.stats()['calls'] == 1
+
+    # El líder corta su stream: quien esperaba hace su propia llamada
+    def leader():
+        for chunk in llm.stream(PROMPT):
+            time.sleep(0.05)
+            break
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    time.sleep(0.02)
+    assert llm.invoke(PROMPT).content == ''.join(full)
+    thread.join()
+    assert fake.stats()['calls'] == 3
+
+
+def test_engines_coalesce_across_sessions():
+    fake = slow_fake()
+    registry = get_llm_registry()
+    registry.register("fake", fake)
+    try:
+        engines = [ReasoningEngines(use_llm=True, llm_provider="fake", llm_cache=False,
+                                    similarity_cache=False) for _ in range(5)]
+        before = engines[0].coalescing_stats()['coalesced']
+        pending = list(engines)
+        plans = in_threads(lambda: pending.pop().passive_reasoning(PROMPT)['plan'], 5)
+        assert len(set(plans)) == 1
+        assert fake.stats()['calls'] == 1
+        assert engines[0].coalescing_stats()['coalesced'] - before == 4
+
+        alone = ReasoningEngines(use_llm=True, llm_provider="fake", llm_cache=False, coalesce=False)
+        assert alone.coalescing_stats() == {}
+    finally:
+        registry.clear()
+
+
+if __name__ == "__main__":
+    test_threads_share_one_call_and_its_error()
+    test_async_and_mixed_callers()
+    test_cancelled_leader_still_serves_followers()
+    test_streams_coalesce_and_abandoned_leader_falls_back()
+    test_engines_coalesce_across_sessions()
+    print("✅ Tests de single-flight completados!")
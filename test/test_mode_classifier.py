@@ -0,0 +1,120 @@
+"""
+Tests del clasificador de modo aprendido y su mezcla con el ModeSelector
+"""
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from agent_core.mode_classifier import ModeClassifier, load_training_data
+from agent_core.mode_selector import ModeSelector
+from agent_core.selector_config import load_profile
+
+TRAINING = [
+    ("Elimina todos los usuarios de la base de datos", "SAFE"),
+    ("Borra la tabla de pagos", "SAFE"),
+    ("Drop the billing database", "SAFE"),
+    ("Deshabilita MFA para admin", "SAFE"),
+    ("Genera una política de contraseñas ISO 27001", "DIRECT"),
+    ("Crea política de respuesta a incidentes", "DIRECT"),
+    ("Write a backup policy for NIST", "DIRECT"),
+    ("Escribe reporte de auditoría SOC 2", "DIRECT"),
+    ("Ayúdame con compliance", "PASSIVE"),
+    ("¿Cómo preparo mi startup para GDPR?", "PASSIVE"),
+    ("No sé por dónde empezar con seguridad", "PASSIVE"),
+    ("Necesito orientación sobre ISO", "PASSIVE"),
+]
+
+
+def train_classifier():
+    tasks, labels = zip(*TRAINING)
+    return ModeClassifier.train(list(tasks) * 10, list(labels) * 10, n_features=2 ** 12, epochs=20)
+
+
+def test_learns_training_set_and_batch_matches_scalar():
+    classifier = train_classifier()
+    tasks = [task for task, _ in TRAINING]
+
+    assert classifier.predict_batch(tasks) == [label for _, label in TRAINING]
+
+    batch = classifier.predict_proba_batch(tasks)
+    for i, task in enumerate(tasks):
+        assert (classifier.predict_proba(task) == batch[i]).all()
+    assert np.allclose(batch.sum(axis=1), 1.0)
+
+
+def test_saved_artifact_is_memory_mapped():
+    classifier = train_classifier()
+    with tempfile.TemporaryDirectory() as tmp:
+        classifier.save(tmp)
+        loaded = ModeClassifier.load(tmp)
+
+        assert not loaded.weights.flags.owndata
+        assert not loaded.weights.flags.writeable  # mapeado en solo lectura
+        task = "Elimina la base de datos de clientes"
+        assert np.allclose(loaded.predict_proba(task), classifier.predict_proba(task))
+        assert loaded.metadata['training_samples'] == len(TRAINING) * 10
+        del loaded
+
+
+def test_blended_selector_matches_batch_and_keeps_production_rule():
+    selector = ModeSelector()
+    selector.set_classifier(train_classifier(), weight=1.0)
+    tasks = [task for task, _ in TRAINING] + ["Borra los usuarios inactivos"]
+
+    assert selector.select_modes(tasks, log=False) == [selector.select_mode(task) for task in tasks]
+    assert selector.select_mode("Borra los usuarios inactivos") == 'SAFE'
+    assert selector.select_mode("Genera política de backups", {'environment': 'production'}) == 'SAFE'
+
+    selector.set_classifier(None)
+    assert selector.profile.load_classifier() is None
+
+
+def test_training_data_from_decision_log_and_conversation():
+    with tempfile.TemporaryDirectory() as tmp:
+        spill = os.path.join(tmp, 'decisions.jsonl')
+        selector = ModeSelector(log_capacity=1, log_spill_path=spill)
+        selector.select_mode("Delete all users from database")
+        selector.select_mode("Ayúdame con SOC 2")
+        selector.decision_log.close()
+
+        session = os.path.join(tmp, 'session.json')
+        with open(session, 'w', encoding='utf-8') as f:
+            json.dump({'conversation': [
+                {'input': 'Genera política de contraseñas', 'mode_selected': 'DIRECT'},
+                {'input': 'sí', 'mode_selected': 'CONFIRMATION'},
+            ]}, f)
+
+        tasks, labels = load_training_data([spill, session])
+
+    assert tasks == ["Delete all users from database", "Genera política de contraseñas"]
+    assert labels == ['SAFE', 'DIRECT']
+
+
+def test_config_opens_classifier_lazily():
+    with tempfile.TemporaryDirectory() as tmp:
+        train_classifier().save(os.path.join(tmp, 'model'))
+        path = os.path.join(tmp, 'config.yaml')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("mode_selector:\n  classifier:\n    path: model\n    weight: 0.3\n")
+
+        profile = load_profile(path)
+        assert isinstance(profile.classifier, str)
+        assert profile.classifier_weight == 0.3
+
+        selector = ModeSelector(profile=profile)
+        selector.select_mode("Borra la tabla de pagos")
+        assert isinstance(profile.classifier, ModeClassifier)
+        del profile, selector
+
+
+if __name__ == "__main__":
+    test_learns_training_set_and_batch_matches_scalar()
+    test_saved_artifact_is_memory_mapped()
+    test_blended_selector_matches_batch_and_keeps_production_rule()
+    test_training_data_from_decision_log_and_conversation()
+    test_config_opens_classifier_lazily()
+    print("✅ Tests del clasificador de modo completados!")
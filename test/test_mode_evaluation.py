@@ -0,0 +1,67 @@
+"""
+Tests del harness de evaluación y barrido de umbrales del ModeSelector
+"""
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.mode_evaluation import build_grid, load_corpus, sweep
+from agent_core.mode_selector import ModeSelector
+
+
+CORPUS = [
+    {'task': 'Ayúdame con SOC 2', 'expected': 'PASSIVE'},
+    {'task': '¿Cómo configuro mi firewall para compliance?', 'expected': 'PASSIVE'},
+    {'task': 'Genera una política de contraseñas según ISO 27001', 'expected': 'DIRECT'},
+    {'task': 'Genera un reporte de gaps de compliance SOC 2 para TechStartup Inc', 'expected': 'DIRECT'},
+    {'task': 'Delete all users from the production database', 'expected': 'SAFE'},
+    {'input': 'Update configuration file', 'context': {'environment': 'production'}, 'label': 'SAFE'},
+]
+
+
+def write_corpus(tmp):
+    path = os.path.join(tmp, 'corpus.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in CORPUS:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    return path
+
+
+def test_default_config_matches_selector():
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks, contexts, labels = load_corpus(write_corpus(tmp))
+
+    report = sweep(tasks, contexts, labels, build_grid())
+    result = report['results'][0]
+
+    selector = ModeSelector()
+    expected_correct = sum(
+        selector.select_mode(task, context) == label
+        for task, context, label in zip(tasks, contexts, labels)
+    )
+    assert result['accuracy'] == expected_correct / len(tasks)
+    assert sum(map(sum, result['confusion'])) == len(tasks)
+
+
+def test_grid_sweep_in_process_pool():
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks, contexts, labels = load_corpus(write_corpus(tmp))
+
+    grid = build_grid([0.4, 0.5, 0.9], [0.6, 1.5], {'danger': [0.5, 0.1]})
+    assert len(grid) == 12
+
+    parallel = sweep(tasks, contexts, labels, grid, workers=2)
+    serial = sweep(tasks, contexts, labels, grid, workers=1)
+
+    assert [r['accuracy'] for r in parallel['results']] == [r['accuracy'] for r in serial['results']]
+    # Un umbral de claridad altísimo manda todo lo no-SAFE a PASSIVE
+    worst = parallel['results'][-1]
+    assert worst['clarity_threshold'] == 1.5
+
+
+if __name__ == "__main__":
+    test_default_config_matches_selector()
+    test_grid_sweep_in_process_pool()
+    print("✅ Tests del harness de evaluación completados!")
@@ -0,0 +1,89 @@
+"""
+Paridad entre ModeSelector.select_mode y la versión por lotes select_modes
+"""
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.mode_selector import ModeSelector, DecisionRecord
+
+
+TASKS = [
+    'Ayúdame con SOC 2',
+    '¿Cómo preparo mi startup para compliance?',
+    'Necesito ayuda con ISO 27001',
+    'Genera una política de contraseñas según ISO 27001 para empresa de 50 empleados',
+    'Crea política de respuesta a incidentes',
+    'Delete all users from the production database',
+    'Deshabilita MFA para admin',
+    'Update configuration file',
+    'Escanea mi organización de GitHub buscando problemas de compliance',
+    'Compliance',
+    'Elimina todos los repositorios privados de la organización',
+    '',
+    '   ',
+]
+
+CONTEXTS = [
+    {},
+    {'environment': 'production'},
+    {'environment': 'staging', 'has_active_users': True},
+    {'has_active_users': True},
+]
+
+
+def random_tasks(count, seed=11):
+    rng = random.Random(seed)
+    vocabulary = [word for words in ModeSelector.keyword_categories().values() for word in words]
+    filler = ['la', 'de', 'para', 'servidor', 'Empresa', 'GitHub', '?', 'reporte', 'x']
+    tasks = []
+    for _ in range(count):
+        words = rng.choices(vocabulary + filler * 3, k=rng.randint(0, 9))
+        task = ' '.join(words)
+        tasks.append(task.capitalize() if rng.random() < 0.3 else task)
+    return tasks
+
+
+def test_batch_matches_scalar_path():
+    tasks = TASKS + random_tasks(500)
+    rng = random.Random(3)
+    contexts = [rng.choice(CONTEXTS) for _ in tasks]
+
+    scalar = ModeSelector()
+    expected = [scalar.select_mode(task, context) for task, context in zip(tasks, contexts)]
+
+    batch = ModeSelector()
+    modes = batch.select_modes(tasks, contexts)
+
+    assert modes == expected
+    assert len(batch.decision_log) == len(scalar.decision_log)
+    for got, want in zip(batch.decision_log, scalar.decision_log):
+        assert got.to_dict() == want.to_dict()
+
+
+def test_shared_context_and_empty_batch():
+    selector = ModeSelector()
+
+    assert selector.select_modes([]) == []
+    assert selector.select_modes(['Listar usuarios', 'Genera reporte ISO'], {'environment': 'production'}) == ['SAFE', 'SAFE']
+    assert selector.select_modes(['Ayúdame con SOC 2'], log=False) == ['PASSIVE']
+    assert len(selector.decision_log) == 2
+
+
+def test_decision_record_dict_access():
+    selector = ModeSelector()
+    selector.select_mode('Delete all users from database')
+    record = selector.decision_log[-1]
+
+    assert isinstance(record, DecisionRecord)
+    assert record['selected_mode'] == 'SAFE'
+    assert record['reason'].startswith('Riesgo moderado-alto')
+    assert 'Modo seleccionado: SAFE' in selector.explain_last_decision()
+
+
+if __name__ == "__main__":
+    test_batch_matches_scalar_path()
+    test_shared_context_and_empty_batch()
+    test_decision_record_dict_access()
+    print("✅ Tests de select_modes completados!")
@@ -0,0 +1,131 @@
+"""
+Tests del presupuesto de tokens de los prompts
+"""
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.prompt_budget import PromptBudget, PromptTooLarge, TokenCounter
+from agent_core.reasoning_engines import SAFE_MOCK, SAFE_TWO_STEP, ReasoningEngines
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class PromptCapture:
+    def __init__(self, replies=()):
+        self.prompts = []
+        self.replies = list(replies)
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return Reply(self.replies.pop(0) if self.replies else "ok")
+
+
+def engines_with(llm, **kwargs):
+    engines = ReasoningEngines(use_llm=False, **kwargs)
+    engines.use_llm = True
+    engines.llm = llm
+    return engines
+
+
+def test_small_prompts_are_untouched():
+    llm = PromptCapture()
+    engines = engines_with(llm)
+    context = {'environment': 'production'}
+    engines.passive_reasoning("Ayúdame con SOC 2", context)
+    assert llm.prompts[0] == engines._passive_prompt("Ayúdame con SOC 2", context)
+
+    stats = engines.prompt_stats()
+    assert stats['calls'] == {'PASSIVE': 1}
+    assert 0 < stats['tokens']['PASSIVE'] < 3000
+    assert stats['compacted'] == 0
+
+
+def test_oversized_context_and_task_fit_the_budget():
+    llm = PromptCapture()
+    engines = engines_with(llm, prompt_budgets={'PASSIVE': 600, 'DIRECT': 400})
+    counter = engines.prompt_budget.counter
+
+    context = {'environment': 'production', 'logs': "ERROR timeout en db-01\n" * 2000,
+               'inventory': list(range(3000))}
+    engines.passive_reasoning("Revisa estos logs", context)
+    prompt = llm.prompts[-1]
+    assert counter.count(prompt) <= 600 * 1.1
+    assert "'environment': 'production'" in prompt
+    assert "truncado" in prompt
+    assert any(action.startswith("truncado:logs") for action in engines.prompt_stats()['last']['compacted'])
+
+    task = "Explícame este error:\n" + "línea de log repetida\n" * 3000 + "FIN DEL LOG"
+    engines.direct_reasoning(task)
+    prompt = llm.prompts[-1]
+    assert counter.count(prompt) <= 400 * 1.1
+    assert prompt.count("Explícame este error") == 1 and "FIN DEL LOG" in prompt
+    assert "tokens omitidos" in prompt
+    assert engines.prompt_stats()['compacted'] == 2
+
+
+def test_truncates_only_what_the_budget_needs():
+    engines = ReasoningEngines(use_llm=False)
+    budget = PromptBudget({'PASSIVE': 900}, counter=engines.prompt_budget.counter)
+    counter = budget.counter
+    notes = "nota de auditoría " * 60
+    context = {'logs': "ERROR timeout en db-01\n" * 300, 'notes': notes}
+    assert counter.count(notes) > budget.field_tokens
+
+    prompt = budget.build("PASSIVE", engines._passive_prompt, "Revisa estos logs", context)
+    assert budget.stats()['last']['compacted'] == ["truncado:logs"]
+    assert notes in prompt and counter.count(prompt) <= 900 * 1.1
+    # El campo conserva todo lo que cabe, no solo field_tokens
+    logs = prompt.split("'logs': '")[1].split(" …[truncado]")[0]
+    assert counter.count(logs) > budget.field_tokens
+
+
+def test_safe_validation_keeps_the_whole_plan():
+    plan = "1. Respaldar la base de datos\n" + "2. Verificar el respaldo\n" * 40 + "3. FIN DEL PLAN"
+    llm = PromptCapture([plan, "NIVEL DE RIESGO: BAJO\nDECISIÓN: APROBAR"])
+    engines = engines_with(llm, safe_strategy=SAFE_TWO_STEP, prompt_budgets={'SAFE': 700})
+    task = "Migra la base de datos de producción:\n" + "detalle del esquema\n" * 500
+    result = engines.safe_reasoning(task)
+    assert result['safe_strategy'] == SAFE_TWO_STEP
+    assert plan in llm.prompts[1] and "tokens omitidos" in llm.prompts[1]
+
+    # Un plan que no cabe entero no se valida truncado: se rechaza
+    llm = PromptCapture([plan * 20])
+    engines = engines_with(llm, safe_strategy=SAFE_TWO_STEP, prompt_budgets={'SAFE': 700})
+    result = engines.safe_reasoning("Migra la base de datos de producción")
+    assert len(llm.prompts) == 1
+    assert result['status'] == "blocked" and result['safe_strategy'] == SAFE_MOCK
+    assert engines.prompt_stats()['too_large'] == 1
+    try:
+        engines.prompt_budget.build("SAFE", engines._plan_validation_prompt, "tarea",
+                                    {'plan': plan * 20}, keep=("plan",))
+        assert False, "el plan no cabe"
+    except PromptTooLarge as e:
+        assert e.mode == "SAFE" and e.tokens > e.budget == 700
+
+
+def test_counts_are_cached():
+    counter = TokenCounter()
+    budget = PromptBudget(counter=counter)
+    engines = ReasoningEngines(use_llm=False)
+    budget.build("PASSIVE", engines._passive_prompt, "Ayúdame con SOC 2", {'environment': 'dev'})
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        budget.build("PASSIVE", engines._passive_prompt, "Ayúdame con SOC 2", {'environment': 'dev'})
+    per_call = (time.perf_counter() - start) / 1000
+    assert per_call < 0.0005
+    assert budget.stats()['calls']['PASSIVE'] == 1001
+
+
+if __name__ == "__main__":
+    test_small_prompts_are_untouched()
+    test_oversized_context_and_task_fit_the_budget()
+    test_truncates_only_what_the_budget_needs()
+    test_safe_validation_keeps_the_whole_plan()
+    test_counts_are_cached()
+    print("✅ Tests del presupuesto de tokens completados!")
@@ -0,0 +1,104 @@
+"""
+Tests del registro de prompts versionados (configs/prompts.yaml)
+"""
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml
+
+from agent_core.fake_llm import FakeLLM, FakeMessage
+from agent_core.llm_registry import get_llm_registry
+from agent_core.prompt_registry import (DEFAULT_PROMPTS_PATH, PromptCachingLLM, PromptRegistry,
+                                        load_prompts)
+from agent_core.reasoning_engines import SAFE_PLAN_MARKER, SAFE_VALIDATION_MARKER, ReasoningEngines
+
+
+def write_prompts(directory, change):
+    with open(DEFAULT_PROMPTS_PATH, encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    change(data['prompts'])
+    path = Path(directory) / 'prompts.yaml'
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump(data, f, allow_unicode=True)
+    return path
+
+
+def test_invalid_files_are_rejected():
+    broken = {
+        'falta': lambda prompts: prompts.pop('validation'),
+        'campo': lambda prompts: prompts['direct'].update(suffix="Tarea: {tarea}\n"),
+        'prefijo': lambda prompts: prompts['plan'].update(prefix="Plan para {task}: "),
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for name, change in broken.items():
+            try:
+                load_prompts(write_prompts(directory, change))
+                assert False, f"debería rechazar: {name}"
+            except ValueError:
+                pass
+
+
+def test_renders_share_the_prefix():
+    registry = PromptRegistry()
+    first = registry.render('passive', task="Ayúdame con SOC 2", context="No hay contexto adicional")
+    second = registry.render('passive', task="Explícame compliance", context={'environment': 'dev'})
+    prefix = registry.templates['passive'].prefix
+    assert first.startswith(prefix) and second.startswith(prefix)
+    assert "Ayúdame con SOC 2" not in prefix and first.endswith("Contexto: No hay contexto adicional\n")
+
+    safe = registry.render('safe', task="Elimina los logs")
+    assert SAFE_PLAN_MARKER in safe and SAFE_VALIDATION_MARKER in safe
+    assert registry.split(safe) == (registry.templates['safe'].prefix, "Tarea: Elimina los logs\n")
+    assert registry.split("otro prompt") is None
+
+    registry.record(first)
+    registry.record(second)
+    registry.record("otro prompt")
+    stats = registry.stats()
+    assert stats['sent'] == {'passive': 2}
+    assert stats['cacheable_tokens'] == 2 * stats['prefix_tokens']['passive'] > 0
+
+
+def test_engines_use_the_registry():
+    with tempfile.TemporaryDirectory() as directory:
+        def change(prompts):
+            prompts['direct']['prefix'] = "Prefijo de prueba v2.\n"
+            prompts['direct']['version'] = 2
+
+        fake = FakeLLM(latency=0, tokens_per_second=None)
+        registry = get_llm_registry()
+        registry.register("fake", fake)
+        try:
+            engines = ReasoningEngines(use_llm=True, llm_provider="fake", llm_cache=False,
+                                       similarity_cache=False, prompts=write_prompts(directory, change))
+            assert engines._direct_prompt("Genera un reporte") == "Prefijo de prueba v2.\nTarea: Genera un reporte\n"
+            engines.direct_reasoning("Genera un reporte")
+            assert engines.prompt_stats()['prefix']['sent'] == {'direct': 1}
+            assert 'provider_cache' not in engines.prompt_stats()
+        finally:
+            registry.clear()
+
+
+def test_prompt_caching_accounts_provider_usage():
+    registry = PromptRegistry()
+    llm = PromptCachingLLM(FakeLLM(latency=0, tokens_per_second=None), registry)
+    # Sin prefijo conocido el prompt pasa tal cual
+    assert llm._messages("hola") == "hola"
+    llm._account(FakeMessage("ok", {'input_tokens': 1200,
+                                    'input_token_details': {'cache_read': 1024}}))
+    llm._account(FakeMessage("ok", {'input_tokens': 1200,
+                                    'input_token_details': {'cache_creation': 1024}}))
+    llm._account(FakeMessage("ok", None))
+    assert llm.stats() == {'input_tokens': 2400, 'cache_read_tokens': 1024,
+                           'cache_creation_tokens': 1024}
+
+
+if __name__ == "__main__":
+    test_invalid_files_are_rejected()
+    test_renders_share_the_prefix()
+    test_engines_use_the_registry()
+    test_prompt_caching_accounts_provider_usage()
+    print("✅ Tests del registro de prompts completados!")
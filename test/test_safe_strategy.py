@@ -0,0 +1,118 @@
+"""
+Tests de las estrategias del MODO SEGURO (una llamada vs dos pasos)
+"""
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.reasoning_engines import (
+    ReasoningEngines, SAFE_MOCK, SAFE_PLAN_MARKER, SAFE_VALIDATION_MARKER
+)
+
+STRUCTURED = f"""{SAFE_PLAN_MARKER}
+1. Crear backup
+2. Eliminar registros
+
+{SAFE_VALIDATION_MARKER}
+NIVEL DE RIESGO: ALTO
+
+DECISIÓN: RECHAZAR
+"""
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Responde con latencia fija; estructurado o libre según structured"""
+
+    def __init__(self, delay=0.0, structured=True):
+        self.delay = delay
+        self.structured = structured
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if SAFE_VALIDATION_MARKER in prompt and self.structured:
+            return Reply(STRUCTURED)
+        if 'validador' in prompt:
+            return Reply("NIVEL DE RIESGO: BAJO\nDECISIÓN: APROBAR")
+        return Reply("Plan libre")
+
+
+def engines_with(llm, **kwargs):
+    engines = ReasoningEngines(use_llm=False, **kwargs)
+    engines.use_llm = True
+    engines.llm = llm
+    return engines
+
+
+def test_single_call_returns_plan_and_verdict():
+    llm = FakeLLM()
+    result = engines_with(llm).safe_reasoning("Delete all users from database")
+
+    assert llm.calls == 1
+    assert result['safe_strategy'] == 'single'
+    assert result['status'] == 'blocked'
+    assert result['original_plan'].startswith('1. Crear backup')
+
+
+def test_unparseable_single_call_falls_back_to_two_steps():
+    llm = FakeLLM(structured=False)
+    result = engines_with(llm).safe_reasoning("Rota las credenciales")
+
+    assert llm.calls == 3
+    assert result['safe_strategy'] == 'two_step'
+    assert result['status'] == 'approved_and_executed'
+
+    llm = FakeLLM(structured=False)
+    result = engines_with(llm, safe_fallback=False).safe_reasoning("Rota las credenciales")
+    assert llm.calls == 1
+    assert result['safe_strategy'] == SAFE_MOCK
+
+
+class DownLLM:
+    def invoke(self, prompt):
+        raise TimeoutError("Request timed out")
+
+    async def ainvoke(self, prompt):
+        raise TimeoutError("Request timed out")
+
+
+def test_failed_llm_is_reported_as_mock_validation():
+    for strategy in ('single', 'two_step'):
+        engines = engines_with(DownLLM(), safe_strategy=strategy)
+        result = engines.safe_reasoning("Delete all users from database")
+        assert result['safe_strategy'] == SAFE_MOCK and result['status'] == 'blocked'
+        assert asyncio.run(engines.asafe_reasoning("Delete all users from database")) == result
+
+
+def test_single_call_halves_latency():
+    def percentiles(strategy):
+        engines = engines_with(FakeLLM(delay=0.02), safe_strategy=strategy)
+        samples = []
+        for _ in range(10):
+            start = time.perf_counter()
+            engines.safe_reasoning("Delete all users from database")
+            samples.append(time.perf_counter() - start)
+        samples.sort()
+        return samples[len(samples) // 2], samples[-1]
+
+    single_p50, single_max = percentiles('single')
+    two_step_p50, two_step_max = percentiles('two_step')
+
+    assert single_p50 < two_step_p50 * 0.75
+    assert single_max < two_step_max
+
+
+if __name__ == "__main__":
+    test_single_call_returns_plan_and_verdict()
+    test_unparseable_single_call_falls_back_to_two_steps()
+    test_failed_llm_is_reported_as_mock_validation()
+    test_single_call_halves_latency()
+    print("✅ Tests de estrategias del MODO SEGURO completados!")
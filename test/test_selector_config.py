@@ -0,0 +1,127 @@
+"""
+Tests de la configuración del ModeSelector desde YAML y su recarga en caliente
+"""
+import sys
+import os
+import tempfile
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.martin_agent import MARTINAgent
+from agent_core.mode_selector import ModeSelector
+from agent_core.selector_config import ConfigWatcher, DEFAULT_CONFIG_PATH, load_profile
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def test_shipped_config_matches_defaults():
+    profile = load_profile(DEFAULT_CONFIG_PATH)
+    default = ModeSelector.DEFAULT_PROFILE
+
+    assert profile.vocabulary == default.vocabulary
+    assert profile.weights == default.weights
+    assert (profile.risk_threshold, profile.clarity_threshold) == (0.5, 0.6)
+
+
+def test_partial_config_keeps_defaults():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.yaml')
+        write(path, "mode_selector:\n  thresholds:\n    risk: 0.9\n  vocabulary:\n    danger: [purge]\n")
+        profile = load_profile(path)
+
+    assert profile.risk_threshold == 0.9
+    assert profile.clarity_threshold == ModeSelector.CLARITY_THRESHOLD
+    assert profile.vocabulary['danger'] == ('purge',)
+    assert profile.vocabulary['vague'] == tuple(ModeSelector.VAGUE_KEYWORDS)
+
+
+def test_watcher_swaps_profile_and_keeps_old_on_error():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'config.yaml')
+        write(path, "mode_selector: {}\n")
+        selector = ModeSelector(cache_size=8)
+        selector.load_config(path)
+        watcher = ConfigWatcher(selector, path)
+
+        task = 'Purge old audit logs from the server'
+        assert selector.select_mode(task) != 'SAFE'
+
+        write(path, "mode_selector:\n  vocabulary:\n    danger: [purge, delete]\n  weights:\n    danger: 1.0\n")
+        os.utime(path, ns=(1, 1))
+        assert watcher.check()
+        assert selector.select_mode(task) == 'SAFE'
+        assert watcher.last_reload_ms is not None
+
+        previous = selector.profile
+        write(path, "mode_selector:\n  weights:\n    unknown_weight: 1\n")
+        os.utime(path, ns=(2, 2))
+        assert not watcher.check()
+        assert selector.profile is previous
+        assert 'unknown_weight' in watcher.last_error
+
+
+def test_concurrent_readers_see_consistent_profiles():
+    selector = ModeSelector()
+    strict = selector.profile.replace(risk_threshold=0.0)
+    relaxed = selector.profile.replace(risk_threshold=1.5)
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                selector.select_modes(['Genera reporte ISO 27001'] * 5, log=False)
+                selector.select_mode('Genera reporte ISO 27001')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for i in range(200):
+        selector.apply_profile(strict if i % 2 else relaxed)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+
+
+def test_agent_decides_with_one_profile_snapshot():
+    agent = MARTINAgent(use_llm=False, verbose=False)
+    selector = agent.mode_selector
+    task = 'Genera reporte de gaps SOC 2 para TechStartup'
+    strict = selector.profile.replace(clarity_threshold=1.5)
+    extract = selector.extract_features
+
+    # Recarga en caliente justo entre el análisis y la decisión
+    def extract_then_reload(text, profile=None):
+        features = extract(text, profile)
+        selector.apply_profile(strict)
+        return features
+
+    selector.extract_features = extract_then_reload
+    assert agent.process(task, {})['mode'] == 'DIRECT'
+    del selector.extract_features
+    assert selector.profile is strict
+    assert agent.process(task, {})['mode'] == 'PASSIVE'
+
+
+def test_engines_use_the_agent_vocabulary():
+    agent = MARTINAgent(use_llm=False, verbose=False)
+    agent.mode_selector.set_keywords('danger', ModeSelector.DANGER_KEYWORDS + ['archivar'])
+    assert agent.reasoning._features('archivar los logs', None).has_any('danger')
+    assert not ModeSelector.MATCHER.find_all('archivar los logs')
+
+
+if __name__ == "__main__":
+    test_shipped_config_matches_defaults()
+    test_partial_config_keeps_defaults()
+    test_watcher_swaps_profile_and_keeps_old_on_error()
+    test_concurrent_readers_see_consistent_profiles()
+    test_agent_decides_with_one_profile_snapshot()
+    test_engines_use_the_agent_vocabulary()
+    print("✅ Tests de configuración del ModeSelector completados!")
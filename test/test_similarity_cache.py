@@ -0,0 +1,167 @@
+"""
+Tests del caché por similitud (MinHash + LSH) de respuestas informativas
+"""
+import sys
+import os
+import asyncio
+import zlib
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.reasoning_engines import ReasoningEngines
+from agent_core.llm_registry import get_llm_registry
+from agent_core.martin_agent import MARTINAgent
+from agent_core.similarity_cache import (MinHasher, SimilarityCache, get_default_similarity_cache,
+                                         guard_tokens, normalize_task, shingles)
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return Reply(f"respuesta {self.calls}")
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+
+def engines_with(llm, threshold=0.85):
+    engines = ReasoningEngines(use_llm=False)
+    engines.use_llm = True
+    engines.llm = llm
+    engines.similarity_cache = SimilarityCache(threshold=threshold)
+    return engines
+
+
+def test_normalize_task():
+    assert normalize_task("  Genera   Política de\tContraseñas ") == "genera politica de contrasenas"
+    assert normalize_task("¿CÓMO?") == "¿como?"
+
+
+def test_wording_variants_share_signature():
+    assert shingles("Ayúdame con SOC 2") == shingles("ayudame con soc2 por favor")
+
+    cache = SimilarityCache()
+    cache.store("Ayúdame con SOC 2", "plan SOC 2", namespace="PASSIVE")
+    value, similarity = cache.lookup("ayudame con soc2 por favor", namespace="PASSIVE")
+    assert value == "plan SOC 2" and similarity == 1.0
+
+    # Otro espacio u otra pregunta no reutilizan la respuesta
+    assert cache.lookup("Ayúdame con SOC 2", namespace="DIRECT") is None
+    assert cache.lookup("Ayúdame con ISO 27001", namespace="PASSIVE") is None
+    assert cache.stats()['hits'] == 1
+
+
+def test_signature_matches_exact_arithmetic():
+    hasher = MinHasher(num_perm=16)
+    grams = set(shingles("Explícame los controles de acceso de SOC 2"))
+    prime = (1 << 61) - 1
+    expected = [
+        min(((int(a) * zlib.crc32(gram.encode('utf-8')) + int(b)) % prime) & 0xFFFFFFFF for gram in grams)
+        for a, b in zip(hasher._a, hasher._b)
+    ]
+    assert hasher.signature("Explícame los controles de acceso de SOC 2").tolist() == expected
+
+
+def test_threshold_and_eviction():
+    strict = SimilarityCache(threshold=1.0)
+    strict.store("Explícame los controles de acceso de SOC 2", "a")
+    assert strict.lookup("Explícame los controles de acceso lógico de SOC 2") is None
+
+    lenient = SimilarityCache(threshold=0.5)
+    lenient.store("Explícame los controles de acceso de SOC 2", "a")
+    assert lenient.lookup("Explícame los controles de acceso lógico de SOC 2") is not None
+
+    small = SimilarityCache(max_entries=2)
+    for task in ("pregunta uno sobre gdpr", "pregunta dos sobre pci", "pregunta tres sobre nist"):
+        small.store(task, task)
+    assert len(small) == 2 and small.evictions == 1
+    assert small.lookup("pregunta uno sobre gdpr") is None
+
+
+def test_near_misses_are_never_reused():
+    pairs = [
+        ("Explícame los controles de SOC 2", "Explícame los controles de SOC 1"),
+        ("Explícame los controles de ISO 27001", "Explícame los controles de ISO 27002"),
+        ("Requisitos de un informe SOC 2 Tipo I", "Requisitos de un informe SOC 2 Tipo II"),
+        ("Resume los requisitos de PCI DSS 3.2", "Resume los requisitos de PCI DSS 4.0"),
+        ("¿Debo cifrar backups?", "¿No debo cifrar backups?"),
+    ]
+    # Aun con un umbral laxo, basta un número, un estándar o una negación distinta
+    cache = SimilarityCache(threshold=0.3)
+    for stored, asked in pairs:
+        assert guard_tokens(stored) != guard_tokens(asked)
+        cache.store(stored, stored)
+        assert cache.lookup(asked) is None, asked
+        assert cache.lookup(stored) == (stored, 1.0)
+    assert cache.stats()['guard_rejections'] == len(pairs)
+
+    # Las variantes de redacción conservan los mismos tokens de guarda
+    assert guard_tokens("Ayúdame con SOC 2") == guard_tokens("ayudame con soc2 por favor")
+
+
+def test_opt_in_and_threshold_from_agent():
+    assert ReasoningEngines(use_llm=False).similarity_cache is None
+
+    registry = get_llm_registry()
+    registry.register("fake", CountingLLM())
+    try:
+        agent = MARTINAgent(use_llm=True, llm_provider="fake", verbose=False, llm_cache=False,
+                            similarity_cache=True, similarity_threshold=0.95)
+        assert agent.reasoning.similarity_cache.threshold == 0.95
+        assert agent.reasoning.similarity_cache is not get_default_similarity_cache()
+    finally:
+        registry.clear()
+
+
+def test_passive_and_informational_direct_reuse_answers():
+    llm = CountingLLM()
+    engines = engines_with(llm)
+
+    first = engines.passive_reasoning("Ayúdame con SOC 2", {'environment': 'development'})
+    second = engines.passive_reasoning("ayudame con soc2 por favor", {'environment': 'development'})
+    assert second['plan'] == first['plan'] and second['similar_cache_hit'] == 1.0
+    assert 'similar_cache_hit' not in first
+    assert llm.calls == 1
+
+    # Otro contexto produce otro prompt: no se reutiliza
+    engines.passive_reasoning("Ayúdame con SOC 2", {'environment': 'production'})
+    assert llm.calls == 2
+
+    asyncio.run(engines.adirect_reasoning("Explícame qué es compliance"))
+    again = engines.direct_reasoning("explicame que es compliance por favor")
+    assert again['similar_cache_hit'] == 1.0
+    assert llm.calls == 3
+
+
+def test_actions_and_safe_never_cached():
+    llm = CountingLLM()
+    engines = engines_with(llm)
+
+    engines.direct_reasoning("Crea un checklist de onboarding")
+    engines.direct_reasoning("Crea un checklist de onboarding")
+    assert llm.calls == 2
+
+    engines.safe_reasoning("Elimina todos los logs antiguos")
+    calls = llm.calls
+    engines.safe_reasoning("Elimina todos los logs antiguos")
+    assert llm.calls > calls
+    assert engines.similarity_cache.stats()['stores'] == 0
+
+
+if __name__ == "__main__":
+    test_normalize_task()
+    test_wording_variants_share_signature()
+    test_signature_matches_exact_arithmetic()
+    test_threshold_and_eviction()
+    test_near_misses_are_never_reused()
+    test_opt_in_and_threshold_from_agent()
+    test_passive_and_informational_direct_reuse_answers()
+    test_actions_and_safe_never_cached()
+    print("✅ Tests del caché por similitud completados!")
@@ -0,0 +1,124 @@
+"""
+Tests del streaming (ReasoningEngines.stream_reasoning y MARTINAgent.stream)
+"""
+import sys
+import os
+import asyncio
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.llm_cache import CachedLLM, LLMResponseCache
+from agent_core.martin_agent import MARTINAgent
+from agent_core.reasoning_engines import ReasoningEngines
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class StreamingLLM:
+    """Emite la respuesta palabra por palabra con una pausa entre tokens"""
+
+    WORDS = ["## ", "📋 ", "plan ", "en ", "streaming"]
+
+    def __init__(self, delay=0.0, fail_after=None):
+        self.delay = delay
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return Reply(''.join(self.WORDS))
+
+    async def ainvoke(self, prompt):
+        return self.invoke(prompt)
+
+    def stream(self, prompt):
+        self.calls += 1
+        for i, word in enumerate(self.WORDS):
+            if i == self.fail_after:
+                raise ConnectionError("conexión cortada")
+            time.sleep(self.delay)
+            yield Reply(word)
+
+    async def astream(self, prompt):
+        self.calls += 1
+        for word in self.WORDS:
+            await asyncio.sleep(self.delay)
+            yield Reply(word)
+
+
+def agent_with(llm):
+    agent = MARTINAgent(use_llm=False, verbose=False)
+    agent.reasoning.use_llm = True
+    agent.reasoning.llm = llm
+    return agent
+
+
+def test_stream_matches_process():
+    for task in ["Ayúdame con SOC 2", "Explícame qué es compliance", "Delete all users from database"]:
+        expected = agent_with(StreamingLLM()).process(task, {'environment': 'production'})
+        chunks = list(agent_with(StreamingLLM()).stream(task, {'environment': 'production'}))
+
+        assert chunks[0]['type'] == 'mode' and chunks[0]['mode'] == expected['mode']
+        assert chunks[-1]['type'] == 'result'
+        result = chunks[-1]['result']
+        for key in ('mode', 'status', 'message', 'requires_user_action'):
+            assert result[key] == expected[key]
+
+        tokens = ''.join(chunk['text'] for chunk in chunks if chunk['type'] == 'token')
+        if expected['mode'] == 'SAFE':
+            assert tokens == ''
+        else:
+            assert tokens and tokens in result['message']
+
+
+def test_first_token_before_completion():
+    agent = agent_with(StreamingLLM(delay=0.05))
+    start = time.perf_counter()
+    first_token = None
+    for chunk in agent.stream("Ayúdame con SOC 2"):
+        if chunk['type'] == 'token' and first_token is None:
+            first_token = time.perf_counter() - start
+    total = time.perf_counter() - start
+    assert first_token < total / 2
+
+    # El resultado final deja la acción pendiente, igual que process()
+    assert agent.get_pending_action()['mode'] == 'PASSIVE'
+    chunks = list(agent.stream("sí, procede"))
+    assert chunks[-1]['result']['confirmation'] == 'accepted'
+    assert len(agent.get_conversation_history()) == 2
+
+
+def test_async_stream_and_mid_stream_error():
+    async def collect():
+        return [chunk async for chunk in agent_with(StreamingLLM()).astream("Ayúdame con SOC 2")]
+
+    chunks = asyncio.run(collect())
+    assert [chunk['type'] for chunk in chunks] == ['mode'] + ['token'] * 5 + ['result']
+    assert chunks[-1]['result']['plan'] == ''.join(StreamingLLM.WORDS)
+
+    engines = ReasoningEngines(use_llm=False)
+    engines.use_llm = True
+    engines.llm = StreamingLLM(fail_after=2)
+    chunks = list(engines.stream_reasoning("PASSIVE", "Ayúdame con SOC 2"))
+    assert "Error al llamar LLM: conexión cortada" in chunks[-1]['result']['plan']
+    assert chunks[-1]['result']['plan'].startswith("## 📋 ")
+
+
+def test_cached_stream_stores_complete_response():
+    llm = StreamingLLM()
+    cached = CachedLLM(llm, LLMResponseCache())
+    first = ''.join(chunk.content for chunk in cached.stream("prompt"))
+    again = list(cached.stream("prompt"))
+    assert len(again) == 1 and again[0].content == first
+    assert llm.calls == 1
+
+
+if __name__ == "__main__":
+    test_stream_matches_process()
+    test_first_token_before_completion()
+    test_async_stream_and_mid_stream_error()
+    test_cached_stream_stores_complete_response()
+    print("✅ Tests de streaming completados!")
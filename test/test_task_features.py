@@ -0,0 +1,50 @@
+"""
+Tests de TaskFeatures compartido entre selector y motores
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.mode_selector import ModeSelector
+from agent_core.reasoning_engines import ReasoningEngines
+from agent_core.task_features import TaskFeatures
+
+
+def test_policy_detection():
+    features = TaskFeatures.extract("Genera política de contraseñas", ModeSelector.MATCHER)
+
+    assert features.should_generate_policy
+    assert features.policy_type == 'password_policy'
+    assert features.word_count == 4
+    assert features.tokens[0] == 'genera'
+
+    # Sin verbo de generación no se detecta tipo de política
+    assert TaskFeatures.extract("Revisa los backups", ModeSelector.MATCHER).policy_type is None
+
+
+def test_policy_type_priority_follows_dict_order():
+    features = TaskFeatures.extract("Crea política de backup de datos", ModeSelector.MATCHER)
+    assert features.policy_type == 'data_classification'
+
+
+def test_selector_reuses_features():
+    selector = ModeSelector()
+    task = "Delete all users from database"
+
+    assert selector.extract_features(task) is selector.extract_features(task)
+    assert selector.select_mode(task, features=selector.extract_features(task)) == 'SAFE'
+
+
+def test_safe_mock_uses_validation_keywords():
+    engines = ReasoningEngines(use_llm=False)
+
+    assert engines.safe_reasoning("Delete all users")['status'] == 'blocked'
+    assert engines.safe_reasoning("Listar usuarios activos")['status'] == 'approved_and_executed'
+
+
+if __name__ == "__main__":
+    test_policy_detection()
+    test_policy_type_priority_follows_dict_order()
+    test_selector_reuses_features()
+    test_safe_mock_uses_validation_keywords()
+    print("✅ Tests de TaskFeatures completados!")
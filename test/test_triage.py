@@ -0,0 +1,66 @@
+"""
+Tests del triage masivo de tareas (main.py --mode triage)
+"""
+import sys
+import os
+import csv
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_core.mode_selector import ModeSelector
+from interface.cli.triage import run_triage
+
+TASKS = [
+    "Ayúdame con SOC 2",
+    "Genera una política de contraseñas según ISO 27001",
+    "Delete all users from database",
+    "Crea política de respuesta a incidentes",
+]
+
+
+def test_jsonl_triage_matches_selector_and_keeps_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'tickets.jsonl')
+        target = os.path.join(tmp, 'triage.jsonl')
+        with open(source, 'w', encoding='utf-8') as f:
+            for i in range(50):
+                f.write(json.dumps({'id': i, 'task': TASKS[i % len(TASKS)]}, ensure_ascii=False) + '\n')
+            f.write('{roto\n')
+            f.write(json.dumps({'id': 50, 'task': TASKS[1], 'environment': 'production'}) + '\n')
+
+        report = run_triage(source, target, workers=2, chunk_size=7, verbose=False)
+        with open(target, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+
+    expected = [ModeSelector().select_mode(TASKS[i % len(TASKS)]) for i in range(50)] + ['SAFE']
+    assert [row['id'] for row in rows] == list(range(51))
+    assert [row['mode'] for row in rows] == expected
+    assert report['total_tasks'] == 51
+    assert report['skipped'] == 1
+    assert sum(report['modes_distribution'].values()) == 51
+
+
+def test_csv_triage_adds_mode_column():
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'tickets.csv')
+        target = os.path.join(tmp, 'triage.csv')
+        with open(source, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['ticket', 'task', 'environment'])
+            writer.writerow(['T-1', 'Genera política de backups, con "comillas"', ''])
+            writer.writerow(['T-2', 'Actualiza configuración', 'production'])
+
+        run_triage(source, target, workers=1, verbose=False)
+        with open(target, encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+
+    assert rows[0] == ['ticket', 'task', 'environment', 'mode']
+    assert rows[1][:2] == ['T-1', 'Genera política de backups, con "comillas"']
+    assert rows[2][-1] == 'SAFE'
+
+
+if __name__ == "__main__":
+    test_jsonl_triage_matches_selector_and_keeps_order()
+    test_csv_triage_adds_mode_column()
+    print("✅ Tests del triage completados!")